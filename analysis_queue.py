@@ -0,0 +1,267 @@
+"""
+Durable local job queue for post-interview analysis (SQLite, WAL mode).
+
+/store_interview used to run the analysis LLM call inline, so the
+candidate's browser waited on it and a burst of interviews ending together
+tied up the server. Now it enqueues a job and returns. A small pool of
+worker threads runs the registered handler for each job kind.
+
+Jobs are keyed by (kind, candidate_id, transcript_hash): enqueueing the
+same transcript twice returns the existing job instead of paying for the
+analysis again. Failed runs are retried with exponential backoff and
+jitter up to `max_attempts`; errors in `non_retryable` (a missing
+interview, bad input) fail the job on the first attempt. A job claimed by a worker that dies is picked
+up again when its lease expires, so jobs survive restarts and several
+uvicorn workers can share one queue file.
+"""
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind            TEXT NOT NULL,
+    candidate_id    TEXT NOT NULL,
+    transcript_hash TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'queued',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_run_at     REAL NOT NULL,
+    lease_until     REAL,
+    last_error      TEXT,
+    result          TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    UNIQUE (kind, candidate_id, transcript_hash)
+);
+CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs(status, next_run_at);
+CREATE INDEX IF NOT EXISTS jobs_candidate ON jobs(candidate_id, updated_at);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def transcript_hash(rec: Optional[Dict[str, Any]]) -> str:
+    """
+    Stable hash of an interview's turns; "" when there is no transcript.
+    """
+    if not rec:
+        return ""
+    turns = {
+        "interviewerTurns": rec.get("interviewerTurns") or [],
+        "candidateTurns": rec.get("candidateTurns") or [],
+    }
+    blob = json.dumps(turns, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def _job_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "candidate_id": row["candidate_id"],
+        "transcript_hash": row["transcript_hash"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "next_run_at": row["next_run_at"],
+        "last_error": row["last_error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+class AnalysisQueue:
+    def __init__(
+        self,
+        path: Path,
+        workers: int = 2,
+        max_attempts: int = 5,
+        backoff_seconds: float = 5.0,
+        max_backoff_seconds: float = 300.0,
+        lease_seconds: float = 600.0,
+        poll_seconds: float = 1.0,
+        busy_timeout_ms: int = 5000,
+        non_retryable: Tuple[type, ...] = (LookupError, ValueError),
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.busy_timeout_ms = busy_timeout_ms
+        self.non_retryable = non_retryable
+
+        self._handlers: Dict[str, Callable[[str], Any]] = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind: str, handler: Callable[[str], Any]) -> None:
+        """
+        `handler(candidate_id)` runs the analysis; its (JSON-able) return
+        value is stored as the job result.
+        """
+        self._handlers[kind] = handler
+
+    # ---------- producers ----------
+    def enqueue(self, kind: str, candidate_id: str, digest: str = "", force: bool = False) -> Dict[str, Any]:
+        """
+        Queue a job, or return the existing one for the same transcript.
+        A job that ran out of attempts (or any job, with `force`) is queued again.
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"No handler registered for job kind '{kind}'")
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO jobs (kind, candidate_id, transcript_hash, next_run_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (kind, candidate_id, digest, now, now, now),
+        )
+        requeue = "status != 'running'" if force else "status = 'failed'"
+        conn.execute(
+            f"""
+            UPDATE jobs SET status = 'queued', attempts = 0, next_run_at = ?, last_error = NULL, updated_at = ?
+            WHERE kind = ? AND candidate_id = ? AND transcript_hash = ? AND {requeue}
+            """,
+            (now, now, kind, candidate_id, digest),
+        )
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? AND candidate_id = ? AND transcript_hash = ?",
+            (kind, candidate_id, digest),
+        ).fetchone()
+        self._wakeup.set()
+        return _job_from_row(row)
+
+    # ---------- readers ----------
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_from_row(row) if row else None
+
+    def result(self, job_id: int) -> Any:
+        row = self._conn().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["result"]) if row and row["result"] else None
+
+    def jobs_for(self, candidate_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE candidate_id = ? ORDER BY updated_at DESC", (candidate_id,)
+        ).fetchall()
+        return [_job_from_row(r) for r in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {
+            "workers": len([t for t in self._threads if t.is_alive()]),
+            "counts": {r["status"]: r["n"] for r in rows},
+        }
+
+    # ---------- workers ----------
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT * FROM jobs
+                WHERE (status = 'queued' AND next_run_at <= ?)
+                   OR (status = 'running' AND lease_until < ?)
+                ORDER BY next_run_at LIMIT 1
+                """,
+                (now, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (now + self.lease_seconds, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _run_one(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        attempts = row["attempts"] + 1
+        handler = self._handlers.get(row["kind"])
+        now = time.time
+        try:
+            if handler is None:
+                raise KeyError(f"No handler registered for job kind '{row['kind']}'")
+            result = handler(row["candidate_id"])
+            self._conn().execute(
+                "UPDATE jobs SET status = 'done', result = ?, last_error = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), now(), job_id),
+            )
+            print(f"[analysis-queue] job {job_id} {row['kind']} {row['candidate_id']} done")
+        except Exception as e:
+            if attempts >= self.max_attempts or isinstance(e, self.non_retryable):
+                status, next_run = FAILED, now()
+            else:
+                status, next_run = QUEUED, now() + self._backoff(attempts)
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, next_run_at = ?, last_error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (status, next_run, f"{type(e).__name__}: {e}", now(), job_id),
+            )
+            print(f"[analysis-queue] job {job_id} attempt {attempts} failed ({status}):", e)
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                row = self._claim()
+            except sqlite3.OperationalError as e:
+                print("[analysis-queue] claim failed:", e)
+                row = None
+            if row is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            self._run_one(row)
+
+    def start(self) -> None:
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"analysis-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
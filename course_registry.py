@@ -0,0 +1,399 @@
+"""
+Course registry over data/*.course.json (and the legacy top-level pcb.json).
+
+A course file describes one interview track: coverage plan, competencies
+with their subskills, probe templates, follow-up rules, the evaluation
+rubric and a glossary. `CourseRegistry.current()` returns an immutable
+`CourseCatalog` of validated `Course` objects, so request handlers only
+ever read from memory.
+
+Validation (a file that fails is rejected with `CourseValidationError`):
+- rubric weights are numbers that sum to 1 (within 1e-6),
+- every competency id has a rubric weight and every weight key is a
+  competency,
+- competency ids are unique and coverage_priority only names competencies,
+- probe templates only use the {subskill} and {competency} placeholders.
+
+Lookup tables are built once per load: competency -> subskills,
+subskill -> competency, and every probe template expanded for every
+(competency, subskill) pair.
+
+Files are re-checked at most every `check_seconds`; only files whose
+mtime/size changed are re-parsed. A file that is mid-write or invalid
+keeps serving its previous version and the error is reported in
+`stats()`. The course id is the file name without `.course.json`/`.json`;
+when two sources define the same id, the earlier source wins and the
+other is listed as shadowed.
+"""
+import json
+import re
+import string
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+WEIGHT_TOLERANCE = 1e-6
+TEMPLATE_FIELDS = {"subskill", "competency"}
+
+
+class CourseValidationError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Competency:
+    __slots__ = ("id", "name", "weight", "responsibilities", "subskills", "red_flags", "tools")
+    id: str
+    name: str
+    weight: float
+    responsibilities: Tuple[str, ...]
+    subskills: Tuple[str, ...]
+    red_flags: Tuple[str, ...]
+    tools: Tuple[str, ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "weight": self.weight,
+            "responsibilities": list(self.responsibilities),
+            "subskills": list(self.subskills),
+            "red_flags": list(self.red_flags),
+            "tools": list(self.tools),
+        }
+
+
+@dataclass(frozen=True)
+class ProbeTemplate:
+    __slots__ = ("id", "pattern")
+    id: str
+    pattern: str
+
+
+@dataclass(frozen=True)
+class Probe:
+    __slots__ = ("template", "competency", "subskill", "text")
+    template: str
+    competency: str
+    subskill: str
+    text: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"template": self.template, "competency": self.competency, "subskill": self.subskill, "text": self.text}
+
+
+def humanize(identifier: str) -> str:
+    return re.sub(r"_+", " ", identifier).strip()
+
+
+def _strings(value: Any) -> Tuple[str, ...]:
+    return tuple(str(v) for v in (value or []) if str(v).strip())
+
+
+class Course:
+    """
+    One validated course. Treat as read-only; instances are shared
+    between requests.
+    """
+
+    __slots__ = (
+        "id", "path", "topic", "version", "language", "strict_topic_lock",
+        "coverage_policy", "coverage_priority", "min_competencies_to_cover", "max_turns",
+        "competencies", "templates", "follow_up_rules", "scoring_scale", "levels",
+        "red_flag_penalty", "glossary", "raw",
+        "by_id", "subskills", "subskill_owner", "probes",
+    )
+
+    def __init__(self, course_id: str, path: Path, data: Dict[str, Any]):
+        self.id = course_id
+        self.path = path
+        self.raw = data
+        meta = data.get("metadata") or {}
+        self.topic = str(meta.get("topic") or course_id)
+        self.version = str(meta.get("version") or "")
+        self.language = str(meta.get("language") or "en")
+        self.strict_topic_lock = bool(meta.get("strict_topic_lock", False))
+
+        rubric = data.get("evaluation_rubric") or {}
+        weights = self._weights(rubric.get("weights"))
+        self.scoring_scale = str(rubric.get("scoring_scale") or "")
+        self.levels: Dict[str, str] = {str(k): str(v) for k, v in (rubric.get("levels") or {}).items()}
+        self.red_flag_penalty = float(rubric.get("red_flag_penalty") or 0)
+
+        competencies: List[Competency] = []
+        for item in data.get("competencies") or []:
+            cid = str(item.get("id") or "").strip()
+            if not cid:
+                raise CourseValidationError("competency without an id")
+            competencies.append(Competency(
+                id=cid,
+                name=str(item.get("name") or humanize(cid)),
+                weight=weights.get(cid, 0.0),
+                responsibilities=_strings(item.get("responsibilities")),
+                subskills=_strings(item.get("subskills")),
+                red_flags=_strings(item.get("red_flags")),
+                tools=_strings(item.get("tools")),
+            ))
+        self.competencies: Tuple[Competency, ...] = tuple(competencies)
+        self.by_id: Dict[str, Competency] = {c.id: c for c in competencies}
+        if len(self.by_id) != len(competencies):
+            seen, dupes = set(), set()
+            for c in competencies:
+                (dupes if c.id in seen else seen).add(c.id)
+            raise CourseValidationError(f"duplicate competency ids: {sorted(dupes)}")
+
+        missing = sorted(set(self.by_id) - set(weights))
+        extra = sorted(set(weights) - set(self.by_id))
+        if missing or extra:
+            raise CourseValidationError(
+                f"rubric weights do not match competencies (no weight: {missing}, unknown: {extra})"
+            )
+
+        plan = data.get("coverage_plan") or {}
+        self.coverage_policy = str(plan.get("policy") or "")
+        self.coverage_priority: Tuple[str, ...] = _strings(plan.get("coverage_priority")) or tuple(self.by_id)
+        unknown = [cid for cid in self.coverage_priority if cid not in self.by_id]
+        if unknown:
+            raise CourseValidationError(f"coverage_priority names unknown competencies: {unknown}")
+        self.min_competencies_to_cover = int(plan.get("min_competencies_to_cover") or 0)
+        self.max_turns = int(plan.get("max_turns") or 0)
+
+        self.templates: Tuple[ProbeTemplate, ...] = tuple(
+            self._template(t) for t in data.get("probe_templates") or []
+        )
+        self.follow_up_rules: Dict[str, Tuple[str, ...]] = {
+            str(k): _strings(v) for k, v in (data.get("follow_up_rules") or {}).items()
+        }
+        self.glossary: Dict[str, str] = {str(k): str(v) for k, v in (data.get("glossary") or {}).items()}
+
+        # lookup tables
+        self.subskills: Dict[str, Tuple[str, ...]] = {c.id: c.subskills for c in competencies}
+        self.subskill_owner: Dict[str, str] = {}
+        for c in competencies:
+            for s in c.subskills:
+                self.subskill_owner.setdefault(s, c.id)
+        self.probes: Dict[Tuple[str, str], Tuple[Probe, ...]] = {
+            (c.id, s): tuple(
+                Probe(t.id, c.id, s, t.pattern.format(subskill=humanize(s), competency=c.name))
+                for t in self.templates
+            )
+            for c in competencies
+            for s in c.subskills
+        }
+
+    @staticmethod
+    def _weights(raw: Any) -> Dict[str, float]:
+        if not isinstance(raw, dict) or not raw:
+            raise CourseValidationError("evaluation_rubric.weights is missing or empty")
+        weights: Dict[str, float] = {}
+        for k, v in raw.items():
+            if isinstance(v, bool) or not isinstance(v, (int, float)) or v < 0:
+                raise CourseValidationError(f"rubric weight for '{k}' is not a non-negative number")
+            weights[str(k)] = float(v)
+        total = sum(weights.values())
+        if abs(total - 1.0) > WEIGHT_TOLERANCE:
+            raise CourseValidationError(f"rubric weights sum to {total:.6f}, expected 1")
+        return weights
+
+    @staticmethod
+    def _template(raw: Dict[str, Any]) -> ProbeTemplate:
+        tid = str(raw.get("id") or "").strip()
+        pattern = str(raw.get("pattern") or "")
+        if not tid or not pattern:
+            raise CourseValidationError("probe template needs an id and a pattern")
+        try:
+            fields = {name for _, name, _, _ in string.Formatter().parse(pattern) if name is not None}
+        except ValueError as e:
+            raise CourseValidationError(f"probe template '{tid}': {e}") from None
+        if fields - TEMPLATE_FIELDS:
+            raise CourseValidationError(f"probe template '{tid}' uses unknown fields {sorted(fields - TEMPLATE_FIELDS)}")
+        return ProbeTemplate(tid, pattern)
+
+    # ---------- queries ----------
+    def probes_for(
+        self,
+        competency: Optional[str] = None,
+        subskill: Optional[str] = None,
+        templates: Optional[Iterable[str]] = None,
+    ) -> List[Probe]:
+        if subskill and not competency:
+            competency = self.subskill_owner.get(subskill)
+        wanted = set(templates) if templates else None
+        out: List[Probe] = []
+        for (cid, sid), probes in self.probes.items():
+            if competency and cid != competency:
+                continue
+            if subskill and sid != subskill:
+                continue
+            out.extend(p for p in probes if wanted is None or p.template in wanted)
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "version": self.version,
+            "source": self.path.name,
+            "competencies": len(self.competencies),
+            "subskills": sum(len(s) for s in self.subskills.values()),
+            "probe_templates": len(self.templates),
+            "max_turns": self.max_turns,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "language": self.language,
+            "strict_topic_lock": self.strict_topic_lock,
+            "coverage_plan": {
+                "policy": self.coverage_policy,
+                "priority": list(self.coverage_priority),
+                "min_competencies_to_cover": self.min_competencies_to_cover,
+                "max_turns": self.max_turns,
+            },
+            "competencies": [c.to_dict() for c in self.competencies],
+            "probe_templates": [{"id": t.id, "pattern": t.pattern} for t in self.templates],
+            "follow_up_rules": {k: list(v) for k, v in self.follow_up_rules.items()},
+            "rubric": {
+                "scoring_scale": self.scoring_scale,
+                "levels": self.levels,
+                "red_flag_penalty": self.red_flag_penalty,
+            },
+            "glossary": self.glossary,
+        }
+
+
+def course_id_for(path: Path) -> str:
+    name = path.name
+    for suffix in (".course.json", ".json"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return path.stem
+
+
+class CourseCatalog:
+    """
+    Immutable snapshot of every loaded course.
+    """
+
+    def __init__(self, courses: Dict[str, Course], shadowed: Dict[str, List[str]], errors: Dict[str, str], loaded_at: float):
+        self.courses = courses
+        self.shadowed = shadowed
+        self.errors = errors
+        self.loaded_at = loaded_at
+
+    def get(self, course_id: str) -> Optional[Course]:
+        return self.courses.get(course_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "courses": sorted(self.courses),
+            "shadowed": self.shadowed,
+            "errors": self.errors,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class CourseRegistry:
+    """
+    `sources` are (directory, glob) pairs or single files, in priority order.
+    """
+
+    def __init__(self, sources: Sequence[Any], check_seconds: float = 2.0):
+        self.sources = list(sources)
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._files: Dict[Path, Tuple[Tuple[int, int], Course]] = {}
+        self._errors: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self._catalog: Optional[CourseCatalog] = None
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    def _paths(self) -> List[Path]:
+        paths: List[Path] = []
+        for source in self.sources:
+            if isinstance(source, tuple):
+                directory, pattern = source
+                paths.extend(sorted(Path(directory).glob(pattern)))
+            elif Path(source).is_file():
+                paths.append(Path(source))
+        return paths
+
+    @staticmethod
+    def load(path: Path) -> Course:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError as e:
+            raise CourseValidationError(f"invalid JSON: {e}") from None
+        if not isinstance(data, dict):
+            raise CourseValidationError("course file must be a JSON object")
+        try:
+            return Course(course_id_for(path), path, data)
+        except CourseValidationError:
+            raise
+        except (AttributeError, TypeError, ValueError) as e:
+            # wrong shapes inside the object, e.g. "competencies": ["a"]
+            raise CourseValidationError(f"malformed course: {e!r}") from None
+
+    def current(self) -> CourseCatalog:
+        now = time.monotonic()
+        catalog = self._catalog
+        if catalog is not None and now - self._checked_at < self.check_seconds:
+            return catalog
+        with self._lock:
+            if self._catalog is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._catalog
+            self._checked_at = time.monotonic()
+            paths = self._paths()
+            if self._refresh(paths) or self._catalog is None:
+                self._catalog = self._build(paths)
+            return self._catalog
+
+    def _refresh(self, paths: List[Path]) -> bool:
+        changed = False
+        for path in paths:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            key = (st.st_mtime_ns, st.st_size)
+            cached = self._files.get(path)
+            failed = self._errors.get(path)
+            if (cached is not None and cached[0] == key) or (failed is not None and failed[0] == key):
+                continue
+            try:
+                self._files[path] = (key, self.load(path))
+                self._errors.pop(path, None)
+            except (OSError, CourseValidationError) as e:
+                # keep serving the previous version of a file that is mid-write or broken
+                print(f"[courses] failed to load {path.name}:", e)
+                self._errors[path] = (key, str(e))
+            changed = True
+        present = set(paths)
+        for path in list(self._files):
+            if path not in present:
+                del self._files[path]
+                changed = True
+        for path in list(self._errors):
+            if path not in present:
+                del self._errors[path]
+                changed = True
+        return changed
+
+    def _build(self, paths: List[Path]) -> CourseCatalog:
+        courses: Dict[str, Course] = {}
+        shadowed: Dict[str, List[str]] = {}
+        for path in paths:
+            cached = self._files.get(path)
+            if cached is None:
+                continue
+            course = cached[1]
+            if course.id in courses:
+                shadowed.setdefault(course.id, []).append(str(path))
+                continue
+            courses[course.id] = course
+        self.reloads += 1
+        errors = {str(path): message for path, (_, message) in self._errors.items()}
+        return CourseCatalog(courses, shadowed, errors, time.time())
@@ -0,0 +1,206 @@
+"""
+Google Drive v3 access layer.
+
+- Static discovery: the service is built from a discovery document on
+  disk and never fetched over the network. DRIVE_DISCOVERY_FILE can point
+  at a pinned JSON copy; by default the copy bundled with
+  google-api-python-client is used. It is parsed once per process.
+- Lazy: credentials, discovery document and services are built on first
+  use, so importing the server does no Drive work.
+- Thread-safe: every request goes through `DriveHttp` (http_clients.py),
+  which signs it with the shared credentials (refresh is serialised there)
+  and sends it over the pooled httpx client for googleapis.com. Each thread
+  gets its own service object on top of that transport; googleapiclient
+  only promises thread safety for per-thread service objects.
+- Batched metadata: `prefetch_metadata(ids, fields)` runs files().get for
+  many files through the Drive batch endpoint (up to 100 calls per HTTP
+  request) and keeps the results for `metadata_ttl_seconds`. `metadata()`
+  uses a prefetched entry when there is one, otherwise one files().get.
+"""
+import email
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+from uuid import uuid4
+
+from http_clients import DriveHttp
+
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+BATCH_URL = "https://www.googleapis.com/batch/drive/v3"
+MAX_BATCH = 100   # Drive's limit on calls per batch request
+
+
+def load_discovery(path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Drive v3 discovery document from `path`, or the one bundled with
+    google-api-python-client.
+    """
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    from googleapiclient.discovery_cache import get_static_doc
+
+    doc = get_static_doc("drive", "v3")
+    if doc is None:
+        raise RuntimeError("No bundled Drive v3 discovery document; set DRIVE_DISCOVERY_FILE")
+    return json.loads(doc)
+
+
+def parse_batch_response(content_type: str, body: bytes) -> Dict[str, Tuple[int, str]]:
+    """
+    {content id: (status, body)} from a multipart/mixed batch response.
+    Drive answers request "<x>" with a part whose Content-ID is "<response-x>".
+    """
+    message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    out: Dict[str, Tuple[int, str]] = {}
+    if not message.is_multipart():
+        return out
+    for part in message.get_payload():
+        content_id = (part.get("Content-ID") or "").strip().strip("<>")
+        if content_id.startswith("response-"):
+            content_id = content_id[len("response-"):]
+        # bytes, then utf-8: the str payload is decoded as ASCII and mangles "Résumé.pdf"
+        raw = part.get_payload(decode=True) or b""
+        payload = raw.decode("utf-8", errors="replace").replace("\r\n", "\n")
+        status_line, _, rest = payload.partition("\n")
+        _, _, content = rest.partition("\n\n")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            status = 0
+        out[content_id] = (status, content)
+    return out
+
+
+class DriveClient:
+    def __init__(
+        self,
+        credentials_file: Path,
+        scopes: Optional[List[str]] = None,
+        discovery_file: Optional[Path] = None,
+        metadata_ttl_seconds: float = 600.0,
+    ):
+        self.credentials_file = credentials_file
+        self.scopes = scopes or DRIVE_SCOPES
+        self.discovery_file = discovery_file
+        self.metadata_ttl_seconds = metadata_ttl_seconds
+        self._lock = threading.Lock()
+        self._http: Optional[DriveHttp] = None
+        self._discovery: Optional[Dict[str, Any]] = None
+        self._local = threading.local()
+        self._meta: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self.stats_counters = {
+            "services": 0,
+            "metadata_calls": 0,
+            "prefetch_hits": 0,
+            "batch_requests": 0,
+            "batched_items": 0,
+            "batch_item_errors": 0,
+        }
+
+    # ---------- construction ----------
+    def _shared(self) -> Tuple[DriveHttp, Dict[str, Any]]:
+        with self._lock:
+            if self._http is None:
+                from google.oauth2 import service_account
+
+                creds = service_account.Credentials.from_service_account_file(
+                    str(self.credentials_file), scopes=self.scopes
+                )
+                self._discovery = load_discovery(self.discovery_file)
+                self._http = DriveHttp(creds)
+            return self._http, self._discovery
+
+    def service(self) -> Any:
+        """
+        This thread's Drive v3 service.
+        """
+        service = getattr(self._local, "service", None)
+        if service is None:
+            from googleapiclient.discovery import build_from_document
+
+            http, discovery = self._shared()
+            service = build_from_document(discovery, http=http)
+            self._local.service = service
+            with self._lock:
+                self.stats_counters["services"] += 1
+        return service
+
+    # ---------- metadata ----------
+    def metadata(self, file_id: str, fields: str) -> Dict[str, Any]:
+        entry = self._meta.get((file_id, fields))
+        if entry is not None and entry[0] > time.monotonic():
+            with self._lock:
+                self.stats_counters["prefetch_hits"] += 1
+            return dict(entry[1])
+        with self._lock:
+            self.stats_counters["metadata_calls"] += 1
+        return self.service().files().get(fileId=file_id, fields=fields).execute()
+
+    def prefetch_metadata(self, file_ids: Iterable[str], fields: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Batched files().get for `file_ids`. Returns {file_id: metadata} for
+        the files that were found; the others are left to a later
+        `metadata()` call, which raises their error where it matters.
+        """
+        ids = list(dict.fromkeys(i for i in file_ids if i))
+        if not ids:
+            return {}
+        http, _ = self._shared()
+        found: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(ids), MAX_BATCH):
+            found.update(self._batch_get(http, ids[start:start + MAX_BATCH], fields))
+
+        now = time.monotonic()
+        with self._lock:
+            self._meta = {k: v for k, v in self._meta.items() if v[0] > now}
+            for file_id, meta in found.items():
+                self._meta[(file_id, fields)] = (now + self.metadata_ttl_seconds, meta)
+        return found
+
+    def _batch_get(self, http: DriveHttp, file_ids: List[str], fields: str) -> Dict[str, Dict[str, Any]]:
+        boundary = f"batch_{uuid4().hex}"
+        query = urlencode({"fields": fields, "alt": "json"})
+        parts = [
+            f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <item{i}>\r\n\r\n"
+            f"GET /drive/v3/files/{quote(file_id, safe='')}?{query}\r\n\r\n"
+            for i, file_id in enumerate(file_ids)
+        ]
+        body = ("".join(parts) + f"--{boundary}--\r\n").encode("utf-8")
+        # the outer request's Authorization header applies to every inner call
+        resp, content = http.request(
+            BATCH_URL, "POST", body=body, headers={"Content-Type": f"multipart/mixed; boundary={boundary}"}
+        )
+        if resp.status != 200:
+            raise RuntimeError(f"Drive batch request failed: {resp.status} {content[:200]!r}")
+
+        found: Dict[str, Dict[str, Any]] = {}
+        errors = 0
+        results = parse_batch_response(resp.get("content-type", ""), content)
+        for i, file_id in enumerate(file_ids):
+            status, text = results.get(f"item{i}", (0, ""))
+            try:
+                if status != 200:
+                    raise ValueError(status)
+                found[file_id] = json.loads(text)
+            except ValueError:
+                errors += 1
+        with self._lock:
+            c = self.stats_counters
+            c["batch_requests"] += 1
+            c["batched_items"] += len(file_ids)
+            c["batch_item_errors"] += errors
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "built": self._http is not None,
+                "discovery": str(self.discovery_file) if self.discovery_file else "bundled",
+                "prefetched": sum(1 for expires, _ in self._meta.values() if expires > now),
+                **self.stats_counters,
+            }
@@ -0,0 +1,106 @@
+"""
+Q/A evaluator used by /analyze and the bulk re-analysis CLI.
+
+Kept free of server globals so it can be driven with any OpenAI-compatible
+client (the real API, or a local fake endpoint in tests).
+
+With a course, the transcript is pre-scored locally (rubric_scoring) and
+the model only sees the most informative pairs plus those scores.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from rubric_scoring import MAX_SELECTED_PAIRS, compact_scores, excerpt_pairs, score_turns
+
+EVALUATOR_SYSTEM_PROMPT = (
+    "You are an evaluator. Output only JSON with keys: items[], overall_score, "
+    "strengths, improvements, next_steps, analysis_summary."
+)
+
+
+def build_qa_pairs(interviewer_turns: List[str], candidate_turns: List[str]) -> List[Dict[str, str]]:
+    Q, A = interviewer_turns or [], candidate_turns or []
+    return [
+        {"question": Q[i] if i < len(Q) else "", "answer": A[i] if i < len(A) else ""}
+        for i in range(max(len(Q), len(A)))
+    ]
+
+
+def fallback_result(qa_pairs: List[Dict[str, str]], summary: str) -> Dict[str, Any]:
+    return {
+        "items": qa_pairs,
+        "overall_score": 0,
+        "strengths": [],
+        "improvements": [],
+        "next_steps": [],
+        "analysis_summary": summary,
+    }
+
+
+def build_user_prompt(
+    qa_pairs: List[Dict[str, str]],
+    recording_url: str = "",
+    course: Optional[Any] = None,
+    max_pairs: int = MAX_SELECTED_PAIRS,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Returns (prompt, local_scores). Without a course every pair is sent
+    verbatim; with one, a transcript of at most `max_pairs` pairs is sent
+    whole (long answers clipped).
+    """
+    if course is None or not qa_pairs:
+        return f"Analyze Q/A pairs: {json.dumps(qa_pairs, ensure_ascii=False)} Recording: {recording_url}", None
+    scores = score_turns(course, qa_pairs, max_pairs=max_pairs)
+    excerpt = excerpt_pairs(qa_pairs, scores["selected"])
+    if len(excerpt) == len(qa_pairs):
+        which = f"all {len(excerpt)} are included"
+    else:
+        which = f"these {len(excerpt)} are the most informative"
+    prompt = (
+        f"Course: {course.topic}. Rubric weights and local evidence scores (0-1, keyword TF-IDF, "
+        f"use as grounding, not as the final score): {json.dumps(compact_scores(scores), ensure_ascii=False)}\n"
+        f"The interview had {len(qa_pairs)} Q/A pairs; {which} "
+        f"(\"turn\" is the original index). Analyze them: {json.dumps(excerpt, ensure_ascii=False)} "
+        f"Recording: {recording_url}"
+    )
+    return prompt, scores
+
+
+def evaluate_turns(
+    client: Any,
+    model: str,
+    interviewer_turns: List[str],
+    candidate_turns: List[str],
+    recording_url: str = "",
+    max_tokens: int = 1200,
+    course: Optional[Any] = None,
+    prompt: Optional[Tuple[str, Optional[Dict[str, Any]]]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Returns (analysis, usage) where usage has prompt_tokens / completion_tokens.
+    Raises on transport/API errors; unparseable model output is wrapped.
+    With a course, the local scores are attached as analysis["rubric_prescore"].
+    `prompt` is build_user_prompt's result when the caller already has it.
+    """
+    qa_pairs = build_qa_pairs(interviewer_turns, candidate_turns)
+    user_prompt, scores = prompt if prompt is not None else build_user_prompt(qa_pairs, recording_url, course)
+
+    resp = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": EVALUATOR_SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}],
+        temperature=0.0,
+        max_tokens=max_tokens,
+    )
+    raw = (resp.choices[0].message.content or "").strip()
+    try:
+        data = json.loads(raw)
+    except Exception:
+        data = fallback_result(qa_pairs, raw)
+    if scores is not None and isinstance(data, dict):
+        data["rubric_prescore"] = scores
+
+    usage = getattr(resp, "usage", None)
+    return data, {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
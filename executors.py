@@ -0,0 +1,143 @@
+"""
+Bounded, per-dependency thread pools.
+
+Every blocking call made from an async route (Drive, OpenAI, Spaces,
+pandas/pypdf, local disk) goes through one of these pools, so a slow
+dependency can only exhaust its own workers and never the event loop.
+
+    data = await run_in("openai", client.chat.completions.create, **kwargs)
+
+Sync code that is already running inside a pool uses `call_in`, which
+blocks the calling worker thread instead of the loop.
+
+Submitted calls run in a copy of the caller's contextvars, so scoped
+settings such as `openai_limiter.priority(BULK)` follow the work onto
+the pool thread.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# name -> default max concurrent calls; override with POOL_<NAME>_WORKERS
+DEFAULT_POOL_SIZES: Dict[str, int] = {
+    "drive": 8,     # googleapiclient calls
+    "openai": 16,   # chat / whisper / realtime session REST
+    "analysis": 8,  # background analysis LLM calls, kept off the "openai" pool used by /session
+    "spaces": 16,   # boto3 uploads to DO Spaces
+    "cpu": 4,       # pandas, pypdf, python-docx
+    "disk": 8,      # local file copies
+    "session": 16,  # composite sync work that fans out to the pools above
+}
+
+
+class DependencyPool:
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.thread_prefix = f"pool-{name}"
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self.thread_prefix)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def owns_current_thread(self) -> bool:
+        return threading.current_thread().name.startswith(self.thread_prefix + "_")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        enqueued = time.perf_counter()
+        ctx = contextvars.copy_context()
+        with self._lock:
+            self.queued += 1
+
+        def _run():
+            started = time.perf_counter()
+            wait_ms = (started - enqueued) * 1000
+            with self._lock:
+                self.queued -= 1
+                self.in_flight += 1
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            ok = False
+            try:
+                result = ctx.run(fn, *args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.total_run_ms += (time.perf_counter() - started) * 1000
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        return self.executor.submit(_run)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait_ms / done, 2) if done else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "avg_run_ms": round(self.total_run_ms / done, 2) if done else 0.0,
+            }
+
+
+_POOLS: Dict[str, DependencyPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(name: str) -> DependencyPool:
+    pool = _POOLS.get(name)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        if name not in _POOLS:
+            if name not in DEFAULT_POOL_SIZES:
+                raise KeyError(f"Unknown executor pool: {name}")
+            size = int(os.getenv(f"POOL_{name.upper()}_WORKERS", DEFAULT_POOL_SIZES[name]))
+            _POOLS[name] = DependencyPool(name, max(1, size))
+        return _POOLS[name]
+
+
+async def run_in(pool_name: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the named pool and await its result.
+    """
+    return await asyncio.wrap_future(get_pool(pool_name).submit(fn, *args, **kwargs))
+
+
+def call_in(pool_name: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Blocking variant for sync code. Runs inline if we're already on a
+    worker of that pool (avoids self-deadlock when the pool is saturated).
+    """
+    pool = get_pool(pool_name)
+    if pool.owns_current_thread():
+        return fn(*args, **kwargs)
+    return pool.submit(fn, *args, **kwargs).result()
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.stats() for name, pool in sorted(_POOLS.items())}
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.executor.shutdown(wait=wait, cancel_futures=True)
+        _POOLS.clear()
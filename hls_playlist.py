@@ -0,0 +1,224 @@
+"""
+Incremental HLS playlists for Android premises segments.
+
+`HlsPlaylist` keeps segments in the order they were published and
+renders two views:
+
+- index (EVENT while recording, VOD with #EXT-X-ENDLIST once finalized)
+- live  (sliding window of the last N segments)
+
+An EVENT playlist may only grow at the end, so every new segment is
+appended to the cached body, including one that arrives after segments
+with higher sequence numbers. A retry of a sequence number already
+published keeps the published entry. Stored segments are loaded in upload
+order, so every worker renders the same playlist. Ending the playlist
+(VOD) puts the segments in sequence order.
+
+`PlaylistPublisher` coalesces bursts of segment arrivals: callers mark the
+playlist dirty and a single writer task PUTs the latest state after a short
+debounce, so N segments arriving together cost one write, not N.
+"""
+import asyncio
+import math
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class PlaylistSegment:
+    sequence: int
+    url: str
+    duration: float
+    uploadedAt: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _entry(seg: PlaylistSegment) -> str:
+    return f"#EXTINF:{seg.duration:.3f},\n{seg.url}\n"
+
+
+class HlsPlaylist:
+    def __init__(self, default_duration: float = 5.0):
+        self.default_duration = default_duration
+        self._sequences: List[int] = []   # publish order
+        self._segments: Dict[int, PlaylistSegment] = {}
+        self._body = ""
+        self._max_duration = 0.0
+        self.late = 0   # segments published after a higher sequence number
+        self.ended = False
+
+    def __len__(self) -> int:
+        return len(self._sequences)
+
+    def next_sequence(self) -> int:
+        return max(self._sequences) + 1 if self._sequences else 0
+
+    def segments(self) -> List[PlaylistSegment]:
+        return [self._segments[s] for s in self._sequences]
+
+    def get(self, sequence: int) -> Optional[PlaylistSegment]:
+        return self._segments.get(sequence)
+
+    def add(self, sequence: int, url: str, duration: Optional[float], uploaded_at: int) -> PlaylistSegment:
+        """
+        Publish a segment at the end of the playlist. Returns the segment as
+        published (the earlier one for a repeated sequence number).
+        """
+        if sequence in self._segments:
+            # client retry of a published segment: players may already have it
+            return self._segments[sequence]
+        seg = PlaylistSegment(
+            sequence=sequence,
+            url=url,
+            duration=duration if duration and duration > 0 else self.default_duration,
+            uploadedAt=uploaded_at,
+        )
+        self._max_duration = max(self._max_duration, seg.duration)
+        if self._sequences and sequence < max(self._sequences):
+            self.late += 1
+        self._sequences.append(sequence)
+        self._segments[sequence] = seg
+        self._body += _entry(seg)
+        return seg
+
+    def load(self, segments: List[dict]) -> None:
+        """
+        Replace the playlist contents with stored segment dicts
+        (sequence / url / duration / uploadedAt), e.g. after a restart.
+        """
+        self._segments = {
+            s["sequence"]: PlaylistSegment(s["sequence"], s["url"], s["duration"], s["uploadedAt"])
+            for s in segments
+        }
+        # upload order is publish order while live
+        if self.ended:
+            self._sequences = sorted(self._segments)
+        else:
+            self._sequences = sorted(self._segments, key=lambda s: (self._segments[s].uploadedAt, s))
+        self.late, highest = 0, -1
+        for s in self._sequences:
+            self.late += s < highest
+            highest = max(highest, s)
+        self._max_duration = max((s.duration for s in self._segments.values()), default=0.0)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._body = "".join(_entry(self._segments[s]) for s in self._sequences)
+
+    def end(self) -> None:
+        # a VOD playlist is written whole, so it can be in sequence order
+        self.ended = True
+        self._sequences.sort()
+        self._rebuild()
+
+    def _header(self, media_sequence: int, playlist_type: Optional[str]) -> str:
+        target = max(1, math.ceil(self._max_duration or self.default_duration))
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{target}",
+            f"#EXT-X-MEDIA-SEQUENCE:{media_sequence}",
+        ]
+        if playlist_type:
+            lines.append(f"#EXT-X-PLAYLIST-TYPE:{playlist_type}")
+        return "\n".join(lines) + "\n"
+
+    def render_index(self) -> str:
+        """
+        Full playlist: EVENT (append-only) while live, VOD once ended.
+        """
+        text = self._header(0, "VOD" if self.ended else "EVENT") + self._body
+        if self.ended:
+            text += "#EXT-X-ENDLIST\n"
+        return text
+
+    def render_live(self, window: int) -> str:
+        """
+        Sliding-window playlist over the last `window` segments.
+        """
+        start = max(0, len(self._sequences) - window)
+        body = "".join(_entry(self._segments[s]) for s in self._sequences[start:])
+        text = self._header(start, None) + body
+        if self.ended:
+            text += "#EXT-X-ENDLIST\n"
+        return text
+
+
+class PlaylistPublisher:
+    """
+    Debounced single-writer for one candidate's playlists.
+
+    `put(key, text)` is an async callable that uploads one playlist object.
+    """
+
+    def __init__(
+        self,
+        playlist: HlsPlaylist,
+        put: Callable[[str, str], Awaitable[None]],
+        index_key: str,
+        live_key: str,
+        live_window: int = 6,
+        debounce_seconds: float = 0.25,
+    ):
+        self.playlist = playlist
+        self._put = put
+        self.index_key = index_key
+        self.live_key = live_key
+        self.live_window = live_window
+        self.debounce_seconds = debounce_seconds
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self.requested = 0
+        self.writes = 0
+
+    def mark_dirty(self) -> None:
+        self.requested += 1
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        await self._drain()
+
+    async def _drain(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            try:
+                await self._write()
+            except Exception as e:
+                print("Failed to publish HLS playlist:", self.index_key, e)
+
+    async def _write(self) -> None:
+        index_text = self.playlist.render_index()
+        live_text = self.playlist.render_live(self.live_window)
+        await asyncio.gather(
+            self._put(self.index_key, index_text),
+            self._put(self.live_key, live_text),
+        )
+        self.writes += 1
+
+    async def finalize(self) -> None:
+        """
+        Mark the recording finished and write the VOD playlist now.
+        """
+        self.playlist.end()
+        self._dirty = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._drain()
+
+    def stats(self) -> Dict:
+        return {
+            "segments": len(self.playlist),
+            "ended": self.playlist.ended,
+            "late_segments": self.playlist.late,
+            "write_requests": self.requested,
+            "writes": self.writes,
+        }
@@ -0,0 +1,244 @@
+"""
+Shared, pooled HTTP clients for outbound API calls.
+
+Every upstream host gets one long-lived `httpx.Client` with keep-alive and
+its own connection limit, so repeated calls (realtime session creation,
+Drive metadata/downloads, OpenAI SDK calls) reuse warm TCP+TLS connections
+instead of handshaking every time. httpx clients are thread-safe, so the
+executor pools can share them.
+
+Pool sizes:   HTTP_POOL_SIZE (default 20), or per host with
+              HTTP_POOL_<HOST>, e.g. HTTP_POOL_API_OPENAI_COM=32
+HTTP/2:       HTTP2=1 (needs the `h2` package; falls back to HTTP/1.1)
+
+`DriveHttp` adapts a pooled client to the httplib2 interface that
+googleapiclient expects and signs requests with google-auth credentials,
+replacing the single shared (and not thread-safe) httplib2 connection.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2", "0") == "1" and HTTP2_AVAILABLE
+
+
+def _pool_size(host: str) -> int:
+    env = "HTTP_POOL_" + host.upper().replace(".", "_").replace("-", "_")
+    return int(os.getenv(env, str(DEFAULT_POOL_SIZE)))
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """
+    HTTP transport that records in-flight/total requests, so calls made
+    through any client on it (including the OpenAI SDK) are counted.
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.monotonic()
+        try:
+            return super().handle_request(request)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.requests += 1
+                self.total_seconds += time.monotonic() - started
+
+    def connections(self) -> Dict[str, int]:
+        # httpcore internals; best effort
+        conns = list(getattr(self._pool, "connections", []) or [])
+        idle = sum(1 for c in conns if getattr(c, "is_idle", lambda: False)())
+        return {"open": len(conns), "idle": idle, "active": len(conns) - idle}
+
+
+class PooledClient:
+    """
+    One keep-alive connection pool for a single upstream host.
+    `client` is a plain httpx.Client and can be handed to SDKs directly.
+    """
+
+    def __init__(self, host: str, pool_size: int, timeout: float = 60.0, http2: bool = HTTP2_ENABLED):
+        self.host = host
+        self.pool_size = pool_size
+        self.http2 = http2
+        self.transport = CountingTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        self.client = httpx.Client(transport=self.transport, timeout=timeout)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        return self.client.request(method, url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        t = self.transport
+        with t._lock:
+            avg = t.total_seconds / t.requests if t.requests else 0.0
+            out = {
+                "pool_size": self.pool_size,
+                "http2": self.http2,
+                "in_flight": t.in_flight,
+                "peak_in_flight": t.peak_in_flight,
+                "utilization": round(t.in_flight / self.pool_size, 3) if self.pool_size else 0.0,
+                "requests": t.requests,
+                "errors": t.errors,
+                "avg_seconds": round(avg, 4),
+            }
+        out["connections"] = t.connections()
+        return out
+
+    def close(self) -> None:
+        self.client.close()
+
+
+_clients: Dict[str, PooledClient] = {}
+_clients_lock = threading.Lock()
+_response_hooks: Dict[str, List[Callable[[httpx.Response], None]]] = {}
+
+
+def _host(host_or_url: str) -> str:
+    return urlsplit(host_or_url).hostname if "://" in host_or_url else host_or_url
+
+
+def get_client(host_or_url: str) -> PooledClient:
+    host = _host(host_or_url)
+    with _clients_lock:
+        c = _clients.get(host)
+        if c is None:
+            c = PooledClient(host, _pool_size(host))
+            c.client.event_hooks["response"].extend(_response_hooks.get(host, ()))
+            _clients[host] = c
+        return c
+
+
+def add_response_hook(host_or_url: str, hook: Callable[[httpx.Response], None]) -> None:
+    """
+    Run `hook(response)` for every response from this host. The client is
+    not created here, so registering a hook at import time is free.
+    """
+    host = _host(host_or_url)
+    with _clients_lock:
+        _response_hooks.setdefault(host, []).append(hook)
+        c = _clients.get(host)
+        if c is not None:
+            c.client.event_hooks["response"].append(hook)
+
+
+def http_stats() -> Dict[str, Any]:
+    with _clients_lock:
+        clients = dict(_clients)
+    return {host: c.stats() for host, c in clients.items()}
+
+
+def close_clients() -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        c.close()
+
+
+# ---------------- google-auth / googleapiclient adapters ----------------
+class _AuthResponse:
+    def __init__(self, resp: httpx.Response):
+        self.status = resp.status_code
+        self.headers = resp.headers
+        self.data = resp.content
+
+
+class GoogleAuthRequest:
+    """
+    google.auth.transport.Request over the pooled clients (token refresh).
+    """
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        from google.auth import exceptions
+
+        try:
+            resp = get_client(url).request(method, url, content=body, headers=headers, timeout=timeout or 60)
+        except httpx.HTTPError as e:
+            raise exceptions.TransportError(e) from e
+        return _AuthResponse(resp)
+
+
+class DriveHttp:
+    """
+    httplib2.Http look-alike for googleapiclient: requests go through the
+    pooled client for the target host and carry the credentials' bearer token.
+    """
+
+    def __init__(self, credentials: Any, timeout: float = 120.0):
+        self.credentials = credentials
+        self.timeout = timeout
+        self._auth_request = GoogleAuthRequest()
+        self._refresh_lock = threading.Lock()
+
+    def _authorize(self, method: str, uri: str, headers: Dict[str, str]) -> None:
+        if not self.credentials.valid:
+            with self._refresh_lock:
+                if not self.credentials.valid:
+                    self.credentials.refresh(self._auth_request)
+        self.credentials.apply(headers)
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        headers = dict(headers or {})
+        self._authorize(method, uri, headers)
+        resp = get_client(uri).request(
+            method, uri, content=body, headers=headers, timeout=self.timeout, follow_redirects=redirections > 0
+        )
+        if resp.status_code == 401:
+            # token expired between check and use: refresh once and retry
+            with self._refresh_lock:
+                self.credentials.refresh(self._auth_request)
+            self.credentials.apply(headers)
+            resp = get_client(uri).request(
+                method, uri, content=body, headers=headers, timeout=self.timeout, follow_redirects=redirections > 0
+            )
+
+        # httpx has already decoded the body, so drop the encoding headers
+        info = {k.lower(): v for k, v in resp.headers.items() if k.lower() not in ("content-encoding", "content-length")}
+        info["content-length"] = str(len(resp.content))
+        info["status"] = str(resp.status_code)
+        return httplib2.Response(info), resp.content
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,432 @@
+"""
+Append-only archive for finished interview transcripts (data/interviews.jsonl).
+
+Writing:
+    One writer task per process drains a queue of records and writes them in
+    batches: one locked append + one fsync per batch (group commit) instead
+    of an open/append per record. When the active file passes
+    `rotate_bytes` it is rotated to interviews.<n>.jsonl, or to
+    interviews.<n>.jsonl.gz when compression is on. Each record becomes its
+    own gzip member, so a record can still be read with one seek.
+
+Index:
+    interviews.index.jsonl is a sidecar with one line per record:
+    {"id", "segment", "offset", "length"}. The last line for an id wins.
+    Reading one interview is an index lookup plus a single seek/read.
+    On open, records appended to the active file after its last index
+    entry (a crash between the data write and the index append) are
+    indexed, and torn last lines in either file are dropped.
+
+Reading (for analysis code):
+    archive = InterviewArchive(DATA_DIR)
+    archive.get(candidate_id)    -> latest record or None
+    archive.iter_records()       -> every record, oldest segment first
+
+The active file keeps its old name, so anything that still scans
+interviews.jsonl directly sees the records written since the last rotation.
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer process only
+    fcntl = None
+
+from executors import run_in
+
+ACTIVE_NAME = "interviews.jsonl"
+INDEX_NAME = "interviews.index.jsonl"
+LOCK_NAME = "interviews.lock"
+SEGMENT_RE = re.compile(r"^interviews\.(\d{6})\.jsonl(\.gz)?$")
+
+
+class _FileLock:
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fh = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._fh = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+        finally:
+            self._thread_lock.release()
+
+
+class InterviewArchive:
+    def __init__(self, directory: Path, rotate_bytes: int = 64 * 1024 * 1024, compress: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.active_path = self.directory / ACTIVE_NAME
+        self.index_path = self.directory / INDEX_NAME
+        self.rotate_bytes = rotate_bytes
+        self.compress = compress
+        self._lock = _FileLock(self.directory / LOCK_NAME)
+
+        self._index: Dict[str, Tuple[str, int, int]] = {}
+        self._index_pos = 0
+        self._index_guard = threading.Lock()
+
+        if not self.index_path.exists() and (self.active_path.exists() or self._segments()):
+            self.rebuild_index()
+        elif self.active_path.exists():
+            self._recover_index()
+
+    # ---------- writing (blocking; call from a worker thread) ----------
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        lines = [(json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in records]
+        with self._lock:
+            with open(self.active_path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+            entries = []
+            for rec, line in zip(records, lines):
+                entries.append({"id": str(rec.get("id", "")), "segment": ACTIVE_NAME, "offset": offset, "length": len(line)})
+                offset += len(line)
+            self._append_index(entries)
+
+            if self.rotate_bytes > 0 and offset >= self.rotate_bytes:
+                self._rotate()
+
+    def _append_index(self, entries: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")
+        with open(self.index_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _segments(self) -> List[Path]:
+        found = []
+        for p in self.directory.iterdir():
+            m = SEGMENT_RE.match(p.name)
+            if m:
+                found.append((int(m.group(1)), p))
+        return [p for _, p in sorted(found)]
+
+    def _rotate(self) -> None:
+        """
+        Move the active file to the next numbered segment. Caller holds the lock.
+        """
+        segments = self._segments()
+        number = int(SEGMENT_RE.match(segments[-1].name).group(1)) + 1 if segments else 1
+        base = f"interviews.{number:06d}.jsonl"
+
+        entries = []
+        if self.compress:
+            target = self.directory / (base + ".gz")
+            tmp = target.with_suffix(".gz.tmp")
+            offset = 0
+            with open(self.active_path, "rb") as src, open(tmp, "wb") as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    member = gzip.compress(line)
+                    dst.write(member)
+                    entries.append({"id": _record_id(line), "segment": target.name, "offset": offset, "length": len(member)})
+                    offset += len(member)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp, target)
+            self._append_index(entries)
+            os.remove(self.active_path)
+        else:
+            target = self.directory / base
+            offset = 0
+            with open(self.active_path, "rb") as src:
+                for line in src:
+                    if line.strip():
+                        entries.append({"id": _record_id(line), "segment": target.name, "offset": offset, "length": len(line)})
+                    offset += len(line)
+            os.replace(self.active_path, target)
+            self._append_index(entries)
+        print(f"[archive] rotated {ACTIVE_NAME} -> {target.name} ({len(entries)} records)")
+
+    def _recover_index(self) -> int:
+        """
+        Index records in the active file past its last index entry. Returns
+        the number of records added.
+        """
+        with self._lock:
+            active_end = 0
+            valid = 0
+            with open(self.index_path, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    valid += len(raw)
+                    try:
+                        e = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if e.get("segment") == ACTIVE_NAME:
+                        active_end = max(active_end, e["offset"] + e["length"])
+                    else:
+                        active_end = 0  # rotated: the active file started over
+            if valid < self.index_path.stat().st_size:
+                with open(self.index_path, "r+b") as f:
+                    f.truncate(valid)
+            with open(self.active_path, "r+b") as f:
+                # a torn record from a crashed write would swallow the next append
+                f.seek(active_end)
+                tail = f.read()
+                cut = tail.rfind(b"\n") + 1
+                if cut < len(tail):
+                    f.truncate(active_end + cut)
+            entries = [
+                {"id": rec_id, "segment": ACTIVE_NAME, "offset": offset, "length": length}
+                for rec_id, offset, length in _scan_segment(self.active_path, start=active_end)
+                if rec_id
+            ]
+            if entries:
+                self._append_index(entries)
+                print(f"[archive] indexed {len(entries)} record(s) missing from {INDEX_NAME}")
+            return len(entries)
+
+    def rebuild_index(self) -> int:
+        """
+        Rebuild the sidecar index by scanning every segment. Returns the
+        number of records indexed.
+        """
+        with self._lock:
+            entries = []
+            for path in self._segments() + ([self.active_path] if self.active_path.exists() else []):
+                for rec_id, offset, length in _scan_segment(path):
+                    entries.append({"id": rec_id, "segment": path.name, "offset": offset, "length": length})
+            tmp = self.index_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in entries:
+                    f.write(json.dumps(e) + "\n")
+            os.replace(tmp, self.index_path)
+        with self._index_guard:
+            self._index.clear()
+            self._index_pos = 0
+        return len(entries)
+
+    # ---------- reading ----------
+    def _refresh_index(self) -> None:
+        with self._index_guard:
+            try:
+                size = self.index_path.stat().st_size
+            except FileNotFoundError:
+                return
+            if size < self._index_pos:
+                # index was rebuilt underneath us
+                self._index.clear()
+                self._index_pos = 0
+            if size == self._index_pos:
+                return
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_pos)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # partial line from a concurrent writer
+                    self._index_pos += len(raw)
+                    try:
+                        e = json.loads(raw)
+                    except ValueError:
+                        continue
+                    self._index[e["id"]] = (e["segment"], e["offset"], e["length"])
+
+    def locate(self, candidate_id: str) -> Optional[Tuple[str, int, int]]:
+        self._refresh_index()
+        return self._index.get(candidate_id)
+
+    def get(self, candidate_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Latest archived record for `candidate_id`, via one seek + read.
+        """
+        for _ in range(2):
+            loc = self.locate(candidate_id)
+            if loc is None:
+                return None
+            segment, offset, length = loc
+            try:
+                with open(self.directory / segment, "rb") as f:
+                    f.seek(offset)
+                    raw = f.read(length)
+                if segment.endswith(".gz"):
+                    raw = gzip.decompress(raw)
+                return json.loads(raw)
+            except (FileNotFoundError, ValueError, OSError):
+                # rotated between index read and file read: refresh and retry
+                continue
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        self._refresh_index()
+        segments = self._segments()
+        return {
+            "records": len(self._index),
+            "segments": [p.name for p in segments],
+            "active_bytes": self.active_path.stat().st_size if self.active_path.exists() else 0,
+            "rotate_bytes": self.rotate_bytes,
+            "compress": self.compress,
+        }
+
+    def ids(self) -> List[str]:
+        self._refresh_index()
+        return list(self._index)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every archived record, oldest first, without loading whole files.
+        """
+        paths = self._segments() + [self.active_path]
+        for path in paths:
+            if not path.exists():
+                continue
+            opener = gzip.open if path.name.endswith(".gz") else open
+            with opener(path, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+def _record_id(line: bytes) -> str:
+    try:
+        return str(json.loads(line).get("id", ""))
+    except ValueError:
+        return ""
+
+
+def _scan_segment(path: Path, start: int = 0) -> Iterator[Tuple[str, int, int]]:
+    """
+    (id, offset, length) per record. `start` (plain segments only) skips
+    that many bytes; a torn last line without a newline is left out.
+    """
+    if path.name.endswith(".gz"):
+        # one gzip member per record: walk members by decompressing each
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            d = zlib.decompressobj(31)
+            line = d.decompress(data[offset:])
+            used = len(data) - offset - len(d.unused_data)
+            yield _record_id(line), offset, used
+            offset += used
+        return
+    offset = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                yield _record_id(line), offset, len(line)
+            offset += len(line)
+
+
+class ArchiveWriter:
+    """
+    Single writer task per process: `await writer.append(rec)` resolves once
+    the record's batch is on disk (fsynced).
+    """
+
+    def __init__(self, archive: InterviewArchive, max_batch: int = 64, max_delay: float = 0.02):
+        self.archive = archive
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.records = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    async def append(self, rec: Dict[str, Any]) -> None:
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((rec, fut))
+        await fut
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # give concurrent appends a moment to join this commit
+            await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                nxt = self._queue.get_nowait()
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            try:
+                await run_in("disk", self.archive.write_batch, [rec for rec, _ in batch])
+                self.batches += 1
+                self.records += len(batch)
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "records": self.records,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Interview archive tools")
+    parser.add_argument("command", choices=["reindex", "get", "count"])
+    parser.add_argument("candidate_id", nargs="?")
+    parser.add_argument("--dir", default=str(Path(__file__).parent / "data"))
+    args = parser.parse_args()
+
+    archive = InterviewArchive(Path(args.dir))
+    if args.command == "reindex":
+        print(f"indexed {archive.rebuild_index()} records")
+    elif args.command == "get":
+        print(json.dumps(archive.get(args.candidate_id or ""), ensure_ascii=False, indent=2))
+    else:
+        print(len(archive.ids()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Per-interview event feed with cursors, for push updates to proctor dashboards.
+
+Every new segment or status change is appended to the interview store's
+`events` table; its AUTOINCREMENT key is the cursor. Readers ask for
+"everything after cursor N" and can wait (long-poll / SSE) until something
+new lands, instead of polling and re-downloading the full segment list.
+
+Waiters in this process are woken immediately on publish; events written
+by other worker processes are picked up by re-checking the store every
+`recheck_seconds`.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+from executors import run_in
+from interview_store import InterviewStore
+
+
+class InterviewEventHub:
+    def __init__(self, store: InterviewStore, recheck_seconds: float = 1.0):
+        self.store = store
+        self.recheck_seconds = recheck_seconds
+        self._wakeups: Dict[str, asyncio.Event] = {}
+
+    async def cursor(self, candidate_id: str) -> int:
+        return await run_in("disk", self.store.latest_cursor, candidate_id)
+
+    async def publish(self, candidate_id: str, kind: str, data: Dict[str, Any]) -> int:
+        cursor = await run_in("disk", self.store.append_event, candidate_id, kind, data)
+
+        # wake everyone waiting on this candidate in this process
+        wakeup = self._wakeups.pop(candidate_id, None)
+        if wakeup is not None:
+            wakeup.set()
+        return cursor
+
+    async def events_since(self, candidate_id: str, since: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Returns (events, latest_cursor, truncated). `truncated` means the
+        caller's cursor is not one this store issued (e.g. the database was
+        reset) and it should re-fetch a full snapshot.
+        """
+        events, latest = await run_in("disk", self.store.events_since, candidate_id, since)
+        if not events and since > latest:
+            return [], latest, True
+        return events, latest, False
+
+    async def wait(self, candidate_id: str, since: int, timeout: float) -> Tuple[List[Dict[str, Any]], int, bool]:
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            events, latest, truncated = await self.events_since(candidate_id, since)
+            remaining = deadline - time.monotonic()
+            if events or truncated or remaining <= 0:
+                return events, latest, truncated
+            wakeup = self._wakeups.setdefault(candidate_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(wakeup.wait(), min(remaining, self.recheck_seconds))
+            except asyncio.TimeoutError:
+                pass
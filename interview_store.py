@@ -0,0 +1,236 @@
+"""
+Durable store for live interview state (SQLite, WAL mode).
+
+Replaces the in-process MOBILE_INTERVIEWS dict / INTERVIEW_ATTEMPTS list so
+that in-progress premises recordings survive a restart and several uvicorn
+workers can share the same state.
+
+Tables:
+    attempts  - one row per interview attempt ("dev" or "mobile"),
+                indexed by id (primary key), status and (kind, created_at)
+    segments  - premises segments, keyed by (attempt_id, sequence)
+    events    - append-only segment/status change log; the AUTOINCREMENT
+                key is the cursor used by /segments?since= and /events
+
+Each thread gets its own connection; WAL lets readers run alongside the
+single writer, and busy_timeout makes concurrent writers from other worker
+processes queue instead of failing.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id                  TEXT PRIMARY KEY,
+    kind                TEXT NOT NULL,
+    candidate_name      TEXT NOT NULL,
+    job_title           TEXT NOT NULL,
+    status              TEXT NOT NULL DEFAULT 'PENDING',
+    premises_video_path TEXT,
+    room_name           TEXT,
+    egress_id           TEXT,
+    created_at          REAL NOT NULL,
+    updated_at          REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_status ON attempts(status);
+CREATE INDEX IF NOT EXISTS attempts_kind_created ON attempts(kind, created_at);
+
+CREATE TABLE IF NOT EXISTS segments (
+    attempt_id  TEXT NOT NULL,
+    sequence    INTEGER NOT NULL,
+    url         TEXT NOT NULL,
+    duration    REAL NOT NULL,
+    uploaded_at INTEGER NOT NULL,
+    PRIMARY KEY (attempt_id, sequence)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    cursor     INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id TEXT NOT NULL,
+    type       TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_attempt_cursor ON events(attempt_id, cursor);
+"""
+
+# column name <-> API field name (the camelCase the Node port used)
+FIELD_COLUMNS = {
+    "candidateName": "candidate_name",
+    "jobTitle": "job_title",
+    "status": "status",
+    "premisesVideoPath": "premises_video_path",
+    "roomName": "room_name",
+    "egressId": "egress_id",
+}
+
+
+def _attempt_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "candidateName": row["candidate_name"],
+        "jobTitle": row["job_title"],
+        "status": row["status"],
+        "premisesVideoPath": row["premises_video_path"],
+        "roomName": row["room_name"],
+        "egressId": row["egress_id"],
+        "createdAt": row["created_at"],
+    }
+
+
+def _segment_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "sequence": row["sequence"],
+        "url": row["url"],
+        "duration": row["duration"],
+        "uploadedAt": row["uploaded_at"],
+    }
+
+
+class InterviewStore:
+    def __init__(self, path: Path, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            self._local.conn = conn
+        return conn
+
+    # ---------- attempts ----------
+    def create_attempt(self, attempt: Dict[str, Any], kind: str) -> bool:
+        """
+        Insert a new attempt. Returns False if the id already exists
+        (e.g. another worker created it first).
+        """
+        now = time.time()
+        cur = self._conn().execute(
+            """
+            INSERT OR IGNORE INTO attempts
+                (id, kind, candidate_name, job_title, status, premises_video_path,
+                 room_name, egress_id, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                attempt["id"],
+                kind,
+                str(attempt.get("candidateName") or ""),
+                str(attempt.get("jobTitle") or ""),
+                attempt.get("status") or "PENDING",
+                attempt.get("premisesVideoPath"),
+                attempt.get("roomName"),
+                attempt.get("egressId"),
+                now,
+                now,
+            ),
+        )
+        return cur.rowcount == 1
+
+    def get_attempt(self, attempt_id: str, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if kind is None:
+            row = self._conn().execute("SELECT * FROM attempts WHERE id = ?", (attempt_id,)).fetchone()
+        else:
+            row = self._conn().execute(
+                "SELECT * FROM attempts WHERE id = ? AND kind = ?", (attempt_id, kind)
+            ).fetchone()
+        return _attempt_from_row(row) if row else None
+
+    def latest_attempt(self, kind: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM attempts WHERE kind = ? ORDER BY created_at DESC LIMIT 1", (kind,)
+        ).fetchone()
+        return _attempt_from_row(row) if row else None
+
+    def list_attempts(self, kind: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(f"SELECT * FROM attempts {where} ORDER BY created_at", params).fetchall()
+        return [_attempt_from_row(r) for r in rows]
+
+    def update_attempt(self, attempt_id: str, **fields: Any) -> None:
+        sets, params = [], []
+        for name, value in fields.items():
+            sets.append(f"{FIELD_COLUMNS[name]} = ?")
+            params.append(value)
+        if not sets:
+            return
+        sets.append("updated_at = ?")
+        params.extend([time.time(), attempt_id])
+        self._conn().execute(f"UPDATE attempts SET {', '.join(sets)} WHERE id = ?", params)
+
+    def promote_status(self, attempt_id: str, from_status: str, to_status: str) -> bool:
+        """
+        Compare-and-set on status; True if this call made the change.
+        """
+        cur = self._conn().execute(
+            "UPDATE attempts SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (to_status, time.time(), attempt_id, from_status),
+        )
+        return cur.rowcount == 1
+
+    # ---------- segments ----------
+    def upsert_segment(self, attempt_id: str, segment: Dict[str, Any]) -> None:
+        self._conn().execute(
+            """
+            INSERT INTO segments (attempt_id, sequence, url, duration, uploaded_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (attempt_id, sequence) DO UPDATE SET
+                url = excluded.url, duration = excluded.duration, uploaded_at = excluded.uploaded_at
+            """,
+            (attempt_id, segment["sequence"], segment["url"], segment["duration"], segment["uploadedAt"]),
+        )
+
+    def list_segments(self, attempt_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT * FROM segments WHERE attempt_id = ? ORDER BY sequence", (attempt_id,)
+        ).fetchall()
+        return [_segment_from_row(r) for r in rows]
+
+    def segment_count(self, attempt_id: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM segments WHERE attempt_id = ?", (attempt_id,)
+        ).fetchone()[0]
+
+    # ---------- events ----------
+    def append_event(self, attempt_id: str, kind: str, data: Dict[str, Any]) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO events (attempt_id, type, data, created_at) VALUES (?, ?, ?, ?)",
+            (attempt_id, kind, json.dumps(data, ensure_ascii=False), time.time()),
+        )
+        return cur.lastrowid
+
+    def latest_cursor(self, attempt_id: str) -> int:
+        row = self._conn().execute(
+            "SELECT MAX(cursor) FROM events WHERE attempt_id = ?", (attempt_id,)
+        ).fetchone()
+        return row[0] or 0
+
+    def events_since(self, attempt_id: str, since: int, limit: int = 1000) -> Tuple[List[Dict[str, Any]], int]:
+        rows = self._conn().execute(
+            "SELECT cursor, type, data FROM events WHERE attempt_id = ? AND cursor > ? ORDER BY cursor LIMIT ?",
+            (attempt_id, since, limit),
+        ).fetchall()
+        events = [{"cursor": r["cursor"], "type": r["type"], "data": json.loads(r["data"])} for r in rows]
+        latest = events[-1]["cursor"] if events else self.latest_cursor(attempt_id)
+        return events, latest
@@ -0,0 +1,180 @@
+"""
+Incremental MP4 duration probe.
+
+Fed the bytes of an MP4 as they stream past (see spaces_upload's `tap`),
+it walks the top-level boxes, skips media payloads (mdat) without buffering
+them and parses only the small header boxes:
+
+- moov/mvhd  -> movie duration / timescale (regular MP4)
+- moov/mvex/mehd -> fragment duration (fragmented MP4 with a known total)
+- sidx       -> sum of subsegment durations (fragmented MP4)
+"""
+import struct
+from typing import Optional
+
+# never buffer a header box bigger than this (moov for a short segment is a few KB)
+MAX_HEADER_BOX_BYTES = 4 * 1024 * 1024
+BUFFERED_BOXES = {b"moov", b"sidx"}
+CONTAINER_BOXES = {b"moov", b"mvex"}
+
+
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None):
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _parse_mvhd(data: bytes, start: int):
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", data[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack(">II", data[start + 12:start + 20])
+    return timescale, duration
+
+
+def _parse_mehd(data: bytes, start: int) -> int:
+    if data[start] == 1:
+        return struct.unpack(">Q", data[start + 4:start + 12])[0]
+    return struct.unpack(">I", data[start + 4:start + 8])[0]
+
+
+def _parse_sidx(data: bytes, start: int, end: int) -> Optional[float]:
+    version = data[start]
+    timescale = struct.unpack(">I", data[start + 8:start + 12])[0]
+    pos = start + 12 + (16 if version == 1 else 8) + 2
+    if pos + 2 > end or not timescale:
+        return None
+    count = struct.unpack(">H", data[pos:pos + 2])[0]
+    pos += 2
+    total = 0
+    for _ in range(count):
+        if pos + 12 > end:
+            break
+        total += struct.unpack(">I", data[pos + 4:pos + 8])[0]
+        pos += 12
+    return total / timescale
+
+
+class Mp4DurationProbe:
+    def __init__(self):
+        self._buf = bytearray()
+        self._skip = 0
+        self._box_type: Optional[bytes] = None
+        self._box_remaining = 0
+        self._box_data = bytearray()
+        self._broken = False
+
+        self.timescale = 0
+        self.movie_duration = 0
+        self.fragment_duration = 0
+        self.sidx_seconds = 0.0
+
+    def feed(self, data: bytes) -> None:
+        if self._broken:
+            return
+        view = memoryview(data)
+        while view:
+            if self._skip:
+                n = min(self._skip, len(view))
+                self._skip -= n
+                view = view[n:]
+                continue
+            if self._box_type is not None:
+                n = min(self._box_remaining, len(view))
+                self._box_data += view[:n]
+                self._box_remaining -= n
+                view = view[n:]
+                if self._box_remaining == 0:
+                    self._handle_box(self._box_type, bytes(self._box_data))
+                    self._box_type = None
+                    self._box_data = bytearray()
+                continue
+
+            # reading a box header
+            need = 8 - len(self._buf) if len(self._buf) < 8 else 0
+            if need:
+                self._buf += view[:need]
+                view = view[need:]
+                if len(self._buf) < 8:
+                    return
+            size, box_type = struct.unpack(">I4s", bytes(self._buf[:8]))
+            header = 8
+            if size == 1:
+                need = 16 - len(self._buf)
+                if need:
+                    self._buf += view[:need]
+                    view = view[need:]
+                    if len(self._buf) < 16:
+                        return
+                size = struct.unpack(">Q", bytes(self._buf[8:16]))[0]
+                header = 16
+            self._buf = bytearray()
+
+            if size == 0:
+                # box runs to end of file: nothing after it we could use
+                self._broken = True
+                return
+            payload = size - header
+            if payload < 0:
+                self._broken = True
+                return
+            if box_type in BUFFERED_BOXES and payload <= MAX_HEADER_BOX_BYTES:
+                self._box_type = box_type
+                self._box_remaining = payload
+                if payload == 0:
+                    self._box_type = None
+            else:
+                self._skip = payload
+
+    def _handle_box(self, box_type: bytes, payload: bytes) -> None:
+        try:
+            if box_type == b"sidx":
+                seconds = _parse_sidx(payload, 0, len(payload))
+                if seconds:
+                    self.sidx_seconds += seconds
+            elif box_type == b"moov":
+                self._walk_moov(payload, 0, len(payload))
+        except (struct.error, IndexError):
+            pass
+
+    def _walk_moov(self, data: bytes, start: int, end: int) -> None:
+        for box_type, s, e in _iter_boxes(data, start, end):
+            if box_type == b"mvhd":
+                self.timescale, self.movie_duration = _parse_mvhd(data, s)
+            elif box_type == b"mehd":
+                self.fragment_duration = _parse_mehd(data, s)
+            elif box_type in CONTAINER_BOXES:
+                self._walk_moov(data, s, e)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """
+        Duration in seconds, or None if the headers didn't carry one.
+        """
+        if self.timescale and self.movie_duration:
+            return self.movie_duration / self.timescale
+        if self.timescale and self.fragment_duration:
+            return self.fragment_duration / self.timescale
+        if self.sidx_seconds:
+            return self.sidx_seconds
+        return None
+
+
+def probe_mp4_duration(data: bytes) -> Optional[float]:
+    probe = Mp4DurationProbe()
+    probe.feed(data)
+    return probe.duration
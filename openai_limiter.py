@@ -0,0 +1,430 @@
+"""
+Process-wide rate limiting and retries for OpenAI calls.
+
+Every OpenAI call (resume structuring, /analyze, Whisper, realtime session
+creation) goes through `limiter.call(model, fn, ...)`, which
+
+- waits for a request slot and an estimated token budget for that model
+  (requests/min and tokens/min buckets, refilled continuously);
+- serves waiters in priority order: INTERACTIVE (/session, spoken
+  instructions) before BACKGROUND (analysis) before BULK (pre-warming);
+- adapts concurrency per model: +1 after a run of successes, halved on a
+  429 (AIMD);
+- retries 429 / 5xx / connection errors with jittered exponential backoff,
+  honouring Retry-After.
+
+The x-ratelimit-* response headers are fed back through `observe_response`
+(an httpx response hook on the OpenAI pool), so the buckets follow what
+the API actually reports instead of only our static limits.
+
+Limits: OPENAI_RATE_LIMITS='{"gpt-4o-mini": {"rpm": 500, "tpm": 200000}}'
+"""
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+INTERACTIVE = 0
+BACKGROUND = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", BULK: "bulk"}
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    OpenAI reset headers look like "1s", "6m0s", "120ms", "1h2m3.5s".
+    """
+    if not value:
+        return None
+    total = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total
+
+
+def _status_and_headers(obj: Any) -> Tuple[Optional[int], Any]:
+    """
+    Pull an HTTP status and headers from an SDK exception or a response.
+    """
+    status = getattr(obj, "status_code", None)
+    response = getattr(obj, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    headers = getattr(obj, "headers", None)
+    if headers is None and response is not None:
+        headers = getattr(response, "headers", None)
+    return status, headers
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value:
+            try:
+                seconds = float(value)
+            except ValueError:
+                continue
+            return seconds / 1000 if name == "retry-after-ms" else seconds
+    return None
+
+
+def estimate_tokens(*texts: str, completion: int = 0) -> int:
+    return sum(len(t or "") for t in texts) // 4 + completion
+
+
+class _ModelState:
+    def __init__(self, model: str, rpm: int, tpm: int, max_concurrency: int):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.refilled_at = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.concurrency = max(1, max_concurrency // 2)
+        self.in_flight = 0
+        self.successes = 0
+        self.blocked_until = 0.0
+        self.waiters: List[Tuple[int, int]] = []
+        self.throttled = 0
+        self.retries = 0
+        self.completed = 0
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.refilled_at
+        self.refilled_at = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60.0)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60.0)
+
+    def wait_for(self, need_tokens: int, now: float) -> float:
+        """
+        Seconds until one request of `need_tokens` could be admitted (0 = now).
+        """
+        waits = [self.blocked_until - now]
+        if self.requests < 1:
+            waits.append((1 - self.requests) * 60.0 / self.rpm)
+        if self.tokens < need_tokens:
+            waits.append((need_tokens - self.tokens) * 60.0 / self.tpm)
+        return max(0.0, *waits)
+
+
+class OpenAIRateLimiter:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, int]]] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 4,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 30.0,
+    ):
+        self.limits = limits or {}
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self._cond = threading.Condition()
+        self._models: Dict[str, _ModelState] = {}
+        self._seq = itertools.count()
+        self._local = threading.local()
+        # a context variable, so executors.submit carries it to pool threads
+        self._priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+            f"openai_priority_{id(self)}", default=None
+        )
+        self._wait_stats: Dict[int, Dict[str, float]] = {
+            p: {"waits": 0, "total_wait_s": 0.0, "max_wait_s": 0.0} for p in PRIORITY_NAMES
+        }
+
+    @classmethod
+    def from_env(cls) -> "OpenAIRateLimiter":
+        raw = os.getenv("OPENAI_RATE_LIMITS", "")
+        limits = json.loads(raw) if raw else {}
+        return cls(
+            limits=limits,
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "4")),
+        )
+
+    def _state(self, model: str) -> _ModelState:
+        st = self._models.get(model)
+        if st is None:
+            cfg = self.limits.get(model, {})
+            st = _ModelState(
+                model,
+                int(cfg.get("rpm", DEFAULT_RPM)),
+                int(cfg.get("tpm", DEFAULT_TPM)),
+                int(cfg.get("concurrency", self.max_concurrency)),
+            )
+            self._models[model] = st
+        return st
+
+    # ---------- priority scope ----------
+    @contextmanager
+    def priority(self, priority: int):
+        """
+        Default priority for calls made inside the block, including calls
+        handed to executor pools (they run in a copy of this context).
+        """
+        token = self._priority.set(priority)
+        try:
+            yield
+        finally:
+            self._priority.reset(token)
+
+    def current_priority(self) -> int:
+        """
+        The default priority in this context, for handing work to a thread
+        that does not inherit it.
+        """
+        priority = self._priority.get()
+        return INTERACTIVE if priority is None else priority
+
+    # ---------- slots ----------
+    def acquire(self, model: str, priority: int, tokens: int, timeout: Optional[float] = None) -> float:
+        """
+        Block until a request for `model` may start. Returns seconds waited.
+        """
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        with self._cond:
+            st = self._state(model)
+            need = min(max(0, tokens), st.tpm)
+            ticket = (priority, next(self._seq))
+            heapq.heappush(st.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    st.refill(now)
+                    wait = st.wait_for(need, now)
+                    if st.waiters[0] == ticket and wait == 0 and st.in_flight < st.concurrency:
+                        heapq.heappop(st.waiters)
+                        st.requests -= 1
+                        st.tokens -= need
+                        st.in_flight += 1
+                        break
+                    if deadline is not None and now >= deadline:
+                        raise RateLimitTimeout(f"Timed out waiting for {model} rate limit")
+                    timeout_s = min(wait or 0.25, 0.25)
+                    if deadline is not None:
+                        timeout_s = min(timeout_s, max(0.0, deadline - now))
+                    self._cond.wait(timeout_s)
+            except BaseException:
+                if ticket in st.waiters:
+                    st.waiters.remove(ticket)
+                    heapq.heapify(st.waiters)
+                    self._cond.notify_all()
+                raise
+
+            waited = time.monotonic() - started
+            ws = self._wait_stats.setdefault(priority, {"waits": 0, "total_wait_s": 0.0, "max_wait_s": 0.0})
+            ws["waits"] += 1
+            ws["total_wait_s"] += waited
+            ws["max_wait_s"] = max(ws["max_wait_s"], waited)
+            return waited
+
+    def release(self, model: str, throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        with self._cond:
+            st = self._state(model)
+            st.in_flight = max(0, st.in_flight - 1)
+            if throttled:
+                st.throttled += 1
+                st.concurrency = max(1, st.concurrency // 2)
+                st.successes = 0
+                if retry_after:
+                    st.blocked_until = max(st.blocked_until, time.monotonic() + retry_after)
+            else:
+                st.completed += 1
+                st.successes += 1
+                if st.successes >= st.concurrency and st.concurrency < st.max_concurrency:
+                    st.concurrency += 1
+                    st.successes = 0
+            self._cond.notify_all()
+
+    # ---------- header feedback ----------
+    def observe_headers(self, model: str, headers: Any) -> None:
+        if not headers:
+            return
+        try:
+            limit_req = headers.get("x-ratelimit-limit-requests")
+            limit_tok = headers.get("x-ratelimit-limit-tokens")
+            rem_req = headers.get("x-ratelimit-remaining-requests")
+            rem_tok = headers.get("x-ratelimit-remaining-tokens")
+            with self._cond:
+                st = self._state(model)
+                st.refill(time.monotonic())
+                if limit_req:
+                    st.rpm = max(1, int(limit_req))
+                if limit_tok:
+                    st.tpm = max(1, int(limit_tok))
+                # never trust our own bucket over what the server says is left
+                if rem_req is not None:
+                    st.requests = min(st.requests, float(rem_req))
+                if rem_tok is not None:
+                    st.tokens = min(st.tokens, float(rem_tok))
+                if rem_req is not None and float(rem_req) <= 0:
+                    reset = _parse_reset(headers.get("x-ratelimit-reset-requests"))
+                    if reset:
+                        st.blocked_until = max(st.blocked_until, time.monotonic() + reset)
+                self._cond.notify_all()
+        except (TypeError, ValueError):
+            pass
+
+    def observe_response(self, response: Any) -> None:
+        """
+        httpx response hook: attribute rate-limit headers to the model of
+        the call running on this thread.
+        """
+        model = getattr(self._local, "model", None)
+        if model:
+            self.observe_headers(model, response.headers)
+
+    # ---------- calls ----------
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after:
+            return retry_after + random.uniform(0, 0.25)
+        cap = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def call(
+        self,
+        model: str,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        priority: Optional[int] = None,
+        tokens: int = 0,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run `fn(*args, **kwargs)` under the limiter for `model`. Returned
+        responses with a retryable status (e.g. a raw httpx 429) are retried
+        like raised API errors.
+        """
+        return self._run(model, fn, args, kwargs, priority, tokens, hold=False)
+
+    @contextmanager
+    def streaming(
+        self,
+        model: str,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        priority: Optional[int] = None,
+        tokens: int = 0,
+        **kwargs: Any,
+    ) -> Iterator[Any]:
+        """
+        Like `call`, for results that keep the request running after `fn`
+        returns (stream=True): yields the result and holds the slot until
+        the block exits, so concurrency and the AIMD window count the whole
+        generation. A 429 raised while consuming counts as throttled.
+        """
+        result = self._run(model, fn, args, kwargs, priority, tokens, hold=True)
+        throttled, retry_after = False, None
+        try:
+            yield result
+        except Exception as e:
+            status, headers = _status_and_headers(e)
+            throttled, retry_after = status == 429, _retry_after(headers)
+            raise
+        finally:
+            self.release(model, throttled=throttled, retry_after=retry_after)
+
+    def _run(
+        self,
+        model: str,
+        fn: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        priority: Optional[int],
+        tokens: int,
+        hold: bool,
+    ) -> Any:
+        # hold=True: a successful result keeps its slot; the caller releases it
+        if priority is None:
+            priority = self._priority.get()
+            if priority is None:
+                priority = INTERACTIVE
+        attempt = 0
+        while True:
+            self.acquire(model, priority, tokens)
+            previous_model = getattr(self._local, "model", None)
+            self._local.model = model
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status, headers = _status_and_headers(e)
+                retryable = status in RETRYABLE_STATUS or (status is None and _is_connection_error(e))
+                retry_after = _retry_after(headers)
+                self.release(model, throttled=status == 429, retry_after=retry_after)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+            else:
+                status, headers = _status_and_headers(result)
+                if status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    if not hold:
+                        self.release(model)
+                    return result
+                retry_after = _retry_after(headers)
+                self.release(model, throttled=status == 429, retry_after=retry_after)
+            finally:
+                self._local.model = previous_model
+
+            with self._cond:
+                self._state(model).retries += 1
+            time.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            models = {}
+            for name, st in self._models.items():
+                st.refill(now)
+                models[name] = {
+                    "rpm": st.rpm,
+                    "tpm": st.tpm,
+                    "requests_available": round(st.requests, 1),
+                    "tokens_available": int(st.tokens),
+                    "concurrency": st.concurrency,
+                    "in_flight": st.in_flight,
+                    "queue_depth": {
+                        PRIORITY_NAMES.get(p, str(p)): sum(1 for w in st.waiters if w[0] == p)
+                        for p in PRIORITY_NAMES
+                    },
+                    "blocked_for_s": round(max(0.0, st.blocked_until - now), 2),
+                    "completed": st.completed,
+                    "throttled": st.throttled,
+                    "retries": st.retries,
+                }
+            waits = {
+                PRIORITY_NAMES.get(p, str(p)): {
+                    "waits": int(w["waits"]),
+                    "avg_wait_s": round(w["total_wait_s"] / w["waits"], 3) if w["waits"] else 0.0,
+                    "max_wait_s": round(w["max_wait_s"], 3),
+                }
+                for p, w in self._wait_stats.items()
+            }
+        return {"models": models, "waits": waits}
+
+
+def _is_connection_error(e: Exception) -> bool:
+    names = {cls.__name__ for cls in type(e).__mro__}
+    return bool(names & {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError"})
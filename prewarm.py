@@ -0,0 +1,148 @@
+"""
+Background pre-warming of JD/resume bundles for every roster row.
+
+Runs the resume download / extraction / LLM structuring for each candidate
+ahead of time so `/session` only has to read a persisted bundle.
+
+CLI:
+    python prewarm.py --workers 4 --retries 3
+    python prewarm.py --force          # rebuild even if a fresh bundle exists
+
+The same job can be started from the admin endpoint
+POST /api/admin/prewarm and polled with GET /api/admin/prewarm.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+
+class PrewarmJob:
+    """
+    `work(row)` does the actual pre-warming for one row and returns a short
+    outcome label ("built", "cached", "skipped"); any exception is retried
+    with exponential backoff and counted as a failure once retries run out.
+    `prepare(rows)`, if given, runs once before the workers start (e.g. to
+    batch-fetch what every row needs); its failure is logged, not fatal.
+    """
+
+    def __init__(
+        self,
+        rows: List[Dict],
+        work: Callable[[Dict], str],
+        workers: int = 4,
+        retries: int = 3,
+        backoff_seconds: float = 2.0,
+        prepare: Optional[Callable[[List[Dict]], None]] = None,
+    ):
+        self.id = f"prewarm-{uuid4().hex[:8]}"
+        self.rows = rows
+        self.work = work
+        self.workers = max(1, workers)
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.prepare = prepare
+
+        self._lock = threading.Lock()
+        self.state = "PENDING"   # "PENDING" | "RUNNING" | "COMPLETED"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = 0
+        self.outcomes: Dict[str, int] = {}
+        self.failures: List[Dict] = []
+        self.attempts = 0
+
+    def _row_id(self, row: Dict) -> str:
+        return str(row.get("Unique ID", "")).strip()
+
+    def _process(self, row: Dict) -> None:
+        row_id = self._row_id(row)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            with self._lock:
+                self.attempts += 1
+            try:
+                outcome = self.work(row)
+                with self._lock:
+                    self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+                    self.done += 1
+                return
+            except Exception as e:
+                last_error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff_seconds * (2 ** attempt))
+
+        print(f"[prewarm] {row_id} failed after {self.retries + 1} attempts: {last_error}")
+        with self._lock:
+            self.failures.append({"id": row_id, "error": str(last_error)})
+            self.done += 1
+
+    def run(self) -> Dict:
+        self.state = "RUNNING"
+        self.started_at = time.monotonic()
+        if self.prepare is not None:
+            try:
+                self.prepare(self.rows)
+            except Exception as e:
+                print(f"[prewarm] {self.id} prepare failed: {e}")
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prewarm") as pool:
+            list(pool.map(self._process, self.rows))
+        self.finished_at = time.monotonic()
+        self.state = "COMPLETED"
+        return self.progress()
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, name=self.id, daemon=True)
+        t.start()
+        return t
+
+    def progress(self) -> Dict:
+        with self._lock:
+            end = self.finished_at or time.monotonic()
+            elapsed = (end - self.started_at) if self.started_at else 0.0
+            return {
+                "job_id": self.id,
+                "state": self.state,
+                "total": len(self.rows),
+                "done": self.done,
+                "failed": len(self.failures),
+                "outcomes": dict(self.outcomes),
+                "attempts": self.attempts,
+                "elapsed_seconds": round(elapsed, 2),
+                "rows_per_sec": round(self.done / elapsed, 3) if elapsed > 0 else 0.0,
+                "failures": list(self.failures[-50:]),
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-warm JD/resume bundles for every roster row.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--force", action="store_true", help="rebuild bundles even if fresh")
+    parser.add_argument("--interval", type=float, default=5.0, help="progress report interval (s)")
+    args = parser.parse_args()
+
+    # server wires up Drive / OpenAI / caches from .env
+    import server
+
+    job = server.make_prewarm_job(workers=args.workers, retries=args.retries, force=args.force)
+    print(f"[prewarm] {job.id}: {len(job.rows)} rows, {job.workers} workers")
+    thread = job.start()
+    while thread.is_alive():
+        thread.join(args.interval)
+        p = job.progress()
+        print(
+            f"[prewarm] {p['done']}/{p['total']} done, {p['failed']} failed, "
+            f"{p['rows_per_sec']} rows/s, outcomes={p['outcomes']}"
+        )
+
+    p = job.progress()
+    for failure in p["failures"]:
+        print(f"[prewarm] FAILED {failure['id']}: {failure['error']}")
+    raise SystemExit(1 if p["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Compiler for the realtime interviewer instructions.
+
+A compiled prompt is
+
+    <static prefix>  +  <per-candidate tail>
+
+The prefix is the long rule text with only the job title filled in. It is
+rendered once per job title, cached, and byte-identical across sessions
+for the same role, so upstream prompt caching can reuse it. Everything
+candidate-specific (name, opening line, JD/resume context, spoken
+instructions) lives in the tail.
+
+The context is serialized as compact JSON without empty fields or
+duplicates. Optional reference material (bank questions and course
+competencies matched to the candidate) goes in an `interview_reference`
+group. The resume's `raw_text` is already a JSON dump of
+`parsed_sections`, so it is sent only when nothing was parsed. If prefix +
+tail exceed the token budget, the lowest-priority context sections are cut
+first: lists lose trailing items, text is shortened, and whole sections are
+dropped last.
+
+Token counts come from tiktoken when it is installed; otherwise they are
+estimated at ~4 bytes per token.
+"""
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+TRUNCATION_MARK = " …[truncated]"
+
+# higher = kept longer when the budget is tight
+JD_PRIORITY = 100
+RESUME_SECTION_PRIORITIES = {
+    "work_experience": 80,
+    "experience": 80,
+    "projects": 70,
+    "technical_skills": 60,
+    "skills": 60,
+    "tools": 55,
+    "education": 40,
+    "domains": 35,
+    "certifications": 20,
+}
+REFERENCE_PRIORITY = 50
+DEFAULT_SECTION_PRIORITY = 10
+
+
+def _encoder(encoding: str) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(encoding)
+    except Exception:
+        return None
+
+
+def make_token_counter(encoding: str = "o200k_base") -> Callable[[str], int]:
+    enc = _encoder(encoding)
+    if enc is not None:
+        return lambda text: len(enc.encode(text))
+    return lambda text: (len(text.encode("utf-8")) + 3) // 4
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def prune_empty(value: Any) -> Any:
+    """
+    Recursively drop None, blank strings, and empty lists/dicts.
+    Returns None when nothing is left.
+    """
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            v = prune_empty(v)
+            if v is not None:
+                out[k] = v
+        return out or None
+    if isinstance(value, list):
+        out = [v for v in (prune_empty(v) for v in value) if v is not None]
+        return out or None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+@dataclass
+class ContextSection:
+    path: Tuple[str, str]      # (top-level group, key), e.g. ("candidate_profile", "projects")
+    value: Any
+    priority: int
+
+
+def context_sections(
+    jd_json: dict,
+    resume_json: dict,
+    reference: Optional[Dict[str, Any]] = None,
+) -> List[ContextSection]:
+    """
+    Split JD + resume JSON (+ reference material) into prioritized,
+    de-duplicated sections.
+    """
+    sections: List[ContextSection] = []
+
+    for key, value in (jd_json or {}).items():
+        value = prune_empty(value)
+        if value is not None:
+            sections.append(ContextSection(("job_description", key), value, JD_PRIORITY))
+
+    resume_json = resume_json or {}
+    parsed = prune_empty(resume_json.get("parsed_sections")) or {}
+    for key, value in resume_json.items():
+        if key in ("parsed_sections", "full_name", "resume_url"):
+            # the name is in the opening line; the URL is not readable by the model
+            continue
+        if key == "raw_text":
+            raw = (value or "").strip()
+            if parsed or not raw or raw.startswith("(Failed to read resume"):
+                continue
+        value = prune_empty(value)
+        if value is not None:
+            sections.append(ContextSection(("candidate_profile", key), value, DEFAULT_SECTION_PRIORITY))
+
+    if isinstance(parsed, dict):
+        for key, value in parsed.items():
+            sections.append(ContextSection(
+                ("candidate_profile", key),
+                value,
+                RESUME_SECTION_PRIORITIES.get(key, DEFAULT_SECTION_PRIORITY),
+            ))
+
+    for key, value in (reference or {}).items():
+        value = prune_empty(value)
+        if value is not None:
+            sections.append(ContextSection(("interview_reference", key), value, REFERENCE_PRIORITY))
+    return sections
+
+
+@dataclass
+class CompiledPrompt:
+    text: str
+    prefix_tokens: int
+    total_tokens: int
+    budget_tokens: int
+    truncated: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "prefix_tokens": self.prefix_tokens,
+            "total_tokens": self.total_tokens,
+            "budget_tokens": self.budget_tokens,
+            "truncated": self.truncated,
+            "dropped": self.dropped,
+        }
+
+
+def _shrink_text(text: str, max_tokens: int, count: Callable[[str], int]) -> Optional[str]:
+    if max_tokens <= 0:
+        return None
+    tokens = count(text)
+    if tokens <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / tokens) - len(TRUNCATION_MARK)
+    while cut > 0:
+        candidate = text[:cut]
+        space = candidate.rfind(" ")
+        if space > cut // 2:
+            candidate = candidate[:space]
+        candidate += TRUNCATION_MARK
+        if count(compact_json(candidate)) <= max_tokens:
+            return candidate
+        cut = int(cut * 0.9)
+    return None
+
+
+def _shrink(value: Any, max_tokens: int, count: Callable[[str], int]) -> Optional[Any]:
+    """
+    Largest leading part of `value` whose compact JSON fits in `max_tokens`.
+    """
+    if max_tokens <= 0:
+        return None
+    if count(compact_json(value)) <= max_tokens:
+        return value
+    if isinstance(value, str):
+        return _shrink_text(value, max_tokens, count)
+    if isinstance(value, list):
+        kept, used = [], 2
+        for item in value:
+            cost = count(compact_json(item)) + 1
+            if used + cost > max_tokens:
+                part = _shrink(item, max_tokens - used - 1, count)
+                if part is not None:
+                    kept.append(part)
+                break
+            kept.append(item)
+            used += cost
+        return kept or None
+    if isinstance(value, dict):
+        kept, used = {}, 2
+        for k, v in value.items():
+            cost = count(compact_json({k: v})) - 1
+            if used + cost > max_tokens:
+                part = _shrink(v, max_tokens - used - count(compact_json(k)) - 1, count)
+                if part is not None:
+                    kept[k] = part
+                break
+            kept[k] = v
+            used += cost
+        return kept or None
+    return None
+
+
+class PromptCompiler:
+    """
+    `prefix_template` may contain `{job_title}`; `tail_template` may contain
+    `{job_title}`, `{candidate_name}` and `{context}`. Substitution is plain
+    string replacement, so JSON braces in the templates need no escaping.
+    """
+
+    def __init__(
+        self,
+        prefix_template: str,
+        tail_template: str,
+        budget_tokens: int = 6000,
+        encoding: str = "o200k_base",
+        max_cached_prefixes: int = 256,
+    ):
+        self.prefix_template = prefix_template
+        self.tail_template = tail_template
+        self.budget_tokens = budget_tokens
+        self.count_tokens = make_token_counter(encoding)
+        self.max_cached_prefixes = max_cached_prefixes
+        self._prefixes: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.prefix_hits = 0
+        self.prefix_misses = 0
+        self.compiled = 0
+        self.last_tokens = 0
+
+    @staticmethod
+    def normalize_title(job_title: str) -> str:
+        return re.sub(r"\s+", " ", (job_title or "").strip()) or "the role"
+
+    def prefix(self, job_title: str) -> Tuple[str, int]:
+        """
+        (prefix text, token count) for a job title, rendered once and cached.
+        """
+        title = self.normalize_title(job_title)
+        with self._lock:
+            cached = self._prefixes.get(title)
+            if cached is not None:
+                self._prefixes.move_to_end(title)
+                self.prefix_hits += 1
+                return cached
+        text = self.prefix_template.replace("{job_title}", title)
+        entry = (text, self.count_tokens(text))
+        with self._lock:
+            self.prefix_misses += 1
+            self._prefixes[title] = entry
+            while len(self._prefixes) > self.max_cached_prefixes:
+                self._prefixes.popitem(last=False)
+        return entry
+
+    def _render_tail(self, job_title: str, candidate_name: str, context: Dict[str, Any], extra: str) -> str:
+        tail = (
+            self.tail_template
+            .replace("{job_title}", job_title)
+            .replace("{candidate_name}", candidate_name)
+            .replace("{context}", compact_json(context))
+        )
+        if extra:
+            tail += "\n\n### ADDITIONAL INTERVIEWER INSTRUCTIONS FROM HUMAN AUDIO\n\n" + extra
+        return tail
+
+    @staticmethod
+    def _assemble(sections: List[ContextSection], values: Dict[int, Any]) -> Dict[str, Any]:
+        context: Dict[str, Any] = {}
+        for i, s in enumerate(sections):
+            if i in values:
+                group, key = s.path
+                context.setdefault(group, {})[key] = values[i]
+        return context
+
+    def compile(
+        self,
+        jd_json: dict,
+        resume_json: dict,
+        extra_instructions: str = "",
+        budget_tokens: Optional[int] = None,
+        reference: Optional[Dict[str, Any]] = None,
+    ) -> CompiledPrompt:
+        budget = budget_tokens or self.budget_tokens
+        job_title = self.normalize_title((jd_json or {}).get("job_title") or "")
+        candidate_name = ((resume_json or {}).get("full_name") or "the candidate").strip()
+        extra = (extra_instructions or "").strip()
+        count = self.count_tokens
+
+        prefix_text, prefix_tokens = self.prefix(job_title)
+        sections = context_sections(jd_json, resume_json, reference)
+        fixed = prefix_tokens + count(self._render_tail(job_title, candidate_name, {}, extra))
+        room = budget - fixed
+
+        # allocate room to sections, highest priority first
+        values: Dict[int, Any] = {}
+        truncated, dropped = [], []
+        order = sorted(range(len(sections)), key=lambda i: -sections[i].priority)
+        for i in order:
+            s = sections[i]
+            label = "/".join(s.path)
+            key_cost = count(compact_json({s.path[1]: None})) + 2
+            cost = count(compact_json(s.value)) + key_cost
+            if cost <= room:
+                values[i] = s.value
+                room -= cost
+                continue
+            part = _shrink(s.value, room - key_cost, count)
+            if part is None:
+                dropped.append(label)
+                continue
+            values[i] = part
+            truncated.append(label)
+            room -= count(compact_json(part)) + key_cost
+
+        text = prefix_text + self._render_tail(job_title, candidate_name, self._assemble(sections, values), extra)
+        total = count(text)
+
+        # per-section estimates can drift slightly; drop lowest priority until it fits
+        for i in reversed(order):
+            if total <= budget:
+                break
+            if i not in values:
+                continue
+            del values[i]
+            label = "/".join(sections[i].path)
+            if label in truncated:
+                truncated.remove(label)
+            dropped.append(label)
+            text = prefix_text + self._render_tail(job_title, candidate_name, self._assemble(sections, values), extra)
+            total = count(text)
+
+        with self._lock:
+            self.compiled += 1
+            self.last_tokens = total
+        return CompiledPrompt(text, prefix_tokens, total, budget, truncated, dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tokenizer": "tiktoken" if tiktoken is not None else "estimate",
+                "budget_tokens": self.budget_tokens,
+                "cached_prefixes": len(self._prefixes),
+                "prefix_hits": self.prefix_hits,
+                "prefix_misses": self.prefix_misses,
+                "compiled": self.compiled,
+                "last_tokens": self.last_tokens,
+            }
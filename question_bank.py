@@ -0,0 +1,275 @@
+"""
+Question bank over data/*.quiz.json.
+
+Each quiz file maps a source workbook name to a list of question strings;
+the file stem is the role ("pcb", "integration_engineer", ...) and the
+cleaned workbook name is the topic.
+
+`QuestionBankLoader.current()` returns an immutable `QuestionBank`
+snapshot: questions in a flat tuple, index ranges by role and topic, and
+near-duplicate clusters found with MinHash + LSH over word shingles.
+When a quiz file's mtime/size changes, only that file is re-parsed and
+only new question texts are re-hashed; a new snapshot replaces the old
+one atomically, so readers never see a half-built index.
+
+Sampling is stratified by topic and costs O(k) per request: topics are
+sampled first, then questions by index inside each topic. Questions from
+an already-drawn near-duplicate cluster are skipped.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+NUM_PERM = 64
+LSH_BANDS = 16                      # 16 bands x 4 rows
+DUPLICATE_THRESHOLD = 0.7           # estimated Jaccard similarity
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x5eed)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+@dataclass(frozen=True)
+class Question:
+    __slots__ = ("id", "role", "topic", "text")
+    id: str
+    role: str
+    topic: str
+    text: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"id": self.id, "role": self.role, "topic": self.topic, "question": self.text}
+
+
+def clean_topic(workbook: str) -> str:
+    name = re.sub(r"\.xlsx?$", "", workbook.strip(), flags=re.I)
+    name = re.sub(r"^copy of\s+", "", name, flags=re.I)
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    toks = _tokens(text)
+    shingles = {" ".join(toks[i:i + 3]) for i in range(max(1, len(toks) - 2))} or {""}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles]
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS)
+
+
+def _similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class QuestionBank:
+    """
+    Immutable snapshot; safe to share between requests and threads.
+    """
+
+    def __init__(self, questions: Sequence[Question], signatures: Dict[str, Tuple[int, ...]], loaded_at: float):
+        # group by (role, topic), keeping first-seen order, so each topic is a
+        # contiguous range even when two workbooks clean to the same topic
+        groups: Dict[Tuple[str, str], List[Question]] = {}
+        for q in questions:
+            groups.setdefault((q.role, q.topic), []).append(q)
+        self.questions: Tuple[Question, ...] = tuple(q for group in groups.values() for q in group)
+        self.loaded_at = loaded_at
+        self.topics: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for i, q in enumerate(self.questions):
+            start, _ = self.topics.setdefault(q.role, {}).get(q.topic, (i, i))
+            self.topics[q.role][q.topic] = (start, i + 1)
+        self.by_id: Dict[str, int] = {q.id: i for i, q in enumerate(self.questions)}
+        self.cluster_of: Dict[str, str] = self._cluster(signatures)
+
+    def _cluster(self, signatures: Dict[str, Tuple[int, ...]]) -> Dict[str, str]:
+        """
+        LSH candidate pairs, verified by signature agreement, merged with
+        union-find. Returns question id -> cluster representative id.
+        """
+        parent: Dict[str, str] = {}
+
+        def find(x: str) -> str:
+            while parent.get(x, x) != x:
+                parent[x] = parent.get(parent[x], parent[x])
+                x = parent[x]
+            return x
+
+        rows = NUM_PERM // LSH_BANDS
+        for band in range(LSH_BANDS):
+            buckets: Dict[Tuple[int, ...], List[str]] = {}
+            for q in self.questions:
+                sig = signatures[q.id]
+                buckets.setdefault(sig[band * rows:(band + 1) * rows], []).append(q.id)
+            for ids in buckets.values():
+                for other in ids[1:]:
+                    a, b = find(ids[0]), find(other)
+                    if a != b and _similarity(signatures[ids[0]], signatures[other]) >= DUPLICATE_THRESHOLD:
+                        parent[max(a, b)] = min(a, b)
+        return {q.id: find(q.id) for q in self.questions}
+
+    # ---------- queries ----------
+    def roles(self) -> Dict[str, Dict[str, int]]:
+        return {
+            role: {topic: end - start for topic, (start, end) in topics.items()}
+            for role, topics in self.topics.items()
+        }
+
+    def duplicate_groups(self, cross_topic_only: bool = False) -> List[List[Dict[str, str]]]:
+        groups: Dict[str, List[Question]] = {}
+        for q in self.questions:
+            groups.setdefault(self.cluster_of[q.id], []).append(q)
+        out = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            if cross_topic_only and len({(q.role, q.topic) for q in members}) < 2:
+                continue
+            out.append([q.to_dict() for q in members])
+        return out
+
+    def sample(
+        self,
+        role: str,
+        k: int,
+        topics: Optional[Iterable[str]] = None,
+        seed: Optional[int] = None,
+        max_per_topic: Optional[int] = None,
+    ) -> List[Question]:
+        """
+        Up to `k` distinct questions for `role`, spread evenly over `topics`
+        (default: all of the role's topics), at most one per duplicate cluster.
+        """
+        role_topics = self.topics.get(role)
+        if not role_topics or k <= 0:
+            return []
+        names = [t for t in (topics or role_topics) if t in role_topics]
+        if not names:
+            return []
+        rnd = random.Random(seed)
+
+        # spread k across topics: every topic gets k // n, a random subset one more
+        if k < len(names):
+            names = rnd.sample(names, k)
+        base, extra = divmod(k, len(names))
+        bonus = set(rnd.sample(range(len(names)), extra)) if extra else set()
+
+        picked: List[Question] = []
+        used_clusters = set()
+        for i, name in enumerate(names):
+            start, end = role_topics[name]
+            want = base + (1 if i in bonus else 0)
+            if max_per_topic is not None:
+                want = min(want, max_per_topic)
+            want = min(want, end - start)
+            # draw a few spares so duplicate skips rarely leave a topic short
+            for idx in rnd.sample(range(start, end), min(end - start, want + 2)):
+                if want == 0:
+                    break
+                q = self.questions[idx]
+                cluster = self.cluster_of[q.id]
+                if cluster in used_clusters:
+                    continue
+                used_clusters.add(cluster)
+                picked.append(q)
+                want -= 1
+        rnd.shuffle(picked)
+        return picked
+
+    def stats(self) -> Dict[str, object]:
+        clusters = {}
+        for qid, rep in self.cluster_of.items():
+            clusters[rep] = clusters.get(rep, 0) + 1
+        return {
+            "questions": len(self.questions),
+            "roles": {role: len(t) for role, t in self.topics.items()},
+            "duplicate_clusters": sum(1 for n in clusters.values() if n > 1),
+            "questions_in_duplicates": sum(n for n in clusters.values() if n > 1),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class QuestionBankLoader:
+    def __init__(self, directory: Path, pattern: str = "*.quiz.json", check_seconds: float = 2.0):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._files: Dict[Path, Tuple[Tuple[int, int], List[Question]]] = {}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._bank: Optional[QuestionBank] = None
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    @staticmethod
+    def _parse(path: Path) -> List[Question]:
+        role = path.name[: -len(".quiz.json")] if path.name.endswith(".quiz.json") else path.stem
+        data = json.loads(path.read_text(encoding="utf-8"))
+        questions: List[Question] = []
+        seen = set()
+        for workbook, items in data.items():
+            topic = clean_topic(workbook)
+            for text in items or []:
+                text = re.sub(r"\s+", " ", str(text)).strip()
+                if not text:
+                    continue
+                qid = hashlib.sha1(f"{role}|{topic}|{text}".encode("utf-8")).hexdigest()[:12]
+                if qid in seen:
+                    continue  # exact repeat inside the same topic
+                seen.add(qid)
+                questions.append(Question(qid, role, topic, text))
+        return questions
+
+    def current(self) -> QuestionBank:
+        now = time.monotonic()
+        bank = self._bank
+        if bank is not None and now - self._checked_at < self.check_seconds:
+            return bank
+        with self._lock:
+            if self._bank is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._bank
+            self._checked_at = time.monotonic()
+            if self._refresh() or self._bank is None:
+                self._bank = self._build()
+            return self._bank
+
+    def _refresh(self) -> bool:
+        changed = False
+        present = set()
+        for path in sorted(self.directory.glob(self.pattern)):
+            present.add(path)
+            st = path.stat()
+            key = (st.st_mtime_ns, st.st_size)
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == key:
+                continue
+            try:
+                self._files[path] = (key, self._parse(path))
+                changed = True
+            except (OSError, ValueError) as e:
+                # keep serving the previous version of a file that is mid-write or broken
+                print(f"[question-bank] failed to load {path.name}:", e)
+        for path in list(self._files):
+            if path not in present:
+                del self._files[path]
+                changed = True
+        return changed
+
+    def _build(self) -> QuestionBank:
+        questions: List[Question] = []
+        for path in sorted(self._files):
+            questions.extend(self._files[path][1])
+        live = {q.id for q in questions}
+        for q in questions:
+            if q.id not in self._signatures:
+                self._signatures[q.id] = minhash(q.text)
+        for qid in list(self._signatures):
+            if qid not in live:
+                del self._signatures[qid]
+        self.reloads += 1
+        return QuestionBank(questions, dict(self._signatures), time.time())
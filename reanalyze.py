@@ -0,0 +1,344 @@
+"""
+Bulk re-analysis of archived interviews.
+
+Use this after changing ANALYSIS_MODEL or the evaluator prompt to re-score
+past interviews without going through the HTTP API one call at a time.
+
+It reads the latest record per candidate from the interviews.jsonl archive
+(index lookups, no full load), filters it, and runs the evaluator with
+bounded parallelism. Each result is written to <out>/<id>.json. Finished
+(id, transcript hash, model) triples are appended to
+<out>/checkpoint.jsonl, so an interrupted run resumes where it stopped.
+Throughput, token usage and estimated cost are printed as it goes.
+When a record's job title matches a course in data/*.course.json, the
+transcript is pre-scored locally and only its most informative turns are
+sent (--no-rubric sends everything).
+
+CLI:
+    python reanalyze.py run --model gpt-4o-mini --workers 8
+    python reanalyze.py run --job-title "backend" --since 2025-01-01 --missing-only
+    python reanalyze.py run --base-url http://127.0.0.1:8009/v1 --api-key test
+
+    # local fake OpenAI-compatible endpoint for dry runs / tests
+    python reanalyze.py fake-llm --port 8009 --latency 0.2
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from analysis_queue import transcript_hash
+from course_registry import CourseRegistry
+from evaluator import evaluate_turns
+from interview_archive import InterviewArchive
+from rubric_scoring import match_course
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR / "data"
+
+# USD per 1M tokens (input, output); override with --input-price / --output-price
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+def _parse_day(value: Optional[str], end: bool = False) -> Optional[float]:
+    if not value:
+        return None
+    day = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return day.timestamp() + (86400 if end else 0)
+
+
+class Checkpoint:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Set[Tuple[str, str, str]] = set()
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if e.get("status") == "done":
+                        self.done.add((e["id"], e["hash"], e["model"]))
+
+    def is_done(self, rec_id: str, digest: str, model: str) -> bool:
+        return (rec_id, digest, model) in self.done
+
+    def record(self, rec_id: str, digest: str, model: str, status: str, error: str = "") -> None:
+        entry = {"id": rec_id, "hash": digest, "model": model, "status": status, "ts": int(time.time())}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if status == "done":
+                self.done.add((rec_id, digest, model))
+
+
+class Progress:
+    def __init__(self, input_price: float, output_price: float):
+        self.input_price = input_price
+        self.output_price = output_price
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self.selected = 0
+        self.skipped = 0
+        self.done = 0
+        self.failed = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add_usage(self, usage: Dict[str, int]) -> None:
+        with self._lock:
+            self.done += 1
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+
+    def add_failure(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            cost = (self.prompt_tokens * self.input_price + self.completion_tokens * self.output_price) / 1_000_000
+            return {
+                "selected": self.selected,
+                "skipped": self.skipped,
+                "done": self.done,
+                "failed": self.failed,
+                "elapsed_seconds": round(elapsed, 1),
+                "records_per_sec": round(self.done / elapsed, 3) if elapsed > 0 else 0.0,
+                "tokens_per_sec": round((self.prompt_tokens + self.completion_tokens) / elapsed, 1) if elapsed > 0 else 0.0,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "estimated_cost_usd": round(cost, 4),
+            }
+
+
+def select_records(args: argparse.Namespace, archive: InterviewArchive, out_dir: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Latest archived record per candidate that passes the filters.
+    """
+    titles = [t.lower() for t in (args.job_title or [])]
+    since, until = _parse_day(args.since), _parse_day(args.until, end=True)
+    analysis_dir = Path(args.analysis_dir)
+
+    for rec_id in archive.ids():
+        rec = archive.get(rec_id)
+        if not rec:
+            continue
+        if titles and not any(t in str(rec.get("job_title") or "").lower() for t in titles):
+            continue
+        if since is not None or until is not None:
+            stored_at = rec.get("stored_at")
+            if stored_at is None:
+                continue  # records from before stored_at was added have no date
+            if since is not None and stored_at < since:
+                continue
+            if until is not None and stored_at >= until:
+                continue
+        if args.missing_only and ((analysis_dir / f"{rec_id}.json").exists() or (out_dir / f"{rec_id}.json").exists()):
+            continue
+        yield rec
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def make_client(base_url: Optional[str], api_key: str) -> Any:
+    from openai import OpenAI
+    from http_clients import get_client
+
+    base = base_url or "https://api.openai.com/v1"
+    return OpenAI(api_key=api_key, base_url=base, http_client=get_client(base).client)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    archive = InterviewArchive(Path(args.archive_dir))
+    checkpoint = Checkpoint(out_dir / "checkpoint.jsonl")
+    default_in, default_out = MODEL_PRICES.get(args.model, (0.0, 0.0))
+    progress = Progress(
+        args.input_price if args.input_price is not None else default_in,
+        args.output_price if args.output_price is not None else default_out,
+    )
+    client = make_client(args.base_url, args.api_key or os.getenv("OPENAI_API_KEY") or "")
+    courses = {} if args.no_rubric else CourseRegistry([(Path(args.course_dir), "*.course.json")]).current().courses
+
+    def analyze(rec: Dict[str, Any], digest: str) -> None:
+        rec_id = rec["id"]
+        course = match_course(courses, rec.get("job_title"))
+        for attempt in range(args.retries + 1):
+            try:
+                analysis, usage = evaluate_turns(
+                    client,
+                    args.model,
+                    rec.get("interviewerTurns") or [],
+                    rec.get("candidateTurns") or [],
+                    rec.get("recording_url") or "",
+                    course=course,
+                )
+                break
+            except Exception as e:
+                if attempt >= args.retries:
+                    progress.add_failure()
+                    checkpoint.record(rec_id, digest, args.model, "failed", f"{type(e).__name__}: {e}")
+                    print(f"[reanalyze] {rec_id} failed:", e)
+                    return
+                time.sleep(min(30.0, 2.0 ** attempt))
+        _write_json(out_dir / f"{rec_id}.json", {
+            "id": rec_id,
+            "model": args.model,
+            "transcript_hash": digest,
+            "course": course.id if course else None,
+            "analyzed_at": int(time.time()),
+            "usage": usage,
+            "analysis": analysis,
+        })
+        progress.add_usage(usage)
+        checkpoint.record(rec_id, digest, args.model, "done")
+
+    # bounded in-flight work: the archive is streamed, not loaded up front
+    slots = threading.Semaphore(args.workers * 2)
+    stop_reporting = threading.Event()
+
+    def report() -> None:
+        while not stop_reporting.wait(args.report_every):
+            print("[reanalyze]", json.dumps(progress.snapshot()))
+
+    reporter = threading.Thread(target=report, daemon=True)
+    reporter.start()
+
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="reanalyze") as pool:
+        for rec in select_records(args, archive, out_dir):
+            if args.limit and progress.selected >= args.limit:
+                break
+            digest = transcript_hash(rec)
+            if not args.no_resume and checkpoint.is_done(rec["id"], digest, args.model):
+                progress.skipped += 1
+                continue
+            progress.selected += 1
+            slots.acquire()
+            future = pool.submit(analyze, rec, digest)
+            future.add_done_callback(lambda _f: slots.release())
+
+    stop_reporting.set()
+    summary = progress.snapshot()
+    print("[reanalyze] finished", json.dumps(summary))
+    return summary
+
+
+def serve_fake_llm(args: argparse.Namespace) -> None:
+    """
+    Minimal OpenAI-compatible /v1/chat/completions that returns a fixed
+    evaluation, with token usage estimated from the request size.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("content-length") or 0))
+            if args.latency:
+                time.sleep(args.latency)
+            try:
+                req = json.loads(body or b"{}")
+            except ValueError:
+                req = {}
+            content = json.dumps({
+                "items": [],
+                "overall_score": 5,
+                "strengths": ["fake strength"],
+                "improvements": ["fake improvement"],
+                "next_steps": [],
+                "analysis_summary": "fake analysis",
+            })
+            payload = json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": req.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": len(body) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": len(body) // 4 + len(content) // 4,
+                },
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"[fake-llm] listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk re-analysis of archived interviews")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="re-analyze archived interviews")
+    p.add_argument("--archive-dir", default=str(DATA_DIR))
+    p.add_argument("--analysis-dir", default=str(DATA_DIR / "analysis_json"),
+                   help="existing analyses, checked by --missing-only")
+    p.add_argument("--out", default=str(DATA_DIR / "reanalysis"))
+    p.add_argument("--model", default=os.getenv("ANALYSIS_MODEL", "gpt-4o-mini"))
+    p.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"))
+    p.add_argument("--api-key", default=None)
+    p.add_argument("--job-title", action="append", help="case-insensitive substring; repeatable")
+    p.add_argument("--since", help="YYYY-MM-DD (inclusive, UTC)")
+    p.add_argument("--until", help="YYYY-MM-DD (inclusive, UTC)")
+    p.add_argument("--missing-only", action="store_true", help="skip interviews that already have an analysis")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--retries", type=int, default=3)
+    p.add_argument("--limit", type=int, default=0)
+    p.add_argument("--no-resume", action="store_true", help="ignore the checkpoint and redo everything")
+    p.add_argument("--input-price", type=float, default=None, help="USD per 1M prompt tokens")
+    p.add_argument("--output-price", type=float, default=None, help="USD per 1M completion tokens")
+    p.add_argument("--report-every", type=float, default=10.0)
+    p.add_argument("--course-dir", default=str(DATA_DIR), help="directory with *.course.json")
+    p.add_argument("--no-rubric", action="store_true", help="send every turn, skip local rubric pre-scoring")
+
+    f = sub.add_parser("fake-llm", help="serve a fake OpenAI-compatible endpoint")
+    f.add_argument("--host", default="127.0.0.1")
+    f.add_argument("--port", type=int, default=8009)
+    f.add_argument("--latency", type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        args.workers = max(1, args.workers)
+        run(args)
+    else:
+        serve_fake_llm(args)
+
+
+if __name__ == "__main__":
+    main()
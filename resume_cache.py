@@ -0,0 +1,136 @@
+"""
+Content-addressed cache for structured resumes.
+
+Entries are keyed by the Drive file's md5Checksum (or modifiedTime for
+native Google Docs, which have no checksum) plus a version string for the
+extraction prompt/model, so a changed resume or a changed prompt is a miss.
+Each entry is one JSON file; least-recently-used entries are evicted once
+the directory exceeds its byte or entry budget. Lookups go to the file, so
+entries written by other worker processes are hits too.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def make_resume_cache_key(meta: Dict[str, Any], prompt_version: str) -> Optional[str]:
+    """
+    Build a cache key from Drive file metadata. Returns None if the file
+    carries nothing we can use as a content fingerprint.
+    """
+    fingerprint = meta.get("md5Checksum")
+    if not fingerprint:
+        # Google Docs: no checksum, but modifiedTime changes on every edit
+        if meta.get("id") and meta.get("modifiedTime"):
+            fingerprint = f"{meta['id']}@{meta['modifiedTime']}"
+        else:
+            return None
+    return hashlib.sha256(f"{fingerprint}|{prompt_version}".encode("utf-8")).hexdigest()
+
+
+def prompt_version(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+class ResumeCache:
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 5000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> [size_bytes, last_used]
+        self._index: Dict[str, list] = {}
+        self._total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._scan()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _scan(self) -> None:
+        for p in self.directory.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            self._index[p.stem] = [st.st_size, st.st_mtime]
+            self._total_bytes += st.st_size
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not key:
+            return None
+        path = self._path(key)
+        # the index only knows this process's writes; other workers share the directory
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            value = json.loads(data)
+        except (OSError, ValueError):
+            with self._lock:
+                self._forget(key)
+                self.stats["misses"] += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = [len(data), now]
+                self._total_bytes += len(data)
+            self._index[key][1] = now
+            self.stats["hits"] += 1
+        try:
+            # persist recency so LRU order survives restarts
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: Optional[str], value: Dict[str, Any]) -> None:
+        if not key:
+            return
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._forget(key)
+            self._index[key] = [len(data), time.time()]
+            self._total_bytes += len(data)
+            self.stats["writes"] += 1
+            self._evict()
+
+    def _forget(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes and len(self._index) <= self.max_entries:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._total_bytes <= self.max_bytes and len(self._index) <= self.max_entries:
+                break
+            self._forget(key)
+            self.stats["evictions"] += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                **self.stats,
+            }
@@ -0,0 +1,278 @@
+"""
+Bulk resume-to-JD ranking without model calls.
+
+Every roster row has a JD and (once pre-warmed) a structured resume. The
+ranker scores every parsed resume against every distinct JD in one pass:
+
+1. Tokenise all resumes and JDs (unigrams + bigrams). Terms that occur in
+   fewer than two documents are dropped, because they cannot connect a
+   resume to a JD.
+2. Build one sparse CSR matrix with sublinear TF x IDF weights and
+   L2-normalise the rows. Resume/JD cosine similarity is then the product
+   R @ J.T, computed one block of roles at a time, so memory stays at
+   n_candidates x block.
+3. Skill overlap: the skills listed in `technical_skills` (plus flat
+   `skills` / `tools` lists and project technologies) form a binary
+   candidate x skill matrix K, and the skills mentioned in each JD form
+   J_k. K @ J_k.T counts shared skills per pair; dividing by the JD's
+   skill count gives the fraction of the JD's skills the candidate lists.
+4. score = text_weight * cosine + skill_weight * skill_overlap. JDs that
+   mention none of the known skills fall back to the cosine alone.
+   The top N per role come from argpartition.
+
+CLI (reads the roster and pre-warmed bundles through the server wiring,
+like prewarm.py):
+    python resume_ranker.py --top 10
+    python resume_ranker.py --top 25 --role "pcb" --out data/ranking.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+TEXT_WEIGHT = 0.6
+SKILL_WEIGHT = 0.4
+ROLE_BLOCK = 256
+MAX_SKILL_WORDS = 4
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the their this to was we were will with "
+    "you your who which that its into per etc using use used work working experience role job candidate".split()
+)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    __slots__ = ("id", "name", "job_title", "jd_text", "resume")
+    id: str
+    name: str
+    job_title: str
+    jd_text: str
+    resume: Dict[str, Any]
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.findall(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]", text.lower()) if w not in _STOPWORDS]
+
+
+def _terms(text: str) -> List[str]:
+    words = _words(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _flatten(value: Any) -> Iterable[str]:
+    if isinstance(value, dict):
+        for v in value.values():
+            yield from _flatten(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _flatten(v)
+    elif value is not None and str(value).strip():
+        yield str(value)
+
+
+def resume_text(resume: Dict[str, Any]) -> str:
+    return " ".join(_flatten(resume))
+
+
+def resume_skills(resume: Dict[str, Any]) -> Set[str]:
+    """
+    Normalised skill phrases: technical_skills (any nesting), flat
+    skills/tools lists, and project technologies.
+    """
+    raw: List[str] = list(_flatten(resume.get("technical_skills")))
+    raw += list(_flatten(resume.get("skills"))) + list(_flatten(resume.get("tools")))
+    for project in resume.get("projects") or []:
+        if isinstance(project, dict):
+            raw += list(_flatten(project.get("technologies")))
+    skills = set()
+    for item in raw:
+        # "Python, SQL" and "Python / SQL" are lists in one string
+        for part in re.split(r"[,;/|]|\band\b", item):
+            phrase = " ".join(_words(re.sub(r"\(.*?\)", " ", part)))
+            if phrase and len(phrase.split()) <= MAX_SKILL_WORDS:
+                skills.add(phrase)
+    return skills
+
+
+def _ngrams(words: Sequence[str], max_n: int) -> Set[str]:
+    return {" ".join(words[i:i + n]) for n in range(1, max_n + 1) for i in range(len(words) - n + 1)}
+
+
+def role_id_for(jd_text: str, job_title: str) -> str:
+    return hashlib.sha1(f"{job_title}\x00{jd_text}".encode("utf-8")).hexdigest()[:10]
+
+
+def _tfidf(docs: List[Counter]) -> Tuple[sparse.csr_matrix, int]:
+    df: Counter = Counter()
+    for doc in docs:
+        df.update(doc.keys())
+    vocab = {t: i for i, t in enumerate(t for t, c in df.items() if c >= 2)}
+    n = len(docs)
+    idf = np.zeros(len(vocab))
+    for t, i in vocab.items():
+        idf[i] = math.log((1 + n) / (1 + df[t])) + 1.0
+
+    indptr = [0]
+    indices: List[int] = []
+    counts: List[float] = []
+    for doc in docs:
+        for t, c in doc.items():
+            i = vocab.get(t)
+            if i is not None:
+                indices.append(i)
+                counts.append(c)
+        indptr.append(len(indices))
+    idx = np.asarray(indices, dtype=np.int32)
+    data = (1.0 + np.log(np.asarray(counts, dtype=np.float64))) * idf[idx]
+    X = sparse.csr_matrix((data, idx, np.asarray(indptr, dtype=np.int64)), shape=(n, len(vocab)))
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ X, len(vocab)
+
+
+def rank_candidates(
+    candidates: Sequence[Candidate],
+    top_n: int = 10,
+    text_weight: float = TEXT_WEIGHT,
+    skill_weight: float = SKILL_WEIGHT,
+    role_filter: Optional[str] = None,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    roles: Dict[str, Dict[str, Any]] = {}
+    applied: Dict[str, Set[int]] = {}
+    for i, c in enumerate(candidates):
+        rid = role_id_for(c.jd_text, c.job_title)
+        roles.setdefault(rid, {"role_id": rid, "job_title": c.job_title, "jd_text": c.jd_text})
+        applied.setdefault(rid, set()).add(i)
+    if role_filter:
+        needle = role_filter.lower()
+        roles = {rid: r for rid, r in roles.items() if needle in r["job_title"].lower() or needle == rid}
+    role_ids = list(roles)
+    result: Dict[str, Any] = {"candidates": len(candidates), "roles": []}
+    if not candidates or not role_ids:
+        return result
+
+    # ---- text similarity: one matrix over resumes + JDs ----
+    docs = [Counter(_terms(resume_text(c.resume))) for c in candidates]
+    docs += [Counter(_terms(f"{roles[r]['job_title']} {roles[r]['jd_text']}")) for r in role_ids]
+    X, vocab_size = _tfidf(docs)
+    R, J = X[: len(candidates)], X[len(candidates):]
+
+    # ---- skill overlap ----
+    cand_skills = [resume_skills(c.resume) for c in candidates]
+    skill_index: Dict[str, int] = {}
+    rows, cols = [], []
+    for i, skills in enumerate(cand_skills):
+        for s in skills:
+            rows.append(i)
+            cols.append(skill_index.setdefault(s, len(skill_index)))
+    K = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(candidates), len(skill_index))
+    )
+    jrows, jcols = [], []
+    jd_skills: List[List[str]] = []
+    for j, rid in enumerate(role_ids):
+        grams = _ngrams(_words(f"{roles[rid]['job_title']} {roles[rid]['jd_text']}"), MAX_SKILL_WORDS)
+        present = [s for s in skill_index if s in grams]
+        jd_skills.append(present)
+        jrows.extend([j] * len(present))
+        jcols.extend(skill_index[s] for s in present)
+    JK = sparse.csr_matrix(
+        (np.ones(len(jrows), dtype=np.float32), (jrows, jcols)), shape=(len(role_ids), len(skill_index))
+    )
+    jd_skill_counts = np.asarray(JK.sum(axis=1)).ravel()
+    vectorized = time.perf_counter()
+
+    # ---- score, one block of roles at a time ----
+    k = max(0, min(top_n, len(candidates)))
+    for start in range(0, len(role_ids), ROLE_BLOCK):
+        block = slice(start, start + ROLE_BLOCK)
+        cosine = (R @ J[block].T).toarray()
+        overlap = (K @ JK[block].T).toarray()
+        counts = jd_skill_counts[block]
+        coverage = np.divide(overlap, counts, out=np.zeros_like(overlap), where=counts > 0)
+        scores = np.where(counts > 0, text_weight * cosine + skill_weight * coverage, cosine)
+
+        for col in range(scores.shape[1]):
+            j = start + col
+            rid = role_ids[j]
+            column = scores[:, col]
+            if k == 0:
+                top = np.empty(0, dtype=np.int64)
+            elif k < len(column):
+                top = np.argpartition(-column, k - 1)[:k]
+            else:
+                top = np.arange(len(column))
+            top = top[np.argsort(-column[top], kind="stable")]
+            wanted = set(jd_skills[j])
+            result["roles"].append({
+                "role_id": rid,
+                "job_title": roles[rid]["job_title"],
+                "applicants": len(applied[rid]),
+                "jd_skills": len(wanted),
+                "top": [
+                    {
+                        "candidate_id": candidates[i].id,
+                        "name": candidates[i].name,
+                        "score": round(float(column[i]), 4),
+                        "text_similarity": round(float(cosine[i, col]), 4),
+                        "skill_overlap": round(float(coverage[i, col]), 4),
+                        "matched_skills": sorted(cand_skills[i] & wanted),
+                        "applied_for_role": int(i) in applied[rid],
+                    }
+                    for i in top
+                ],
+            })
+
+    finished = time.perf_counter()
+    result.update({
+        "vocabulary": vocab_size,
+        "skills": len(skill_index),
+        "vectorize_ms": round((vectorized - started) * 1000, 1),
+        "score_ms": round((finished - vectorized) * 1000, 1),
+    })
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rank every parsed resume in the roster against every JD.")
+    parser.add_argument("--top", type=int, default=10, help="candidates per role")
+    parser.add_argument("--role", default=None, help="only roles whose title contains this (or a role_id)")
+    parser.add_argument("--text-weight", type=float, default=TEXT_WEIGHT)
+    parser.add_argument("--skill-weight", type=float, default=SKILL_WEIGHT)
+    parser.add_argument("--out", default=None, help="write the full JSON result here")
+    args = parser.parse_args()
+
+    # server wires up Drive / roster / bundle store from .env
+    import server
+
+    candidates, unparsed = server.collect_rank_candidates()
+    result = rank_candidates(candidates, args.top, args.text_weight, args.skill_weight, args.role)
+    result["unparsed"] = len(unparsed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(
+        f"[rank] {result['candidates']} candidates ({len(unparsed)} without a parsed resume), "
+        f"{len(result['roles'])} roles, vectorize {result.get('vectorize_ms', 0)} ms, "
+        f"score {result.get('score_ms', 0)} ms"
+    )
+    for role in result["roles"]:
+        print(f"\n== {role['job_title']} ({role['role_id']}, {role['applicants']} applicants)")
+        for n, entry in enumerate(role["top"], 1):
+            mark = "*" if entry["applied_for_role"] else " "
+            print(f"{n:3d}.{mark} {entry['score']:.3f}  {entry['candidate_id']}  {entry['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Incremental parsing of the resume-structuring completion.
+
+The model returns one JSON object whose top-level keys are resume
+sections ("work_experience", "technical_skills", ...). `SectionParser`
+takes the text as it streams in and yields each section as soon as its
+value is complete. A broken section never takes the others down with it:
+
+- a section whose value does not parse is skipped (and recorded in
+  `errors`), and the parser moves on to the next key;
+- when the text ends early (max_tokens, a dropped stream) the section in
+  progress keeps every array item / object member that was complete.
+
+`StreamingExtraction` runs a stream on a worker thread and lets callers
+wait for a deadline-bounded partial result (e.g. /session once the
+required sections are in) or for the final result.
+"""
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_CLOSERS = {"[": "]", "{": "}"}
+
+
+class SectionParser:
+    def __init__(self) -> None:
+        self.sections: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self._state = "start"        # start | key | colon | value | after | end
+        self._key_buf: List[str] = []
+        self._key = ""
+        self._value: List[str] = []
+        self._depth = 0              # nesting inside the current value
+        self._opener = ""            # "[" / "{" when the value is a container
+        self._in_string = False
+        self._escape = False
+        self._safe = 0               # len(_value) after the last complete child
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Consume more text; returns the sections completed by it.
+        """
+        done: List[Tuple[str, Any]] = []
+        for ch in text:
+            state = self._state
+            if state == "start":
+                if ch == "{":
+                    self._state = "key"
+            elif state == "key":
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                        self._key_buf.append(ch)
+                    elif ch == "\\":
+                        self._escape = True
+                        self._key_buf.append(ch)
+                    elif ch == '"':
+                        self._in_string = False
+                        try:
+                            self._key = json.loads('"' + "".join(self._key_buf) + '"')
+                        except ValueError:
+                            self._key = "".join(self._key_buf)
+                        self._key_buf = []
+                        self._state = "colon"
+                    else:
+                        self._key_buf.append(ch)
+                elif ch == '"':
+                    self._in_string = True
+                elif ch == "}":
+                    self._state = "end"
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+                    self._value, self._depth, self._opener, self._safe = [], 0, "", 0
+            elif state == "value":
+                self._value_char(ch, done)
+            elif state == "after":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "end"
+        return done
+
+    def _value_char(self, ch: str, done: List[Tuple[str, Any]]) -> None:
+        if self._in_string:
+            self._value.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+        if not self._value and ch.isspace():
+            return
+        if self._depth == 0 and ch in ",}":
+            # end of a scalar value
+            self._finish(done)
+            self._state = "key" if ch == "," else "end"
+            return
+        self._value.append(ch)
+        if ch == '"':
+            self._in_string = True
+        elif ch in "[{":
+            if self._depth == 0:
+                self._opener = ch
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
+            if self._depth == 1:
+                self._safe = len(self._value)
+            elif self._depth == 0:
+                self._finish(done)
+                self._state = "after"
+        elif ch == "," and self._depth == 1:
+            self._safe = len(self._value) - 1
+
+    def _finish(self, done: List[Tuple[str, Any]]) -> None:
+        text = "".join(self._value).strip()
+        self._value = []
+        if not self._key:
+            return
+        try:
+            value = json.loads(text)
+        except ValueError as e:
+            self.errors[self._key] = str(e)
+            return
+        self.sections[self._key] = value
+        done.append((self._key, value))
+
+    def close(self) -> List[Tuple[str, Any]]:
+        """
+        End of input. Salvages the complete children of a section that was
+        cut off.
+        """
+        done: List[Tuple[str, Any]] = []
+        if self._state == "value" and self._opener and self._key and self._key not in self.sections:
+            text = "".join(self._value)
+            # strings close themselves inside _value, so _safe marks the end of the last whole child
+            body = text[: self._safe] if self._safe else text[:1]
+            candidate = body.rstrip().rstrip(",") + _CLOSERS[self._opener]
+            try:
+                value = json.loads(candidate)
+            except ValueError as e:
+                self.errors[self._key] = f"truncated: {e}"
+            else:
+                self.sections[self._key] = value
+                self.errors[self._key] = "truncated"
+                done.append((self._key, value))
+        if self._state != "end":
+            self.errors.setdefault("(end)", "output ended before the closing brace")
+        self._state = "end"
+        return done
+
+    @property
+    def complete(self) -> bool:
+        return self._state == "end"
+
+
+def parse_sections(text: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Sections of a complete (possibly malformed or truncated) completion.
+    """
+    parser = SectionParser()
+    parser.feed(text)
+    parser.close()
+    return parser.sections, parser.errors
+
+
+class StreamingExtraction:
+    """
+    `stream` yields text deltas. Runs `consume()` on some thread; other
+    threads call `wait()` / `result()`. `on_complete(sections, errors)` runs
+    on the consuming thread once the stream ends, before `result()` returns
+    and before `wait()` reports the stream as finished.
+    """
+
+    def __init__(self, stream: Iterable[str], on_complete: Optional[Callable[[Dict[str, Any], Dict[str, str]], None]] = None):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.parser = SectionParser()
+        self.started = time.monotonic()
+        self.first_section_ms: Optional[float] = None
+        self.finished_ms: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._done = False
+
+    def consume(self) -> None:
+        try:
+            for delta in self.stream:
+                if not delta:
+                    continue
+                # sections are read by waiters, so they only change under the lock
+                with self._cond:
+                    if self.parser.feed(delta):
+                        if self.first_section_ms is None:
+                            self.first_section_ms = round((time.monotonic() - self.started) * 1000, 1)
+                        self._cond.notify_all()
+                if self.parser.complete:
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.parser.close()
+                self.finished_ms = round((time.monotonic() - self.started) * 1000, 1)
+            # before _done, so whatever on_complete saves is there once result() returns
+            if self.on_complete is not None:
+                errors = dict(self.parser.errors)
+                if self.error is not None:
+                    errors["(stream)"] = f"{type(self.error).__name__}: {self.error}"
+                try:
+                    self.on_complete(dict(self.parser.sections), errors)
+                except Exception as e:
+                    print("[resume-stream] on_complete failed:", e)
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def wait(self, timeout: float, required: Sequence[str] = ()) -> Tuple[Dict[str, Any], bool]:
+        """
+        (sections so far, finished). Returns when the stream ends, when
+        every `required` section is in, or after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._done:
+                if required and all(k in self.parser.sections for k in required):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return dict(self.parser.sections), self._done
+
+    def result(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._done, timeout)
+        if self.error is not None and not self.parser.sections:
+            raise self.error
+        return dict(self.parser.sections)
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        return {"first_section_ms": self.first_section_ms, "finished_ms": self.finished_ms}
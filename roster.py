@@ -0,0 +1,222 @@
+"""
+Candidate roster index.
+
+Keeps the Drive Excel roster in memory as a dict keyed by normalized
+'Unique ID'. The Drive file is only re-downloaded and re-parsed when its
+modifiedTime / md5Checksum changes; the check itself runs at most once per
+TTL and happens in a background thread once a copy is loaded, so lookups on
+the hot path never wait on Drive. Download and parsing happen outside the
+lock readers take; the new (signature, rows) snapshot is swapped in with
+one assignment.
+
+A lookup for an id the cached copy does not have (e.g. a candidate added
+a moment ago) starts a revalidation, at most once per
+`miss_recheck_seconds`, and waits up to `miss_wait_seconds` for it before
+reporting the id as unknown.
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+EXCEL_MIME_QUERY = (
+    "(mimeType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' "
+    "or mimeType='application/vnd.ms-excel')"
+)
+
+
+class RosterError(RuntimeError):
+    pass
+
+
+def normalize_unique_id(value: Any) -> str:
+    # same comparison the old pandas scan used: astype(str).str.strip()
+    return str(value).strip()
+
+
+class RosterIndex:
+    """
+    In-memory view of the roster sheet.
+
+    `drive_factory` returns an authorized Drive v3 service. `reader` turns the
+    downloaded workbook into a list of row dicts (defaults to pandas).
+    """
+
+    def __init__(
+        self,
+        drive_factory: Callable[[], Any],
+        folder_id: str,
+        local_path: Path,
+        ttl_seconds: float = 60.0,
+        reader: Optional[Callable[[Path], List[Dict]]] = None,
+        miss_recheck_seconds: float = 10.0,
+        miss_wait_seconds: float = 2.0,
+    ):
+        self._drive_factory = drive_factory
+        self.folder_id = folder_id
+        self.local_path = Path(local_path)
+        self.ttl_seconds = ttl_seconds
+        self._reader = reader or read_roster_rows
+        self.miss_recheck_seconds = miss_recheck_seconds
+        self.miss_wait_seconds = miss_wait_seconds
+
+        self._lock = threading.Lock()           # flags only; never held across Drive I/O
+        self._refresh_lock = threading.Lock()   # one revalidation at a time
+        self._snapshot: Tuple[Optional[Tuple[str, str, str]], Dict[str, Dict]] = (None, {})
+        self._checked_at = 0.0
+        self._refresh_done: Optional[threading.Event] = None   # set while a background refresh runs
+        self.stats = {"checks": 0, "reloads": 0, "lookups": 0, "miss_rechecks": 0, "last_reload_ms": 0.0}
+
+    # ---------- Drive ----------
+    def _remote_file(self) -> Dict:
+        q = f"'{self.folder_id}' in parents and trashed=false and {EXCEL_MIME_QUERY}"
+        files = (
+            self._drive_factory()
+            .files()
+            .list(q=q, fields="files(id,name,modifiedTime,md5Checksum)")
+            .execute()
+            .get("files", [])
+        )
+        if not files:
+            raise RosterError("No Excel file found in Drive folder.")
+        return files[0]
+
+    def _download(self, file_id: str) -> None:
+        from googleapiclient.http import MediaIoBaseDownload
+
+        self.local_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.local_path.with_suffix(self.local_path.suffix + ".part")
+        request = self._drive_factory().files().get_media(fileId=file_id)
+        with open(tmp_path, "wb") as fh:
+            downloader = MediaIoBaseDownload(fh, request)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+        tmp_path.replace(self.local_path)
+
+    # ---------- Index ----------
+    @property
+    def _signature(self) -> Optional[Tuple[str, str, str]]:
+        return self._snapshot[0]
+
+    @property
+    def _rows(self) -> Dict[str, Dict]:
+        return self._snapshot[1]
+
+    def _load(self, signature: Tuple[str, str, str]) -> None:
+        started = time.perf_counter()
+        self._download(signature[0])
+        rows = self._reader(self.local_path)
+        index: Dict[str, Dict] = {}
+        for row in rows:
+            if "Unique ID" not in row:
+                continue
+            key = normalize_unique_id(row["Unique ID"])
+            # first match wins, same as iloc[0] on the old filtered frame
+            index.setdefault(key, row)
+
+        self._snapshot = (signature, index)
+        self.stats["reloads"] += 1
+        self.stats["last_reload_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"[roster] loaded {len(index)} rows in {self.stats['last_reload_ms']} ms")
+
+    def refresh(self, force: bool = False, max_age: Optional[float] = None) -> None:
+        """
+        Revalidate against Drive if the last check is older than `max_age`
+        (default: the TTL) or `force`, and reparse only when the file's
+        identity/checksum changed.
+        """
+        max_age = self.ttl_seconds if max_age is None else max_age
+        with self._refresh_lock:
+            now = time.monotonic()
+            if not force and self._signature and now - self._checked_at < max_age:
+                return
+            self.stats["checks"] += 1
+            try:
+                meta = self._remote_file()
+                signature = (
+                    meta["id"],
+                    meta.get("md5Checksum", ""),
+                    meta.get("modifiedTime", ""),
+                )
+                if force or signature != self._signature:
+                    self._load(signature)
+            except Exception as e:
+                # keep serving the last good copy if Drive is flaky
+                if self._signature is None:
+                    raise
+                print("[roster] revalidation failed, serving cached roster:", e)
+            self._checked_at = now
+
+    def _revalidate_in_background(self, max_age: float, done: threading.Event) -> None:
+        try:
+            self.refresh(max_age=max_age)
+        except Exception as e:
+            print("[roster] background refresh failed:", e)
+        finally:
+            with self._lock:
+                self._refresh_done = None
+            done.set()
+
+    def _start_refresh(self, max_age: float) -> Optional[threading.Event]:
+        """
+        Start a background revalidation if the last check is older than
+        `max_age`. Returns the event set when the running one finishes, or
+        None if the copy is recent enough.
+        """
+        with self._lock:
+            if self._refresh_done is not None:
+                return self._refresh_done
+            if time.monotonic() - self._checked_at < max_age:
+                return None
+            done = self._refresh_done = threading.Event()
+        threading.Thread(target=self._revalidate_in_background, args=(max_age, done), daemon=True).start()
+        return done
+
+    def _ensure_fresh(self) -> None:
+        # first load must block; afterwards serve stale and revalidate aside
+        if self._signature is None:
+            self.refresh()
+            return
+        self._start_refresh(self.ttl_seconds)
+
+    def get(self, candidate_id: str) -> Optional[Dict]:
+        """
+        Return a copy of the row for `candidate_id`, or None.
+        """
+        self._ensure_fresh()
+        self.stats["lookups"] += 1
+        key = normalize_unique_id(candidate_id)
+        row = self._rows.get(key)
+        if row is None:
+            # maybe added since the cached copy; concurrent misses share one check
+            done = self._start_refresh(self.miss_recheck_seconds)
+            if done is not None:
+                self.stats["miss_rechecks"] += 1
+                done.wait(self.miss_wait_seconds)
+                row = self._rows.get(key)
+        return dict(row) if row is not None else None
+
+    def rows(self) -> List[Dict]:
+        self._ensure_fresh()
+        return [dict(r) for r in self._rows.values()]
+
+    def status(self) -> Dict:
+        signature, rows = self._snapshot
+        return {
+            "rows": len(rows),
+            "file_id": signature[0] if signature else None,
+            "md5Checksum": signature[1] if signature else None,
+            "modifiedTime": signature[2] if signature else None,
+            "age_seconds": round(time.monotonic() - self._checked_at, 1) if signature else None,
+            **self.stats,
+        }
+
+
+def read_roster_rows(path: Path) -> List[Dict]:
+    import pandas as pd
+
+    df = pd.read_excel(path)
+    if "Unique ID" not in df.columns:
+        raise RosterError("Excel missing 'Unique ID' column")
+    return [dict(r) for r in df.to_dict(orient="records")]
@@ -0,0 +1,269 @@
+"""
+Local rubric pre-scoring of interview transcripts.
+
+Before /analyze calls the model, every interviewer/candidate pair is
+mapped onto the course's competencies and subskills with TF-IDF:
+
+- One document per (competency, subskill): the subskill name plus the
+  competency's name, responsibilities, red flags and tools.
+- The vocabulary is the course's own terms, expanded with the glossary.
+  "EMI" in a turn also counts as "electromagnetic interference", and the
+  reverse is true as well. Words outside the course vocabulary carry no
+  rubric signal and are dropped.
+- Vectors are sparse {term: weight} dicts, L2-normalised, so a similarity
+  is one dot product over the shorter vector.
+
+The question and answer together pick the subskill being probed. The
+answer alone gives the evidence score for that subskill. Each
+competency's coverage is its best evidence across turns.
+`weighted_coverage` is the sum of coverage times the competency's
+`evaluation_rubric.weights` entry.
+
+The model then receives only the most informative pairs, i.e. high rubric
+weight x evidence (long answers clipped), plus these local scores, instead
+of the full transcript.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from course_registry import Course, humanize
+
+MAX_SELECTED_PAIRS = 8
+MAX_ANSWER_CHARS = 1200
+MIN_MATCH = 0.05                 # below this a turn is not about any subskill
+EVIDENCE_SATURATION = 0.35       # answer/subskill cosine treated as full evidence
+
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have how i if in into is it its "
+    "me my no not of on or our so than that the their them then there these they this to was we were what when "
+    "where which who why will with would you your yes also about just like very really some any one more most".split()
+)
+
+
+def _stem(word: str) -> str:
+    # deliberately light: fold plurals so "capacitors" meets "capacitor"
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(text: str) -> List[str]:
+    return [_stem(w) for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+class CourseIndex:
+    """
+    TF-IDF model of one course. Built once per loaded course (see
+    `course_index`) and shared between requests.
+    """
+
+    def __init__(self, course: Course):
+        self.course = course
+        # glossary: abbreviation token <-> expansion tokens
+        self._expand: Dict[str, List[str]] = {}
+        self._phrases: List[Tuple[Tuple[str, ...], str]] = []
+        for abbr, meaning in course.glossary.items():
+            key = _stem(abbr.lower())
+            expansion = _words(re.sub(r"\(.*?\)", " ", meaning))
+            if not expansion:
+                continue
+            self._expand[key] = expansion
+            self._phrases.append((tuple(expansion), key))
+
+        self.keys: List[Tuple[str, str]] = []
+        docs: List[Counter] = []
+        for comp in course.competencies:
+            shared = " ".join((comp.name, humanize(comp.id), *comp.responsibilities, *comp.red_flags, *comp.tools))
+            for sub in comp.subskills or (comp.id,):
+                self.keys.append((comp.id, sub))
+                # the subskill's own words count double against the shared competency text
+                docs.append(Counter(self.terms(f"{humanize(sub)} {humanize(sub)} {shared}")))
+
+        n = len(docs)
+        df: Counter = Counter()
+        for doc in docs:
+            df.update(doc.keys())
+        self.idf: Dict[str, float] = {t: math.log((1 + n) / (1 + c)) + 1.0 for t, c in df.items()}
+        self.vectors: List[Dict[str, float]] = [self._weigh(doc) for doc in docs]
+        # inverted index: term -> [(doc, weight)], so a turn only touches docs that share a term
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        for i, vec in enumerate(self.vectors):
+            for t, w in vec.items():
+                self._postings.setdefault(t, []).append((i, w))
+
+    def terms(self, text: str) -> List[str]:
+        words = _words(text)
+        out = list(words)
+        for w in words:
+            out.extend(self._expand.get(w, ()))
+        for phrase, abbr in self._phrases:
+            size = len(phrase)
+            if any(tuple(words[i:i + size]) == phrase for i in range(len(words) - size + 1)):
+                out.append(abbr)
+        return out
+
+    def _weigh(self, counts: Counter) -> Dict[str, float]:
+        vec = {t: (1.0 + math.log(c)) * self.idf[t] for t, c in counts.items() if t in self.idf}
+        norm = math.sqrt(sum(w * w for w in vec.values()))
+        return {t: w / norm for t, w in vec.items()} if norm else {}
+
+    def vector(self, text: str) -> Dict[str, float]:
+        return self._weigh(Counter(self.terms(text)))
+
+    def similarities(self, vec: Dict[str, float]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for t, w in vec.items():
+            for i, dw in self._postings.get(t, ()):
+                scores[i] = scores.get(i, 0.0) + w * dw
+        return scores
+
+
+@lru_cache(maxsize=32)
+def course_index(course: Course) -> CourseIndex:
+    # Course objects are immutable snapshots; a reload creates a new one
+    return CourseIndex(course)
+
+
+def _dot(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(t, 0.0) for t, w in a.items())
+
+
+def score_turns(
+    course: Course,
+    qa_pairs: Sequence[Dict[str, str]],
+    max_pairs: int = MAX_SELECTED_PAIRS,
+) -> Dict[str, Any]:
+    """
+    Local scores for a transcript, plus the indices of the pairs worth
+    sending to the model (in transcript order): every pair when there are
+    at most `max_pairs`, otherwise the best-scoring pairs, topped up with
+    unmatched ones.
+    """
+    index = course_index(course)
+    turns: List[Dict[str, Any]] = []
+    for i, pair in enumerate(qa_pairs):
+        question, answer = pair.get("question") or "", pair.get("answer") or ""
+        sims = index.similarities(index.vector(f"{question} {answer}"))
+        if not sims or not answer.strip():
+            turns.append({"index": i, "competency": None, "subskill": None, "match": 0.0, "evidence": 0.0})
+            continue
+        best = max(sims, key=sims.get)
+        comp_id, sub = index.keys[best]
+        match = sims[best]
+        evidence = _dot(index.vector(answer), index.vectors[best]) if match >= MIN_MATCH else 0.0
+        turns.append({
+            "index": i,
+            "competency": comp_id if match >= MIN_MATCH else None,
+            "subskill": sub if match >= MIN_MATCH else None,
+            "match": round(match, 3),
+            "evidence": round(min(1.0, evidence / EVIDENCE_SATURATION), 3),
+        })
+
+    competencies: Dict[str, Dict[str, Any]] = {
+        c.id: {"weight": c.weight, "coverage": 0.0, "turns": 0, "subskills": []} for c in course.competencies
+    }
+    for t in turns:
+        entry = competencies.get(t["competency"])
+        if entry is None:
+            continue
+        entry["turns"] += 1
+        entry["coverage"] = max(entry["coverage"], t["evidence"])
+        if t["subskill"] not in entry["subskills"]:
+            entry["subskills"].append(t["subskill"])
+
+    weighted = sum(e["weight"] * e["coverage"] for e in competencies.values())
+    touched = [cid for cid, e in competencies.items() if e["turns"]]
+
+    # most informative pairs: rubric weight x evidence, with a small bonus for
+    # the first pair on each competency so coverage breadth survives the cut
+    ranked = sorted(
+        (t for t in turns if t["competency"]),
+        key=lambda t: competencies[t["competency"]]["weight"] * (t["evidence"] + 0.1 * t["match"]),
+        reverse=True,
+    )
+    selected: List[int] = []
+    seen_comp = set()
+    for t in ranked:
+        if t["competency"] not in seen_comp:
+            selected.append(t["index"])
+            seen_comp.add(t["competency"])
+    for t in ranked:
+        if t["index"] not in selected:
+            selected.append(t["index"])
+    selected = selected[:max_pairs]
+    # turns without a rubric match still carry the interview; fill the rest of
+    # the budget with them in transcript order (a short transcript is sent whole)
+    for t in turns:
+        if len(selected) >= max_pairs:
+            break
+        if t["index"] not in selected:
+            selected.append(t["index"])
+    selected = sorted(selected)
+
+    return {
+        "course": course.id,
+        "weighted_coverage": round(weighted, 3),
+        "competencies_touched": len(touched),
+        "min_competencies_to_cover": course.min_competencies_to_cover,
+        "uncovered": [cid for cid in course.coverage_priority if not competencies[cid]["turns"]],
+        "competencies": {
+            cid: {**e, "coverage": round(e["coverage"], 3)} for cid, e in competencies.items() if e["turns"]
+        },
+        "turns": turns,
+        "selected": selected,
+    }
+
+
+def excerpt_pairs(
+    qa_pairs: Sequence[Dict[str, str]],
+    selected: Sequence[int],
+    max_answer_chars: int = MAX_ANSWER_CHARS,
+) -> List[Dict[str, Any]]:
+    out = []
+    for i in selected:
+        answer = qa_pairs[i].get("answer") or ""
+        if len(answer) > max_answer_chars:
+            answer = answer[:max_answer_chars].rsplit(" ", 1)[0] + " ..."
+        out.append({"turn": i, "question": qa_pairs[i].get("question") or "", "answer": answer})
+    return out
+
+
+def compact_scores(scores: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The part of `score_turns` output that is sent to the model.
+    """
+    return {
+        "course": scores["course"],
+        "weighted_coverage": scores["weighted_coverage"],
+        "competencies_touched": scores["competencies_touched"],
+        "uncovered": scores["uncovered"],
+        "competencies": {
+            cid: {"w": e["weight"], "coverage": e["coverage"], "turns": e["turns"]}
+            for cid, e in scores["competencies"].items()
+        },
+    }
+
+
+def match_course(courses: Dict[str, Course], job_title: Optional[str]) -> Optional[Course]:
+    """
+    Course whose id, topic or listed designations appear in `job_title`.
+    """
+    title = " ".join(_words(job_title or ""))
+    if not title:
+        return None
+    best: Tuple[int, Optional[Course]] = (0, None)
+    for course in courses.values():
+        designations = (course.raw.get("job_context") or {}).get("designations") or []
+        names = [humanize(course.id), *course.topic.split("/"), *designations]
+        for name in names:
+            phrase = " ".join(_words(str(name)))
+            if phrase and f" {phrase} " in f" {title} " and len(phrase) > best[0]:
+                best = (len(phrase), course)
+    return best[1]
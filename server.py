@@ -1,35 +1,58 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
 import os
 import io
+import asyncio
 import json
+import copy
 import shutil
+import threading
 import re
 from uuid import uuid4
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Dict, Tuple
 import time
-import pandas as pd 
-import requests
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
-from openai import OpenAI
-from pypdf import PdfReader
-import docx
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.oauth2 import service_account
-import boto3
-from botocore.client import Config
 import tempfile
-from interview_analysis.analyzer import analyze_and_update
-from interview_analysis.simple_analysis import run_analysis_and_save
 from dataclasses import dataclass, asdict
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Body
-from fastapi import Request
-from typing import List, Optional
-from typing import Any
+from fastapi import Request, Response
+from typing import List, Optional, TYPE_CHECKING
+from typing import Any, Iterator
 import time
+from roster import RosterIndex, RosterError, normalize_unique_id
+from executors import run_in, call_in, get_pool, executor_stats, shutdown_executors
+from resume_cache import ResumeCache, make_resume_cache_key, prompt_version
+from session_bundles import SessionBundleStore
+from prewarm import PrewarmJob
+from spaces_upload import stream_upload_field, UploadStreamError, RECENT_UPLOADS
+from mp4_probe import Mp4DurationProbe
+from hls_playlist import HlsPlaylist, PlaylistPublisher
+from interview_events import InterviewEventHub
+from interview_store import InterviewStore
+from interview_archive import InterviewArchive, ArchiveWriter
+from prompt_compiler import PromptCompiler, CompiledPrompt
+from http_clients import get_client, http_stats, close_clients, add_response_hook
+from drive_client import DriveClient
+from analysis_queue import AnalysisQueue, transcript_hash, DONE, FAILED
+from evaluator import evaluate_turns, build_qa_pairs, build_user_prompt, fallback_result
+from openai_limiter import OpenAIRateLimiter, INTERACTIVE, BACKGROUND, BULK, estimate_tokens
+from spoken_audio import SpokenAudioIngest, append_instructions
+from question_bank import QuestionBankLoader
+from course_registry import CourseRegistry
+from rubric_scoring import match_course
+from text_extraction import TextExtractor
+from resume_stream import StreamingExtraction, parse_sections
+from stage_graph import StageGraph, StageTimings
+
+if TYPE_CHECKING:
+    # numpy / scipy: imported on first use (bulk ranking, reference index)
+    from resume_ranker import Candidate
+    from vector_index import VectorIndex, VectorStore
 
 # ---------------- ENV ----------------
 load_dotenv()
@@ -42,28 +65,59 @@ SPACES_REGION = os.getenv("SPACES_REGION", "sfo3")
 SPACES_BUCKET = os.getenv("SPACES_BUCKET")      # e.g. "interview-video-bucket"
 SPACES_KEY = os.getenv("SPACES_KEY")           # DO access key
 SPACES_SECRET = os.getenv("SPACES_SECRET")     # DO secret key
-MOBILE_INTERVIEWS: Dict[str, Dict[str, Any]] = {}
 if not all([SPACES_ENDPOINT, SPACES_BUCKET, SPACES_KEY, SPACES_SECRET]):
     raise RuntimeError("Spaces configuration missing in .env (SPACES_ENDPOINT, SPACES_BUCKET, SPACES_KEY, SPACES_SECRET)")
 
-spaces_session = boto3.session.Session()
-spaces_client = spaces_session.client(
-    "s3",
-    region_name=SPACES_REGION,
-    endpoint_url=SPACES_ENDPOINT,
-    aws_access_key_id=SPACES_KEY,
-    aws_secret_access_key=SPACES_SECRET,
-    config=Config(signature_version="s3v4")
-)
-
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY missing in .env")
 
 if not DRIVE_FOLDER_ID:
     raise RuntimeError("DRIVE_FOLDER_ID missing in .env (Google Drive folder containing the Excel)")
 
-# OpenAI client (used for analysis)
-client = OpenAI(api_key=OPENAI_API_KEY)
+# OpenAI client (used for analysis), on the shared keep-alive pool.
+# Retries are left to openai_limiter, which also reads the rate-limit headers.
+OPENAI_API_BASE = "https://api.openai.com"
+openai_limiter = OpenAIRateLimiter.from_env()
+add_response_hook(OPENAI_API_BASE, openai_limiter.observe_response)
+
+# ---------------- Lazily built clients ----------------
+# boto3 and the OpenAI SDK take a noticeable share of worker start-up, so
+# they are imported and their clients built on first use.
+_lazy_lock = threading.Lock()
+_openai_client: Optional[Any] = None
+_spaces_client: Optional[Any] = None
+
+
+def get_openai_client() -> Any:
+    global _openai_client
+    if _openai_client is None:
+        with _lazy_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                _openai_client = OpenAI(
+                    api_key=OPENAI_API_KEY, http_client=get_client(OPENAI_API_BASE).client, max_retries=0
+                )
+    return _openai_client
+
+
+def get_spaces_client() -> Any:
+    global _spaces_client
+    if _spaces_client is None:
+        with _lazy_lock:
+            if _spaces_client is None:
+                import boto3
+                from botocore.client import Config
+
+                _spaces_client = boto3.session.Session().client(
+                    "s3",
+                    region_name=SPACES_REGION,
+                    endpoint_url=SPACES_ENDPOINT,
+                    aws_access_key_id=SPACES_KEY,
+                    aws_secret_access_key=SPACES_SECRET,
+                    config=Config(signature_version="s3v4")
+                )
+    return _spaces_client
 
 # Models
 REALTIME_MODEL = os.getenv("REALTIME_MODEL", "gpt-4o-realtime-preview")
@@ -75,7 +129,7 @@ STATIC_DIR = BASE_DIR / "static"
 DATA_DIR = BASE_DIR / "data"
 RECORDINGS_DIR = STATIC_DIR / "recordings"
 EXCEL_LOCAL = DATA_DIR / "interview_data.xlsx"
-INTERVIEW_LOG = DATA_DIR / "interviews.jsonl"
+INTERVIEW_LOG = DATA_DIR / "interviews.jsonl"   # active archive segment
 INSTR_DIR = DATA_DIR / "instructions"   # 🔹 NEW
 INSTR_DIR.mkdir(parents=True, exist_ok=True)
 STATIC_DIR.mkdir(exist_ok=True)
@@ -83,14 +137,58 @@ DATA_DIR.mkdir(exist_ok=True)
 RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
 RESUME_DIR = BASE_DIR / "resumes"
 RESUME_DIR.mkdir(parents=True, exist_ok=True)
+RESUME_CACHE_DIR = RESUME_DIR / "cache"
+RESUME_CACHE_MAX_MB = int(os.getenv("RESUME_CACHE_MAX_MB", "64"))
+resume_cache = ResumeCache(RESUME_CACHE_DIR, max_bytes=RESUME_CACHE_MAX_MB * 1024 * 1024)
+
+# PDF/DOCX text extraction in worker processes, with page/time budgets and a content-hash cache
+text_extractor = TextExtractor(
+    RESUME_DIR / "text_cache",
+    workers=int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_pages=int(os.getenv("EXTRACT_MAX_PAGES", "40")),
+    timeout_seconds=float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "20")),
+)
+
+# interviews.jsonl archive: group-committed appends, size rotation, id -> offset index.
+# Rotation is off by default: interview_analysis still scans interviews.jsonl
+# itself and would not see rotated records.
+INTERVIEW_LOG_ROTATE_MB = int(os.getenv("INTERVIEW_LOG_ROTATE_MB", "0"))
+INTERVIEW_LOG_COMPRESS = os.getenv("INTERVIEW_LOG_COMPRESS", "0") == "1"
+interview_archive = InterviewArchive(
+    DATA_DIR,
+    rotate_bytes=INTERVIEW_LOG_ROTATE_MB * 1024 * 1024,
+    compress=INTERVIEW_LOG_COMPRESS,
+)
+interview_writer = ArchiveWriter(interview_archive)
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 # ---------------- Google Drive client ----------------
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
-creds = service_account.Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-drive = build("drive", "v3", credentials=creds)
+# built on first use from a static discovery document: one service per thread
+# over the pooled, thread-safe DriveHttp transport
+drive_client = DriveClient(
+    CREDENTIALS_FILE,
+    SCOPES,
+    discovery_file=os.getenv("DRIVE_DISCOVERY_FILE") or None,
+    metadata_ttl_seconds=float(os.getenv("DRIVE_METADATA_TTL_SECONDS", "600")),
+)
+
+# ---------------- Candidate roster (Drive Excel, cached in memory) ----------------
+ROSTER_TTL_SECONDS = float(os.getenv("ROSTER_TTL_SECONDS", "60"))
+# an unknown Unique ID triggers a recheck at most this often, waited on for at most
+# ROSTER_MISS_WAIT_SECONDS
+ROSTER_MISS_RECHECK_SECONDS = float(os.getenv("ROSTER_MISS_RECHECK_SECONDS", "10"))
+ROSTER_MISS_WAIT_SECONDS = float(os.getenv("ROSTER_MISS_WAIT_SECONDS", "2"))
+roster = RosterIndex(
+    drive_factory=drive_client.service,
+    folder_id=DRIVE_FOLDER_ID,
+    local_path=EXCEL_LOCAL,
+    ttl_seconds=ROSTER_TTL_SECONDS,
+    miss_recheck_seconds=ROSTER_MISS_RECHECK_SECONDS,
+    miss_wait_seconds=ROSTER_MISS_WAIT_SECONDS,
+)
 
 # ---------------- LiveKit / Premises Streaming Config ----------------
 
@@ -157,7 +255,34 @@ def _resolve_livekit_http_url() -> Optional[str]:
 #     )
 
 
-# ---------------- In-memory interview store (same semantics as Node) ----------------
+# ---------------- Interview store (SQLite, shared by all workers) ----------------
+INTERVIEW_DB = Path(os.getenv("INTERVIEW_DB", str(DATA_DIR / "interviews.db")))
+interview_store = InterviewStore(INTERVIEW_DB)
+
+# ---------------- Analysis job queue (SQLite, worker threads) ----------------
+ANALYSIS_QUEUE_DB = Path(os.getenv("ANALYSIS_QUEUE_DB", str(DATA_DIR / "analysis_jobs.db")))
+analysis_queue = AnalysisQueue(
+    ANALYSIS_QUEUE_DB,
+    workers=int(os.getenv("ANALYSIS_WORKERS", "2")),
+    max_attempts=int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "5")),
+)
+
+
+def _run_simple_analysis(candidate_id: str) -> Any:
+    from interview_analysis.simple_analysis import run_analysis_and_save
+
+    return run_analysis_and_save(candidate_id)
+
+
+def _run_full_analysis(candidate_id: str) -> Any:
+    from interview_analysis.analyzer import analyze_and_update
+
+    return analyze_and_update(candidate_id)
+
+
+analysis_queue.register("simple", _run_simple_analysis)
+analysis_queue.register("full", _run_full_analysis)
+ANALYSIS_WAIT_SECONDS = 180
 
 @dataclass
 class InterviewAttempt:
@@ -178,19 +303,42 @@ class InterviewAttempt:
         return d
 
 
-INTERVIEW_ATTEMPTS: List[InterviewAttempt] = []
-
-
 def create_interview_id() -> str:
     # same pattern as Node: "int-" + Date.now()
     return f"int-{int(time.time() * 1000)}"
 
 
+def _attempt_from_record(rec: Dict) -> InterviewAttempt:
+    return InterviewAttempt(
+        id=rec["id"],
+        candidateName=rec["candidateName"],
+        jobTitle=rec["jobTitle"],
+        status=rec["status"],
+        premisesVideoPath=rec["premisesVideoPath"],
+        segments=interview_store.list_segments(rec["id"]),
+        roomName=rec["roomName"],
+        egressId=rec["egressId"],
+    )
+
+
 def find_attempt(interview_id: str) -> InterviewAttempt | None:
-    for att in INTERVIEW_ATTEMPTS:
-        if att.id == interview_id:
-            return att
-    return None
+    rec = interview_store.get_attempt(interview_id, kind="dev")
+    return _attempt_from_record(rec) if rec else None
+
+
+def save_attempt(att: InterviewAttempt) -> None:
+    interview_store.update_attempt(
+        att.id,
+        status=att.status,
+        premisesVideoPath=att.premisesVideoPath,
+        roomName=att.roomName,
+        egressId=att.egressId,
+    )
+# streaming uploads: part size (MB) and parts in flight per upload
+UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE_MB", "8")) * 1024 * 1024
+UPLOAD_MAX_PARALLEL_PARTS = int(os.getenv("UPLOAD_MAX_PARALLEL_PARTS", "4"))
+
+
 def make_spaces_public_url(key: str) -> str:
     # key like "segments/CAND_001/12345_segment.mp4" or "segments/CAND_001/index.m3u8"
     base = SPACES_ENDPOINT.replace("https://", f"https://{SPACES_BUCKET}.")
@@ -201,7 +349,7 @@ def upload_file_to_spaces(file_path: Path, key: str, content_type: str = "video/
         raise RuntimeError("SPACES_BUCKET not configured")
 
     with open(file_path, "rb") as f:
-        spaces_client.upload_fileobj(
+        get_spaces_client().upload_fileobj(
             f,
             SPACES_BUCKET,
             key,
@@ -214,12 +362,33 @@ def upload_file_to_spaces(file_path: Path, key: str, content_type: str = "video/
     return make_spaces_public_url(key)
 
 
+# ---------------- Helpers: blocking I/O run on executor pools ----------------
+def _copy_upload_to_path(src, dest: Path) -> None:
+    with dest.open("wb") as f_out:
+        shutil.copyfileobj(src, f_out)
+
+
+def _transcribe_file(path: str):
+    def transcribe():
+        # reopened per attempt so a retry re-sends the whole file
+        with open(path, "rb") as f:
+            return get_openai_client().audio.transcriptions.create(
+                model="whisper-1",
+                file=f,
+            )
+
+    return openai_limiter.call("whisper-1", transcribe, priority=INTERACTIVE)
+
+
 # ---------------- Helpers: Excel + resume reading ----------------
 def download_excel_from_folder(folder_id: str) -> Path:
     """
     Find the first .xlsx inside the Drive folder and download it to DATA_DIR/interview_data.xlsx
     """
+    from googleapiclient.http import MediaIoBaseDownload
+
     q = f"'{folder_id}' in parents and trashed=false and (mimeType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' or mimeType='application/vnd.ms-excel')"
+    drive = drive_client.service()
     files = drive.files().list(q=q, fields="files(id,name)").execute().get("files", [])
     if not files:
         raise RuntimeError("No Excel file found in Drive folder.")
@@ -237,27 +406,29 @@ def get_excel_row_by_id(candidate_id: str) -> Dict:
     """
     Validate a candidate_id against the Excel 'Unique ID' column.
     Returns the row as a dict, or raises HTTPException(404) if not found.
-    """
-    # always ensure we have the latest Excel
-    download_excel_from_folder(DRIVE_FOLDER_ID)
 
-    df = pd.read_excel(EXCEL_LOCAL)
-
-    if "Unique ID" not in df.columns:
-        raise HTTPException(status_code=500, detail="Excel missing 'Unique ID' column")
+    Lookups go through the in-memory roster, which revalidates against
+    Drive's modifiedTime/md5Checksum every ROSTER_TTL_SECONDS.
+    """
+    try:
+        row = roster.get(candidate_id)
+    except RosterError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    row_df = df[df["Unique ID"].astype(str).str.strip() == str(candidate_id).strip()]
-    if row_df.empty:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Invalid interview id: {candidate_id}")
 
-    return dict(row_df.iloc[0].to_dict())
-def get_or_create_mobile_interview(candidate_id: str) -> Dict:
+    return row
+def get_or_create_mobile_interview(candidate_id: str, include_segments: bool = True) -> Dict:
     """
     Ensure we have a mobile-interview record for this candidate_id.
     Validates against Excel before creating.
     """
-    if candidate_id in MOBILE_INTERVIEWS:
-        return MOBILE_INTERVIEWS[candidate_id]
+    attempt = interview_store.get_attempt(candidate_id, kind="mobile")
+    if attempt is not None:
+        if include_segments:
+            attempt["segments"] = interview_store.list_segments(candidate_id)
+        return attempt
 
     row = get_excel_row_by_id(candidate_id)
 
@@ -277,9 +448,13 @@ def get_or_create_mobile_interview(candidate_id: str) -> Dict:
         "jobTitle": job_title,
         "status": "PENDING",
         "premisesVideoPath": None,
-        "segments": [],
     }
-    MOBILE_INTERVIEWS[candidate_id] = attempt
+    # another worker may win the race; either way read back the stored row
+    interview_store.create_attempt(attempt, kind="mobile")
+    attempt = interview_store.get_attempt(candidate_id, kind="mobile")
+    if attempt is None:
+        raise HTTPException(status_code=409, detail=f"Interview id already used: {candidate_id}")
+    attempt["segments"] = interview_store.list_segments(candidate_id) if include_segments else []
     return attempt
 
 def extract_drive_file_id(url: str) -> str:
@@ -299,9 +474,17 @@ def extract_drive_file_id(url: str) -> str:
     parts = url.rstrip("/").split("/")
     return parts[-1]
 
-def download_drive_file_to_temp(file_id: str, dest: Path) -> Path:
-    meta = drive.files().get(fileId=file_id, fields="mimeType,name").execute()
-    mime = meta.get("mimeType", "")
+def download_drive_file_to_temp(file_id: str, dest: Path, mime: Optional[str] = None) -> Path:
+    """
+    Download (or export, for Google Docs) a Drive file to `dest`. Pass the
+    `mime` type when the caller already has the file's metadata; otherwise
+    it is looked up here.
+    """
+    from googleapiclient.http import MediaIoBaseDownload
+
+    drive = drive_client.service()
+    if mime is None:
+        mime = drive_client.metadata(file_id, "mimeType,name").get("mimeType", "")
 
     dest.parent.mkdir(parents=True, exist_ok=True)
 
@@ -413,6 +596,13 @@ Required JSON Format:
     "developer_tools": [],
     "ai_tools": []
   },
+  "projects": [
+    {
+      "title": "",
+      "technologies": [],
+      "description": []
+    }
+  ],
   "education": [
     {
       "institution": "",
@@ -422,13 +612,6 @@ Required JSON Format:
       "cgpa": ""
     }
   ],
-  "projects": [
-    {
-      "title": "",
-      "technologies": [],
-      "description": []
-    }
-  ],
   "certifications": []
 }
 
@@ -437,15 +620,58 @@ Now extract and return the JSON from the following resume text:
 <<RESUME_TEXT>>
 """
 
-def clean_and_structure_resume_with_ai(raw_resume_text: str) -> dict:
+# bump automatically whenever the prompt or model changes
+RESUME_PROMPT_VERSION = prompt_version(RESUME_EXTRACTION_PROMPT, ANALYSIS_MODEL)
+# Drive fields a resume needs: type/name for the download, md5/modifiedTime for the cache key
+RESUME_META_FIELDS = "id,mimeType,name,md5Checksum,modifiedTime"
+
+# Streaming mode: sections are parsed as the completion arrives, and /session
+# continues once RESUME_SESSION_REQUIRED are in (or after the deadline) while
+# the rest is finished and cached in the background.
+RESUME_STREAMING = os.getenv("RESUME_STREAMING", "1") == "1"
+RESUME_SESSION_DEADLINE_SECONDS = float(os.getenv("RESUME_SESSION_DEADLINE_SECONDS", "10"))
+RESUME_SESSION_REQUIRED = tuple(
+    k.strip() for k in os.getenv("RESUME_SESSION_REQUIRED", "work_experience,technical_skills,projects").split(",")
+    if k.strip()
+)
+
+EMPTY_STRUCTURED_RESUME = {
+    "work_experience": [],
+    "technical_skills": {
+        "programming_and_scripting": [],
+        "web_development": [],
+        "apis_and_integrations": [],
+        "databases": [],
+        "developer_tools": [],
+        "ai_tools": []
+    },
+    "education": [],
+    "projects": [],
+    "certifications": []
+}
+
+
+def _complete_resume(sections: dict) -> dict:
+    # sections the model never produced (or that failed to parse) stay empty
+    return {**copy.deepcopy(EMPTY_STRUCTURED_RESUME), **sections}
+
+
+def clean_and_structure_resume_with_ai(raw_resume_text: str) -> Tuple[dict, dict]:
+    """
+    (structured resume, errors). `errors` names the sections that were
+    salvaged or lost when the output was not valid JSON.
+    """
 
     prompt = RESUME_EXTRACTION_PROMPT.replace("<<RESUME_TEXT>>", raw_resume_text)
 
-    resp = client.chat.completions.create(
+    resp = openai_limiter.call(
+        ANALYSIS_MODEL,
+        get_openai_client().chat.completions.create,
         model=ANALYSIS_MODEL,
         messages=[{"role": "user", "content": prompt}],
         temperature=0.0,
-        max_tokens=2000
+        max_tokens=2000,
+        tokens=estimate_tokens(prompt, completion=2000),
     )
 
     raw_out = resp.choices[0].message.content.strip()
@@ -453,33 +679,195 @@ def clean_and_structure_resume_with_ai(raw_resume_text: str) -> dict:
     try:
         structured = json.loads(raw_out)
     except Exception as e:
-        print("❌ Resume JSON parse failed:", e)
-        print("❌ RAW MODEL OUTPUT:", raw_out)
-        structured = {
-            "work_experience": [],
-            "technical_skills": {
-                "programming_and_scripting": [],
-                "web_development": [],
-                "apis_and_integrations": [],
-                "databases": [],
-                "developer_tools": [],
-                "ai_tools": []
-            },
-            "education": [],
-            "projects": [],
-            "certifications": []
-        }
+        # keep every section that parsed instead of dropping the whole resume
+        sections, errors = parse_sections(raw_out)
+        print("❌ Resume JSON parse failed:", e, "| kept sections:", sorted(sections), "| failed:", errors)
+        return _complete_resume(sections), {"(json)": str(e), **errors}
+
+    return structured, {}
+
+
+def _resume_deltas(raw_resume_text: str, priority: int) -> Iterator[str]:
+    """
+    Text deltas of a streamed structuring completion. The request is made
+    lazily, on the thread that consumes the stream, at the caller's priority.
+    """
+    prompt = RESUME_EXTRACTION_PROMPT.replace("<<RESUME_TEXT>>", raw_resume_text)
+    # the limiter slot is held until the stream is closed
+    with openai_limiter.streaming(
+        ANALYSIS_MODEL,
+        get_openai_client().chat.completions.create,
+        priority=priority,
+        model=ANALYSIS_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.0,
+        max_tokens=2000,
+        stream=True,
+        tokens=estimate_tokens(prompt, completion=2000),
+    ) as stream:
+        try:
+            for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        finally:
+            stream.close()
+
+
+
+def _has_resume_content(structured: dict) -> bool:
+    # the parse-failure fallback is all empty sections; never cache that
+    for value in structured.values():
+        if isinstance(value, dict):
+            if any(value.values()):
+                return True
+        elif value:
+            return True
+    return False
+
+
+def _save_structured_resume(file_id: str, cache_key: Optional[str], structured: dict, errors: Optional[dict] = None) -> None:
+    # ✅ SAVE STRUCTURED JSON TO FILE (PROOF OF SUCCESS)
+    parsed_json_path = RESUME_DIR / f"{file_id}_parsed.json"
+    with open(parsed_json_path, "w", encoding="utf-8") as jf:
+        json.dump(structured, jf, ensure_ascii=False, indent=2)
 
-    return structured
+    if errors:
+        # salvaged sections are usable now, but a retry may do better; don't cache them
+        print("⚠️ Resume sections failed to parse:", file_id, errors)
+    elif _has_resume_content(structured):
+        resume_cache.put(cache_key, structured)
 
 
+def _timed(timings: Optional[StageTimings], name: str):
+    return timings.measure(name) if timings is not None else nullcontext()
 
-def build_jd_resume_json_from_excel_row(row: dict) -> Tuple[dict, dict]:
+
+def fetch_structured_resume(
+    file_id: str,
+    deadline_seconds: Optional[float] = None,
+    timings: Optional[StageTimings] = None,
+    meta: Optional[dict] = None,
+) -> Tuple[dict, bool]:
+    """
+    Return (structured resume, partial) for a Drive file.
+
+    Checks the content-addressed cache first (Drive md5Checksum + prompt
+    version); on a hit the download, text extraction and LLM call are skipped.
+
+    With streaming and a deadline, returns as soon as RESUME_SESSION_REQUIRED
+    sections have arrived (or the deadline passes) with partial=True; the
+    stream keeps running and the complete resume is saved/cached when it ends.
+
+    The Drive metadata is fetched once (or comes from a batched prefetch,
+    see prefetch_resume_metadata, or from the caller as `meta`) and reused
+    for the download. Each step is recorded in `timings` when given.
+    """
+    # detect file type (and content fingerprint for the cache)
+    if meta is None:
+        with _timed(timings, "resume_meta"):
+            meta = call_in("drive", drive_client.metadata, file_id, RESUME_META_FIELDS)
+    name = meta.get("name", "")
+
+    cache_key = make_resume_cache_key(meta, RESUME_PROMPT_VERSION)
+    cached = resume_cache.get(cache_key)
+    if cached is not None:
+        print("✅ Resume cache hit:", file_id)
+        return cached, False
+
+    # temp paths
+    base = RESUME_DIR / file_id
+    pdf_path = base.with_suffix(".pdf")
+    docx_path = base.with_suffix(".docx")
+
+    # choose correct destination
+    if name.lower().endswith(".pdf"):
+        dest = pdf_path
+    elif name.lower().endswith(".docx"):
+        dest = docx_path
+    else:
+        # default to pdf
+        dest = pdf_path
+    # ✅ Force delete if file already exists (prevents permission error)
+    if dest.exists():
+        try:
+            dest.unlink()
+        except Exception as e:
+            print("⚠️ Could not delete old resume file:", e)
+
+    # download
+    with _timed(timings, "resume_download"):
+        dest = call_in("drive", download_drive_file_to_temp, file_id, dest, meta.get("mimeType", ""))
+
+    print("✅ Final downloaded resume file path:", dest)
+
+    with _timed(timings, "resume_extract"):
+        full_text, extract_problem = call_in("cpu", extract_text_from_file, dest)
+
+    if not full_text.strip():
+        raise RuntimeError(f"Resume downloaded but text extraction failed. {extract_problem}".strip())
+    # partial text is good enough for now, but the result must not be cached
+    extract_errors = {"(extract)": extract_problem} if extract_problem else {}
+
+    # ✅ AI CLEANING + SEGREGATION
+    if not RESUME_STREAMING:
+        with _timed(timings, "resume_structure"):
+            structured_resume, errors = call_in("openai", clean_and_structure_resume_with_ai, full_text)
+        _save_structured_resume(file_id, cache_key, structured_resume, {**extract_errors, **errors})
+        return structured_resume, False
+
+    def on_complete(sections: dict, errors: dict) -> None:
+        if sections:
+            _save_structured_resume(file_id, cache_key, _complete_resume(sections), {**extract_errors, **errors})
+        print("[resume-stream]", file_id, extraction.timings(), "sections:", sorted(sections))
+
+    extraction = StreamingExtraction(_resume_deltas(full_text, openai_limiter.current_priority()), on_complete=on_complete)
+    get_pool("openai").submit(extraction.consume)
+
+    with _timed(timings, "resume_structure"):
+        if deadline_seconds is not None:
+            sections, finished = extraction.wait(deadline_seconds, RESUME_SESSION_REQUIRED)
+            if not finished:
+                print("[resume-stream]", file_id, "continuing with partial resume:", sorted(sections))
+                return _complete_resume(sections), True
+        # raises the stream's error only if nothing at all was parsed
+        return _complete_resume(extraction.result()), False
+
+
+def load_structured_resume(file_id: str, meta: Optional[dict] = None) -> dict:
+    """
+    Return the complete AI-structured resume for a Drive file.
+    """
+    return fetch_structured_resume(file_id, meta=meta)[0]
+
+
+def resume_url_from_row(row: dict) -> str:
+    resume_url_raw = str(
+        row.get("Resume URL")
+        or row.get("ResumeURL")
+        or row.get("Resume")
+        or ""
+    ).strip()
+
+    # ✅ Extract actual URL from Excel HYPERLINK if needed
+    match = re.search(r'https?://[^\s"]+', resume_url_raw)
+    return match.group(0) if match else ""
+
+
+def build_jd_resume_json_from_excel_row(
+    row: dict,
+    resume_deadline: Optional[float] = None,
+    timings: Optional[StageTimings] = None,
+    resume_meta: Optional[dict] = None,
+) -> Tuple[dict, dict]:
     """
     Convert one Excel row into JD JSON + Resume JSON.
 
     Excel expected headers:
         'Unique ID', 'Name of the company', 'JD', 'Resume URL'
+
+    With `resume_deadline` the resume may be partial; resume_json then
+    carries "partial": True. `resume_meta` is the resume's Drive metadata
+    when the caller already has it.
     """
 
     # ----------- READ JD TEXT -----------
@@ -487,23 +875,11 @@ def build_jd_resume_json_from_excel_row(row: dict) -> Tuple[dict, dict]:
     job_title = jd_text.splitlines()[0].strip() if jd_text else "Unknown role"
 
     # ----------- RESUME URL --------------
-    resume_url_raw = str(
-    row.get("Resume URL")
-    or row.get("ResumeURL")
-    or row.get("Resume")
-    or ""
-)
-
-    resume_url_raw = resume_url_raw.strip()
-
-
-# ✅ Extract actual URL from Excel HYPERLINK if needed
-    match = re.search(r'https?://[^\s"]+', resume_url_raw)
-    resume_url = match.group(0) if match else ""
-
+    resume_url = resume_url_from_row(row)
 
     resume_text = ""
     candidate_name = ""
+    partial = False
     structured_resume = {
     "education": [],
     "skills": [],
@@ -519,49 +895,7 @@ def build_jd_resume_json_from_excel_row(row: dict) -> Tuple[dict, dict]:
         try:
             file_id = extract_drive_file_id(resume_url)
 
-            # temp paths
-            base = RESUME_DIR / file_id
-            pdf_path = base.with_suffix(".pdf")
-            docx_path = base.with_suffix(".docx")
-
-
-            # detect file type
-            meta = drive.files().get(fileId=file_id, fields="mimeType,name").execute()
-            name = meta.get("name", "")
-
-            # choose correct destination
-            if name.lower().endswith(".pdf"):
-                dest = pdf_path
-            elif name.lower().endswith(".docx"):
-                dest = docx_path
-            else:
-                # default to pdf
-                dest = pdf_path
-            # ✅ Force delete if file already exists (prevents permission error)
-            if dest.exists():
-                try:
-                    dest.unlink()
-                except Exception as e:
-                    print("⚠️ Could not delete old resume file:", e)
-
-            # download
-            dest = download_drive_file_to_temp(file_id, dest)
-
-            print("✅ Final downloaded resume file path:", dest)
-
-            full_text = extract_text_from_file(dest)
-
-
-            if not full_text.strip():
-                raise RuntimeError("Resume downloaded but text extraction failed.")
-
-            # ✅ AI CLEANING + SEGREGATION
-            structured_resume = clean_and_structure_resume_with_ai(full_text)
-
-            # ✅ SAVE STRUCTURED JSON TO FILE (PROOF OF SUCCESS)
-            parsed_json_path = RESUME_DIR / f"{file_id}_parsed.json"
-            with open(parsed_json_path, "w", encoding="utf-8") as jf:
-                json.dump(structured_resume, jf, ensure_ascii=False, indent=2)
+            structured_resume, partial = fetch_structured_resume(file_id, resume_deadline, timings, resume_meta or None)
 
             # ✅ STRING VERSION FOR PROMPT
             resume_text = json.dumps(structured_resume, ensure_ascii=False, indent=2)
@@ -600,6 +934,8 @@ def build_jd_resume_json_from_excel_row(row: dict) -> Tuple[dict, dict]:
     "resume_url": resume_url,
     "parsed_sections": structured_resume  # ✅ for reference inside JD prompt
 }
+    if partial:
+        resume_json["partial"] = True
 
 
     return jd_json, resume_json
@@ -607,60 +943,23 @@ def build_jd_resume_json_from_excel_row(row: dict) -> Tuple[dict, dict]:
 
 
 
-def extract_text_from_file(path: Path) -> str:
-    ext = path.suffix.lower()
-    if ext == ".pdf":
-        try:
-            reader = PdfReader(str(path))
-            pages = [p.extract_text() or "" for p in reader.pages]
-            return "\n".join(pages)
-        except Exception:
-            return ""
-    if ext in (".docx",):
-        try:
-            doc = docx.Document(str(path))
-            return "\n".join(p.text for p in doc.paragraphs)
-        except Exception:
-            return ""
-    # other fallback
-    try:
-        return path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return ""
-
-import re
-
-
-
-
-def jd_resume_instructions(jd_json: dict, resume_json: dict) -> str:
+def extract_text_from_file(path: Path) -> Tuple[str, str]:
     """
-    Build the full system prompt for the AI interviewer.
-
-    - Uses JD JSON + Resume JSON
-    - Forces a clear structure:
-        Phase 1  – warmup
-        Phase 2  – resume-driven questions (mandatory)
-        Phase 3  – JD-driven questions
-        Phase 4  – realistic scenarios
+    (text, problem). `problem` is non-empty when the time budget ran out or
+    the parser failed; the text may then be partial and must not be cached.
     """
+    result = text_extractor.extract(path)
+    print("[extract]", json.dumps(result.report()))
+    if result.timed_out:
+        return result.text, f"timed out after {result.pages_extracted} pages"
+    return result.text, result.error
+
+import re
 
-    candidate_name = (resume_json.get("full_name") or "the candidate").strip()
-    job_title = (jd_json.get("job_title") or "the role").strip()
-    resume_raw = (resume_json.get("raw_text") or "").strip()
 
-    has_resume = bool(resume_raw) and not resume_raw.startswith("(Failed to read resume")
 
-    ctx_blob = json.dumps(
-        {
-            "job_description": jd_json,
-            "candidate_profile": resume_json,
-        },
-        ensure_ascii=False,
-        indent=2,
-    )
 
-    return f"""
+INTERVIEWER_PREFIX_TEMPLATE = """
 You are a professional Indian-English male technical interviewer.
 
 Your job is to conduct a structured, realistic interview for the candidate based strictly on:
@@ -712,18 +1011,6 @@ STRICT INTERVIEW BEHAVIOUR
 - Do NOT say phrases like "Since I don't have your resume", "I don't see your resume", or "Based on limited profile".
 - Never admit missing information. Always ask directly and confidently.
 
-==================
-MANDATORY OPENING
-==================
-Your VERY FIRST spoken output MUST be EXACTLY:
-
-"Hello {candidate_name}. Let's begin your interview for the role of {job_title}. To start, please tell me about yourself and give a short overview of your background."
-
-Rules for the first turn:
-- Do NOT add extra words before or after this sentence.
-- Do NOT combine this with any other question.
-- After the candidate finishes answering, continue with Phase 1 below.
-
 =====================================
 OVERALL INTERVIEW STRUCTURE (PHASES)
 =====================================
@@ -880,131 +1167,766 @@ For EVERY question you speak:
 ===============================
 END OF INSTRUCTIONS (DO NOT READ ALOUD)
 ===============================
-Use ONLY the following JSON context as your knowledge of the role and candidate:
+Use ONLY the JSON context at the end of these instructions as your knowledge of the role and candidate.
+"""
+
+# everything candidate-specific goes after the cached prefix
+INTERVIEWER_TAIL_TEMPLATE = """
+==================
+MANDATORY OPENING
+==================
+Your VERY FIRST spoken output MUST be EXACTLY:
+
+"Hello {candidate_name}. Let's begin your interview for the role of {job_title}. To start, please tell me about yourself and give a short overview of your background."
+
+Rules for the first turn:
+- Do NOT add extra words before or after this sentence.
+- Do NOT combine this with any other question.
+- After the candidate finishes answering, continue with Phase 1 of the interview structure above.
+
+======================
+ROLE AND CANDIDATE CONTEXT (JSON)
+======================
+If the context has "interview_reference", it lists question-bank questions and course competencies
+matched to this JD and resume. Use them as material for Phase 3 (JD-driven questions): rephrase them
+conversationally, ask one at a time, and skip any that do not fit the candidate's answers.
+
+{context}
+"""
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+prompt_compiler = PromptCompiler(
+    INTERVIEWER_PREFIX_TEMPLATE,
+    INTERVIEWER_TAIL_TEMPLATE,
+    budget_tokens=PROMPT_TOKEN_BUDGET,
+)
+
+
+def compile_interviewer_prompt(jd_json: dict, resume_json: dict, spoken_instr: str = "") -> CompiledPrompt:
+    """
+    Build the system prompt for the AI interviewer from JD JSON + Resume JSON
+    (+ optional spoken instructions), within PROMPT_TOKEN_BUDGET.
+
+    The prompt forces a clear structure:
+        Phase 1  – warmup
+        Phase 2  – resume-driven questions (mandatory)
+        Phase 3  – JD-driven questions
+        Phase 4  – realistic scenarios
+    """
+    try:
+        reference = interview_reference(jd_json, resume_json)
+    except Exception as e:
+        # reference material is optional; never fail a session over it
+        print("[vector-index] reference lookup failed:", e)
+        reference = None
+    return prompt_compiler.compile(jd_json, resume_json, spoken_instr, reference=reference)
+
+
+def jd_resume_instructions(jd_json: dict, resume_json: dict) -> str:
+    return compile_interviewer_prompt(jd_json, resume_json).text
 
-{ctx_blob}
-""".strip()
 
 
 
 
 
+# ---------------- Question bank (data/*.quiz.json) ----------------
+question_bank = QuestionBankLoader(DATA_DIR)
+QUIZ_MAX_QUESTIONS = 50
+
+
+@app.get("/api/quiz/roles")
+async def quiz_roles():
+    bank = await run_in("cpu", question_bank.current)
+    return {"roles": bank.roles(), **bank.stats()}
+
+
+@app.get("/api/quiz/{role}/sample")
+async def quiz_sample(role: str, k: int = 10, topics: str = "", seed: Optional[int] = None):
+    """
+    Randomized quiz for a role, spread across its topics (or the
+    comma-separated `topics`), without near-duplicate questions.
+    """
+    bank = await run_in("cpu", question_bank.current)
+    if role not in bank.topics:
+        raise HTTPException(status_code=404, detail=f"Unknown quiz role '{role}'")
+    wanted = [t.strip() for t in topics.split(",") if t.strip()] or None
+    questions = bank.sample(role, max(0, min(k, QUIZ_MAX_QUESTIONS)), topics=wanted, seed=seed)
+    return {"role": role, "count": len(questions), "questions": [q.to_dict() for q in questions]}
+
+
+@app.get("/api/quiz/duplicates")
+async def quiz_duplicates(cross_topic: bool = True):
+    bank = await run_in("cpu", question_bank.current)
+    groups = bank.duplicate_groups(cross_topic_only=cross_topic)
+    return {"groups": len(groups), "duplicates": groups}
+
+
+# ---------------- Course registry (data/*.course.json) ----------------
+# data/ wins over the legacy top-level pcb.json when both define "pcb"
+course_registry = CourseRegistry([(DATA_DIR, "*.course.json"), BASE_DIR / "pcb.json"])
+
+
+def _get_course(catalog, course_id: str):
+    course = catalog.get(course_id)
+    if course is None:
+        raise HTTPException(status_code=404, detail=f"Unknown course '{course_id}'")
+    return course
+
+
+@app.get("/api/courses")
+async def list_courses():
+    catalog = await run_in("cpu", course_registry.current)
+    return {"courses": [c.summary() for c in catalog.courses.values()], **catalog.stats()}
+
+
+@app.get("/api/courses/{course_id}")
+async def get_course(course_id: str):
+    catalog = await run_in("cpu", course_registry.current)
+    return _get_course(catalog, course_id).to_dict()
+
+
+@app.get("/api/courses/{course_id}/probes")
+async def course_probes(course_id: str, competency: str = "", subskill: str = "", templates: str = ""):
+    """
+    Expanded probe questions, optionally narrowed to one competency,
+    one subskill and/or comma-separated template ids.
+    """
+    catalog = await run_in("cpu", course_registry.current)
+    course = _get_course(catalog, course_id)
+    if competency and competency not in course.by_id:
+        raise HTTPException(status_code=404, detail=f"Unknown competency '{competency}'")
+    if subskill and subskill not in course.subskill_owner:
+        raise HTTPException(status_code=404, detail=f"Unknown subskill '{subskill}'")
+    wanted = [t.strip() for t in templates.split(",") if t.strip()] or None
+    probes = course.probes_for(competency or None, subskill or None, wanted)
+    return {"course": course.id, "count": len(probes), "probes": [p.to_dict() for p in probes]}
+
+
+# ---------------- Reference vectors (quiz questions + competencies) ----------------
+VECTOR_INDEX_DIR = DATA_DIR / "vector_index"
+REFERENCE_QUESTIONS = int(os.getenv("REFERENCE_QUESTIONS", "15"))
+REFERENCE_COMPETENCIES = int(os.getenv("REFERENCE_COMPETENCIES", "5"))
+# only applies when the JD matches no course and every role's bank is searched
+REFERENCE_MIN_SCORE = float(os.getenv("REFERENCE_MIN_SCORE", "0.15"))
+_vector_store: Optional["VectorStore"] = None
+
+
+def get_vector_store() -> "VectorStore":
+    # numpy is imported with the store, on first use
+    global _vector_store
+    if _vector_store is None:
+        with _lazy_lock:
+            if _vector_store is None:
+                from vector_index import VectorStore, load_embedder
+
+                _vector_store = VectorStore(VECTOR_INDEX_DIR, load_embedder(os.getenv("VECTOR_EMBEDDER", "")))
+    return _vector_store
+
+
+def reference_index() -> "VectorIndex":
+    from vector_index import reference_items
+
+    def sources():
+        bank = question_bank.current()
+        catalog = course_registry.current()
+        return (bank, catalog), lambda: reference_items(bank, catalog)
+
+    return get_vector_store().current(sources)
+
+
+def _reference_query(jd_json: dict, resume_json: dict) -> str:
+    parsed = (resume_json or {}).get("parsed_sections") or {}
+    parts = [str((jd_json or {}).get("job_title") or ""), str((jd_json or {}).get("raw_text") or "")]
+    for key in ("technical_skills", "skills", "tools", "domains"):
+        parts.append(json.dumps(parsed.get(key) or "", ensure_ascii=False))
+    for project in parsed.get("projects") or []:
+        if isinstance(project, dict):
+            parts.append(f"{project.get('title', '')} {' '.join(map(str, project.get('technologies') or []))}")
+    for job in parsed.get("work_experience") or parsed.get("experience") or []:
+        if isinstance(job, dict):
+            parts.append(str(job.get("job_title") or ""))
+    return " ".join(p for p in parts if p)
+
+
+def interview_reference(jd_json: dict, resume_json: dict) -> Dict[str, Any]:
+    """
+    Bank questions and course competencies closest to this JD + resume.
+    A JD that matches a course is searched in that course's bank only.
+    """
+    index = reference_index()
+    course = match_course(course_registry.current().courses, (jd_json or {}).get("job_title"))
+    groups = [course.id] if course else None
+    min_score = 0.0 if course else REFERENCE_MIN_SCORE
+    query = get_vector_store().query(_reference_query(jd_json, resume_json))
+    competencies = index.search(query, "competency", groups, k=REFERENCE_COMPETENCIES, min_score=min_score)
+    questions = index.search(query, "question", groups, k=REFERENCE_QUESTIONS, min_score=min_score)
+    return {
+        "competencies": [{"name": item["name"], "subskills": item["subskills"]} for _, item in competencies],
+        "suggested_questions": [item["text"] for _, item in questions],
+    }
+
+
+@app.get("/api/dev/vector-index")
+async def vector_index_status():
+    return get_vector_store().stats()
+
+
+# ---------------- Session bundles + pre-warming ----------------
+SESSION_BUNDLE_DIR = DATA_DIR / "session_bundles"
+SESSION_BUNDLE_MAX_AGE_HOURS = float(os.getenv("SESSION_BUNDLE_MAX_AGE_HOURS", "48"))
+session_bundles = SessionBundleStore(
+    SESSION_BUNDLE_DIR,
+    version=RESUME_PROMPT_VERSION,
+    max_age_seconds=SESSION_BUNDLE_MAX_AGE_HOURS * 3600,
+)
+PREWARM_JOBS: Dict[str, PrewarmJob] = {}
+PREWARM_JOBS_KEEP = int(os.getenv("PREWARM_JOBS_KEEP", "10"))   # finished jobs kept for /api/admin/prewarm
+# per-stage /session timings in a Server-Timing response header; off by default
+# since /session responses go to candidates (the breakdown is always logged)
+SESSION_TIMING_HEADER = os.getenv("SESSION_TIMING_HEADER", "0") == "1"
+
+
+def resume_meta_for_row(row: dict) -> Optional[dict]:
+    """
+    Drive metadata of the row's resume ({} when the row has none), from the
+    batched metadata prefetch when available. None when Drive cannot be
+    asked; bundles are then only checked by age.
+    """
+    resume_url = resume_url_from_row(row)
+    if not resume_url:
+        return {}
+    try:
+        return call_in("drive", drive_client.metadata, extract_drive_file_id(resume_url), RESUME_META_FIELDS)
+    except Exception as e:
+        print("⚠️ Resume metadata lookup failed:", e)
+        return None
+
+
+def resume_md5(meta: Optional[dict]) -> Optional[str]:
+    if meta is None:
+        return None
+    # Google-native files have no md5Checksum
+    return meta.get("md5Checksum") or meta.get("modifiedTime") or ""
+
+
+def get_session_bundle(candidate_id: str, row: dict, timings: Optional[StageTimings] = None) -> Tuple[dict, dict]:
+    """
+    Return (jd_json, resume_json) for a roster row, from the pre-warmed
+    bundle if one is fresh and its resume unchanged on Drive, otherwise
+    built now and persisted.
+    """
+    with _timed(timings, "bundle_lookup"):
+        # fetched once; a miss hands it on so the build does not ask Drive again
+        meta = resume_meta_for_row(row)
+        bundle = session_bundles.get(candidate_id, row, resume_md5(meta))
+    if bundle is not None:
+        print("✅ Session bundle hit:", candidate_id)
+        return bundle
+
+    jd_json, resume_json = build_jd_resume_json_from_excel_row(
+        row, resume_deadline=RESUME_SESSION_DEADLINE_SECONDS, timings=timings, resume_meta=meta
+    )
+    # a partial resume is good enough for this session but must not be reused
+    partial = resume_json.pop("partial", False)
+    if not partial and not str(resume_json.get("raw_text", "")).startswith("(Failed to read resume"):
+        session_bundles.put(candidate_id, row, jd_json, resume_json, resume_md5(meta) or "")
+    return jd_json, resume_json
+
+
+def prewarm_row(row: dict, force: bool = False) -> str:
+    """
+    Pre-warm one roster row. Raises on resume failures so PrewarmJob retries.
+    """
+    candidate_id = normalize_unique_id(row.get("Unique ID", ""))
+    if not candidate_id:
+        return "skipped"
+    meta = resume_meta_for_row(row)
+    if not force and session_bundles.get(candidate_id, row, resume_md5(meta)) is not None:
+        return "cached"
+
+    resume_url = resume_url_from_row(row)
+    # pre-warming yields to live /session and analysis traffic
+    with openai_limiter.priority(BULK):
+        if resume_url:
+            # surfaces Drive / LLM errors (build_jd_resume_json_from_excel_row swallows them)
+            load_structured_resume(extract_drive_file_id(resume_url), meta or None)
+
+        jd_json, resume_json = build_jd_resume_json_from_excel_row(row, resume_meta=meta)
+    session_bundles.put(candidate_id, row, jd_json, resume_json, resume_md5(meta) or "")
+    return "built"
+
+
+def prefetch_resume_metadata(rows: List[dict]) -> None:
+    """
+    Batch the Drive metadata lookups for every row with a resume, instead
+    of one files().get per row. Rows with a bundle need it too: the bundle
+    is only reused if the resume's checksum has not changed.
+    """
+    file_ids = []
+    for row in rows:
+        resume_url = resume_url_from_row(row)
+        if resume_url and normalize_unique_id(row.get("Unique ID", "")):
+            file_ids.append(extract_drive_file_id(resume_url))
+    found = drive_client.prefetch_metadata(file_ids, RESUME_META_FIELDS)
+    print(f"[drive] prefetched metadata for {len(found)}/{len(file_ids)} resumes")
+
+
+def make_prewarm_job(workers: int = 4, retries: int = 3, force: bool = False) -> PrewarmJob:
+    rows = roster.rows()
+    job = PrewarmJob(
+        rows,
+        lambda row: prewarm_row(row, force=force),
+        workers=workers,
+        retries=retries,
+        prepare=prefetch_resume_metadata,
+    )
+    PREWARM_JOBS[job.id] = job
+    # forget the oldest finished jobs (each holds a copy of the roster)
+    finished = [j for j in PREWARM_JOBS.values() if j.state == "COMPLETED"]
+    for old in finished[: max(0, len(finished) - PREWARM_JOBS_KEEP)]:
+        PREWARM_JOBS.pop(old.id, None)
+    return job
+
+
+# ---------------- Bulk resume -> JD ranking (no model calls) ----------------
+RANK_MAX_TOP = 200
+
+
+def _parsed_resume_for_row(candidate_id: str, row: dict) -> Optional[dict]:
+    """
+    Structured resume from the pre-warmed bundle, else from the parsed JSON
+    left by an earlier load_structured_resume; never downloads or calls the model.
+    """
+    bundle = session_bundles.get(candidate_id, row)
+    if bundle is not None:
+        parsed = bundle[1].get("parsed_sections")
+        if parsed and _has_resume_content(parsed):
+            return parsed
+    resume_url = resume_url_from_row(row)
+    if not resume_url:
+        return None
+    path = RESUME_DIR / f"{extract_drive_file_id(resume_url)}_parsed.json"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            parsed = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return parsed if _has_resume_content(parsed) else None
+
+
+def collect_rank_candidates() -> Tuple[List["Candidate"], List[str]]:
+    """
+    (candidates with a parsed resume, ids of rows without one).
+    """
+    from resume_ranker import Candidate
+
+    candidates: List[Candidate] = []
+    unparsed: List[str] = []
+    for row in roster.rows():
+        candidate_id = normalize_unique_id(row.get("Unique ID", ""))
+        if not candidate_id:
+            continue
+        parsed = _parsed_resume_for_row(candidate_id, row)
+        if parsed is None:
+            unparsed.append(candidate_id)
+            continue
+        jd_text = str(row.get("JD") or row.get("Name of the JD") or "")
+        candidates.append(Candidate(
+            id=candidate_id,
+            name=str(row.get("Candidate Name") or row.get("Name of Candidate") or row.get("Name") or "Candidate"),
+            job_title=jd_text.splitlines()[0].strip() if jd_text.strip() else "Unknown role",
+            jd_text=jd_text,
+            resume=parsed,
+        ))
+    return candidates, unparsed
+
+
+@app.get("/api/admin/rank")
+async def rank_roster(
+    top: int = 10,
+    role: str = "",
+    text_weight: Optional[float] = None,
+    skill_weight: Optional[float] = None,
+):
+    """
+    Rank every roster candidate that has a parsed resume against every JD
+    in the roster; top `top` per role (optionally only roles matching `role`).
+    Weights default to resume_ranker's TEXT_WEIGHT / SKILL_WEIGHT.
+    Run POST /api/admin/prewarm first to parse resumes that are missing.
+    """
+    # numpy / scipy are only needed here
+    from resume_ranker import rank_candidates, TEXT_WEIGHT, SKILL_WEIGHT
+
+    if text_weight is None:
+        text_weight = TEXT_WEIGHT
+    if skill_weight is None:
+        skill_weight = SKILL_WEIGHT
+    try:
+        candidates, unparsed = await run_in("disk", collect_rank_candidates)
+    except RosterError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load roster: {e}")
+    result = await run_in(
+        "cpu", rank_candidates, candidates, max(0, min(top, RANK_MAX_TOP)), text_weight, skill_weight, role or None
+    )
+    return {**result, "unparsed": len(unparsed), "unparsed_ids": unparsed[:100]}
+
+
 # ---------------- Routes ----------------
-def build_hls_playlist(segments: list[dict]) -> str:
+# ---------------- HLS playlists for premises segments ----------------
+HLS_LIVE_WINDOW = int(os.getenv("HLS_LIVE_WINDOW", "6"))
+HLS_DEFAULT_SEGMENT_SECONDS = float(os.getenv("HLS_DEFAULT_SEGMENT_SECONDS", "5"))
+HLS_PUBLISHERS: Dict[str, PlaylistPublisher] = {}
+
+# segment / status change notifications for proctor dashboards
+EVENT_HUB = InterviewEventHub(interview_store)
+LONG_POLL_MAX_SECONDS = 30.0
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+async def publish_status(candidate_id: str, attempt: Dict) -> None:
+    await EVENT_HUB.publish(
+        candidate_id,
+        "status",
+        {"status": attempt["status"], "premisesVideoPath": attempt.get("premisesVideoPath")},
+    )
+
+
+async def _put_playlist(key: str, text: str) -> None:
+    await run_in(
+        "spaces",
+        get_spaces_client().put_object,
+        Bucket=SPACES_BUCKET,
+        Key=key,
+        Body=text.encode("utf-8"),
+        ContentType="application/vnd.apple.mpegurl",
+        ACL="public-read",
+        CacheControl="no-cache",
+    )
+
+
+async def get_playlist_publisher(candidate_id: str) -> PlaylistPublisher:
+    pub = HLS_PUBLISHERS.get(candidate_id)
+    if pub is None:
+        # seed from the store so a restart (or another worker) doesn't drop segments
+        stored = await run_in("disk", interview_store.list_segments, candidate_id)
+        pub = HLS_PUBLISHERS.get(candidate_id)
+        if pub is None:
+            pub = PlaylistPublisher(
+                HlsPlaylist(default_duration=HLS_DEFAULT_SEGMENT_SECONDS),
+                _put_playlist,
+                index_key=f"segments/{candidate_id}/index.m3u8",
+                live_key=f"segments/{candidate_id}/live.m3u8",
+                live_window=HLS_LIVE_WINDOW,
+            )
+            pub.playlist.load(stored)
+            HLS_PUBLISHERS[candidate_id] = pub
+    return pub
+
+
+def segment_sequence(
+    request: Request, fields: Dict[str, str], filename: str, playlist: HlsPlaylist
+) -> Tuple[int, bool]:
+    """
+    (sequence, explicit). The client's sequence number for a segment: form
+    field `sequence` (or `seq` / `index`) or header X-Segment-Sequence
+    (explicit), else the last number in the filename unless a published
+    segment already has it (e.g. every "video_720p.mp4" parses as 720), else
+    the next number after the highest seen so far.
+    """
+    candidates = [fields.get("sequence"), fields.get("seq"), fields.get("index"),
+                  request.headers.get("x-segment-sequence")]
+    for value in candidates:
+        if value is not None and str(value).strip().lstrip("-").isdigit():
+            return int(str(value).strip()), True
+    numbers = re.findall(r"\d+", Path(filename or "").stem)
+    if numbers and playlist.get(int(numbers[-1])) is None:
+        return int(numbers[-1]), False
+    return playlist.next_sequence(), False
+
+
+async def _discard_segment_upload(key: str) -> None:
+    try:
+        await run_in("spaces", get_spaces_client().delete_object, Bucket=SPACES_BUCKET, Key=key)
+    except Exception as e:
+        print("⚠️ Could not delete duplicate segment upload:", key, e)
+
+
+_started_at: Optional[float] = None
+_stopping = False
+
+
+@app.on_event("startup")
+async def warm_roster():
+    global _started_at
+    _started_at = time.monotonic()
+    # load the roster in the background so the first /session doesn't pay for it
+    threading.Thread(target=_safe_roster_refresh, daemon=True).start()
+    threading.Thread(target=_safe_reference_index, daemon=True).start()
+    analysis_queue.start()
+
+
+def _safe_roster_refresh():
+    try:
+        roster.refresh(force=True)
+    except Exception as e:
+        print("[roster] initial load failed:", e)
+
+
+def _safe_reference_index():
+    try:
+        reference_index()
+    except Exception as e:
+        print("[vector-index] initial load failed:", e)
+
+
+@app.on_event("shutdown")
+async def stop_executors():
+    global _stopping
+    _stopping = True
+    await interview_writer.stop()
+    analysis_queue.stop()
+    shutdown_executors(wait=False)
+    text_extractor.close()
+    close_clients()
+
+
+@app.get("/readyz")
+async def readiness():
     """
-    Build a simple HLS playlist (.m3u8) from a list of segments.
+    Readiness probe for load balancers and rolling restarts. Answers from
+    process state only: no Drive / OpenAI / Spaces calls, and no lazy
+    client is built by asking.
+    """
+    if _started_at is None or _stopping:
+        raise HTTPException(status_code=503, detail="stopping" if _stopping else "starting")
+    return {
+        "status": "ready",
+        "uptime_seconds": round(time.monotonic() - _started_at, 1),
+        "import_ms": SERVER_IMPORT_MS,
+        "roster_rows": roster.status()["rows"],
+        "built": {
+            "drive": drive_client.stats()["built"],
+            "openai": _openai_client is not None,
+            "spaces": _spaces_client is not None,
+            "vector_index": _vector_store is not None,
+        },
+    }
+
+
+@app.get("/api/dev/roster")
+async def roster_status():
+    return roster.status()
+
+
+@app.get("/api/dev/drive")
+async def drive_status():
+    return drive_client.stats()
 
-    Each segment dict is expected to have:
-      { "url": <public mp4 url>, "uploadedAt": <ms timestamp> }
 
-    We assume ~5 second segments (segmentDurationMs in Android).
+@app.get("/api/dev/extraction")
+async def extraction_status():
+    return text_extractor.stats()
+
+
+@app.get("/api/dev/resume-cache")
+async def resume_cache_status():
+    return resume_cache.status()
+
+
+@app.post("/api/admin/prewarm")
+async def start_prewarm(payload: Dict = Body(default={})):
     """
-    lines = [
-        "#EXTM3U",
-        "#EXT-X-VERSION:3",
-        "#EXT-X-TARGETDURATION:6",
-        "#EXT-X-MEDIA-SEQUENCE:0",
-    ]
+    Start a background pre-warm of every roster row.
+    Body (optional): { "workers": 4, "retries": 3, "force": false }
+    """
+    running = [j for j in PREWARM_JOBS.values() if j.state == "RUNNING"]
+    if running:
+        return running[0].progress()
 
-    # sort by upload time so playback is ordered
-    for seg in sorted(segments, key=lambda s: s["uploadedAt"]):
-        lines.append("#EXTINF:5.0,")
-        lines.append(seg["url"])
+    try:
+        job = await run_in(
+            "drive",
+            make_prewarm_job,
+            workers=int(payload.get("workers") or 4),
+            retries=int(payload.get("retries") if payload.get("retries") is not None else 3),
+            force=bool(payload.get("force")),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load roster: {e}")
+    job.start()
+    return job.progress()
+
+
+@app.get("/api/admin/prewarm")
+async def list_prewarm_jobs():
+    return [job.progress() for job in PREWARM_JOBS.values()]
+
+
+@app.get("/api/admin/prewarm/{job_id}")
+async def get_prewarm_job(job_id: str):
+    job = PREWARM_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Prewarm job not found")
+    return job.progress()
+
+
+@app.get("/api/dev/uploads")
+async def recent_uploads():
+    return list(RECENT_UPLOADS)
+
+
+@app.get("/api/dev/executors")
+async def executors_status():
+    return executor_stats()
+
+
+@app.get("/api/dev/openai-limits")
+async def openai_limits_status():
+    return openai_limiter.stats()
+
+
+@app.get("/api/dev/http")
+async def http_pool_status():
+    return http_stats()
+
+
+@app.get("/api/dev/prompts")
+async def prompt_status():
+    return prompt_compiler.stats()
+
+
+@app.get("/api/dev/archive")
+async def archive_status():
+    status = await run_in("disk", interview_archive.status)
+    status["writer"] = interview_writer.stats()
+    return status
 
-    # We do NOT add #EXT-X-ENDLIST so Hls.js can continue if file is updated
-    return "\n".join(lines) + "\n"
 
 @app.get("/")
 async def index():
     return FileResponse(str(STATIC_DIR / "index.html"))
 
 @app.post("/session")
-async def create_session(payload: Dict):
+async def create_session(payload: Dict, response: Response):
     """
     Expects JSON body: { "id": "<Unique ID from Excel row>" }
-    Workflow:
-    - download excel from Drive folder
-    - find row matching Unique ID
-    - download resume and extract text
-    - build instructions and call OpenAI realtime to create ephemeral session token
+    Workflow (stages run as soon as their inputs are ready):
+    - row: find the row matching Unique ID in the cached roster
+    - instructions: read spoken instructions (in parallel with everything up to the prompt)
+    - reference: open the reference vector index (in parallel)
+    - bundle: pre-warmed JD + resume, or download resume, extract and structure it
+    - prompt: compile the interviewer instructions
+    - realtime: call OpenAI realtime to create the ephemeral session token
+    The per-stage breakdown is logged, and returned in a Server-Timing
+    header when SESSION_TIMING_HEADER=1 (off by default).
     """
     candidate_id = (payload.get("id") or "").strip()
     if not candidate_id:
         raise HTTPException(status_code=400, detail="Missing 'id' in payload")
 
-    # download excel
-    try:
-        download_excel_from_folder(DRIVE_FOLDER_ID)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to download excel: {e}")
+    timings = StageTimings()
+    graph = StageGraph(timings)
 
-    # read excel (pandas kept as optional dependency)
-    try:
-        import pandas as pd
-        df = pd.read_excel(EXCEL_LOCAL)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to read excel: {e}")
-
-    # find row by Unique ID column
-    if "Unique ID" not in df.columns:
-        # try alternative header names
-        raise HTTPException(status_code=500, detail="Excel missing 'Unique ID' column")
-
-    row_df = df[df["Unique ID"].astype(str).str.strip() == candidate_id]
-    if row_df.empty:
-        raise HTTPException(status_code=404, detail=f"ID {candidate_id} not found in Excel")
-
-    row = dict(row_df.iloc[0].to_dict())
-    jd_json, resume_json = build_jd_resume_json_from_excel_row(row)
-    print("======== FINAL RESUME JSON SENT TO AI ========")
-    print(json.dumps(resume_json, indent=2))
-    print("============================================")
-
-    # NEW: Load spoken instructions if available
-    instr_file = INSTR_DIR / f"{candidate_id}.txt"
-    spoken_instr = ""
-    if instr_file.exists():
-        spoken_instr = instr_file.read_text(encoding="utf-8").strip()
-
-    # create base instructions from JD + resume
-    instructions = jd_resume_instructions(jd_json, resume_json)
-
-    # if we have extra spoken instructions, append them
-    if spoken_instr:
-        instructions += (
-            "\n\n### ADDITIONAL INTERVIEWER INSTRUCTIONS FROM HUMAN AUDIO\n\n"
-            + spoken_instr
-        )
+    async def lookup_row() -> dict:
+        # cached roster (Drive is only hit on revalidation)
+        try:
+            row = await run_in("drive", roster.get, candidate_id)
+        except RosterError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to load excel: {e}")
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"ID {candidate_id} not found in Excel")
+        return row
 
+    async def read_spoken_instructions() -> str:
+        instr_file = INSTR_DIR / f"{candidate_id}.txt"
+        try:
+            return (await run_in("disk", instr_file.read_text, encoding="utf-8")).strip()
+        except FileNotFoundError:
+            return ""
 
-    # create realtime session via OpenAI REST (returns ephemeral token)
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-        "OpenAI-Beta": "realtime=v1",
-    }
-    body = {
-        "model": REALTIME_MODEL,
-        "voice": "alloy",
-        "modalities": ["audio", "text"],
-        "turn_detection": {"type": "server_vad", "silence_duration_ms": 800},
-        "instructions": instructions,
-        "input_audio_format": "pcm16",
-        "input_audio_transcription": {"model": "whisper-1", "language": "en"}
-    }
+    async def open_reference_index() -> None:
+        # warms the index the prompt stage searches; optional, like the reference itself
+        try:
+            await run_in("cpu", reference_index)
+        except Exception as e:
+            print("[vector-index] reference index unavailable:", e)
+
+    async def load_bundle(row: dict) -> Tuple[dict, dict]:
+        jd_json, resume_json = await run_in("session", get_session_bundle, candidate_id, row, timings)
+        print("======== FINAL RESUME JSON SENT TO AI ========")
+        print(json.dumps(resume_json, indent=2))
+        print("============================================")
+        return jd_json, resume_json
+
+    async def compile_prompt(bundle: Tuple[dict, dict], instructions: str, reference: None) -> CompiledPrompt:
+        # compile instructions from JD + resume (+ spoken instructions) within the token budget
+        compiled = await run_in("cpu", compile_interviewer_prompt, bundle[0], bundle[1], instructions)
+        print("[prompt]", candidate_id, compiled.report())
+        return compiled
+
+    async def create_realtime_session(prompt: CompiledPrompt) -> str:
+        # create realtime session via OpenAI REST (returns ephemeral token)
+        headers = {
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json",
+            "OpenAI-Beta": "realtime=v1",
+        }
+        body = {
+            "model": REALTIME_MODEL,
+            "voice": "alloy",
+            "modalities": ["audio", "text"],
+            "turn_detection": {"type": "server_vad", "silence_duration_ms": 800},
+            "instructions": prompt.text,
+            "input_audio_format": "pcm16",
+            "input_audio_transcription": {"model": "whisper-1", "language": "en"}
+        }
+        try:
+            resp = await run_in(
+                "openai",
+                openai_limiter.call,
+                REALTIME_MODEL,
+                get_client(OPENAI_API_BASE).post,
+                f"{OPENAI_API_BASE}/v1/realtime/sessions",
+                headers=headers,
+                json=body,
+                timeout=60,
+                priority=INTERACTIVE,
+            )
+            if not resp.is_success:
+                raise RuntimeError(f"OpenAI realtime error: {resp.status_code} {resp.text}")
+            data = resp.json()
+            token = ((data.get("client_secret") or {}).get("value")) or data.get("value") or data.get("client_secret")
+            if not token:
+                raise RuntimeError("Ephemeral token missing from OpenAI response")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to create realtime session: {e}")
+        return token
+
+    graph.add("row", lookup_row)
+    graph.add("instructions", read_spoken_instructions)
+    graph.add("reference", open_reference_index)
+    graph.add("bundle", load_bundle, "row")
+    graph.add("prompt", compile_prompt, "bundle", "instructions", "reference")
+    graph.add("realtime", create_realtime_session, "prompt")
     try:
-        resp = requests.post("https://api.openai.com/v1/realtime/sessions", headers=headers, json=body, timeout=60)
-        if not resp.ok:
-            raise RuntimeError(f"OpenAI realtime error: {resp.status_code} {resp.text}")
-        data = resp.json()
-        token = ((data.get("client_secret") or {}).get("value")) or data.get("value") or data.get("client_secret")
-        if not token:
-            raise RuntimeError("Ephemeral token missing from OpenAI response")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create realtime session: {e}")
+        results = await graph.run()
+    finally:
+        print("[session]", candidate_id, f"{timings.total_ms()} ms", timings.to_dict())
 
+    if SESSION_TIMING_HEADER:
+        response.headers["Server-Timing"] = timings.server_timing()
+
+    jd_json, resume_json = results["bundle"]
     # return token (client will use this to POST SDP to realtime endpoint)
-    return {"token": token, "job_title": jd_json.get("job_title"), "candidate_name": resume_json.get("full_name")}
+    return {
+        "token": results["realtime"],
+        "job_title": jd_json.get("job_title"),
+        "candidate_name": resume_json.get("full_name"),
+        "instructions_tokens": results["prompt"].total_tokens,
+    }
 
 # @app.post("/upload_recording")
 # async def upload_recording(file: UploadFile = File(...), candidate_id: str = Form("")):
@@ -1054,11 +1976,60 @@ async def upload_recording(file: UploadFile = File(...), candidate_id: str = For
         ext = Path(file.filename).suffix or ".webm"
         name = f"{candidate_id or uuid4().hex}{ext}"
         dest = RECORDINGS_DIR / name
-        with dest.open("wb") as f:
-            shutil.copyfileobj(file.file, f)
+        await run_in("disk", _copy_upload_to_path, file.file, dest)
         return {"url": f"/static/recordings/{name}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+# ---------- Spoken instructions (proctor audio -> Whisper -> instructions/<id>.txt) ----------
+SPOKEN_SPOOL_DIR = INSTR_DIR / "spool"
+SPOKEN_IDLE_SECONDS = 15 * 60
+SPOKEN_INGESTS: Dict[Tuple[str, str], SpokenAudioIngest] = {}
+SPOKEN_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+# formats Whisper accepts; the spool keeps the upload's extension so a file
+# ffmpeg cannot stream can still be sent to Whisper whole
+SPOKEN_AUDIO_SUFFIXES = {".flac", ".m4a", ".mp3", ".mp4", ".mpeg", ".mpga", ".oga", ".ogg", ".wav", ".webm"}
+
+
+def _spoken_ids(candidate_id: Any, upload_id: Any) -> Tuple[str, str]:
+    """
+    Both ids end up in spool and instructions file names, so only plain
+    [A-Za-z0-9_-] ids are accepted.
+    """
+    candidate_id = normalize_unique_id(candidate_id or "")
+    upload_id = normalize_unique_id(upload_id or "")
+    if not SPOKEN_ID_RE.fullmatch(candidate_id) or not SPOKEN_ID_RE.fullmatch(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid candidate_id or upload_id")
+    return candidate_id, upload_id
+
+
+def _transcribe_chunk(path: str) -> str:
+    return (_transcribe_file(path).text or "").strip()
+
+
+def _new_spoken_ingest(candidate_id: str, upload_id: str, suffix: str = ".webm") -> SpokenAudioIngest:
+    return SpokenAudioIngest(
+        SPOKEN_SPOOL_DIR / f"{candidate_id}_{upload_id}{suffix}",
+        transcribe=_transcribe_chunk,
+        submit=get_pool("openai").submit,
+    )
+
+
+def _reap_spoken_ingests() -> None:
+    now = time.monotonic()
+    for key, ingest in list(SPOKEN_INGESTS.items()):
+        if now - ingest.touched_at > SPOKEN_IDLE_SECONDS:
+            SPOKEN_INGESTS.pop(key, None)
+            ingest.abort()
+
+
+async def _save_spoken_transcript(candidate_id: str, ingest: SpokenAudioIngest, pieces: Optional[int] = None) -> str:
+    # finish() blocks on the chunk transcriptions running on the "openai" pool
+    transcript = await run_in("session", ingest.finish, pieces)
+    if transcript:
+        await run_in("disk", append_instructions, INSTR_DIR / f"{candidate_id}.txt", transcript)
+    return transcript
+
+
 @app.post("/upload_spoken_audio")
 async def upload_spoken_audio(
     file: UploadFile = File(...),
@@ -1070,41 +2041,76 @@ async def upload_spoken_audio(
 
     Next time /session is called for that candidate_id,
     the transcript is appended to the system prompt.
+
+    The dashboard normally streams the audio while recording instead
+    (/upload_spoken_audio/stream + /upload_spoken_audio/finish); this
+    one-shot form is kept as its fallback.
     """
     if not candidate_id:
         candidate_id = uuid4().hex
+    candidate_id, upload_id = _spoken_ids(candidate_id, uuid4().hex)
 
-    # read bytes into memory
-    audio_bytes = await file.read()
+    suffix = Path(file.filename or "").suffix.lower()
+    ingest = _new_spoken_ingest(candidate_id, upload_id, suffix if suffix in SPOKEN_AUDIO_SUFFIXES else ".webm")
+    try:
+        while True:
+            block = await file.read(256 * 1024)
+            if not block:
+                break
+            await run_in("disk", ingest.feed, block)
+    except BaseException:
+        ingest.abort()
+        raise
+
+    transcript = await _save_spoken_transcript(candidate_id, ingest)
+    return {
+        "status": "ok",
+        "candidate_id": candidate_id,
+        "transcript": transcript,
+    }
 
-    # write to a temp file because OpenAI client expects a file-like
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-        tmp.write(audio_bytes)
-        tmp_path = tmp.name
 
-    try:
-        with open(tmp_path, "rb") as f:
-            trans = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f,
-            )
-        transcript = (trans.text or "").strip()
-    finally:
-        try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
+@app.post("/upload_spoken_audio/stream")
+async def upload_spoken_audio_piece(request: Request, candidate_id: str, upload_id: str, seq: int):
+    """
+    One piece (raw bytes, in recording order) of a spoken-instructions
+    recording. Decoding and transcription start while the proctor is still
+    talking.
+    """
+    candidate_id, upload_id = _spoken_ids(candidate_id, upload_id)
+
+    _reap_spoken_ingests()
+    key = (candidate_id, upload_id)
+    ingest = SPOKEN_INGESTS.get(key)
+    if ingest is None:
+        ingest = SPOKEN_INGESTS[key] = _new_spoken_ingest(candidate_id, upload_id)
 
-    # append / save transcript into instructions/<id>.txt
-    INSTR_DIR.mkdir(parents=True, exist_ok=True)
-    instr_file = INSTR_DIR / f"{candidate_id}.txt"
-    existing = ""
-    if instr_file.exists():
-        existing = instr_file.read_text(encoding="utf-8", errors="ignore")
+    # buffer this piece only (the browser sends a few seconds at a time)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+    accepted = await run_in("disk", ingest.feed, bytes(body), seq)
+    return {"status": "ok", "accepted": accepted, **ingest.stats()}
 
-    merged = (existing + "\n\n" + transcript).strip()
-    instr_file.write_text(merged, encoding="utf-8")
 
+@app.post("/upload_spoken_audio/finish")
+async def finish_spoken_audio(payload: Dict):
+    """
+    Body: { "candidate_id", "upload_id", "pieces": <number of pieces sent> }
+    Waits for the remaining chunk transcriptions, appends the transcript to
+    data/instructions/<id>.txt and returns it.
+    """
+    candidate_id, upload_id = _spoken_ids(payload.get("candidate_id"), payload.get("upload_id"))
+    ingest = SPOKEN_INGESTS.pop((candidate_id, upload_id), None)
+    if ingest is None:
+        # pieces went to another worker; the shared spool file still has them
+        ingest = _new_spoken_ingest(candidate_id, upload_id)
+        if not ingest.spool_path.exists():
+            raise HTTPException(status_code=404, detail="Unknown spoken audio upload")
+        ingest.complete = False
+
+    pieces = payload.get("pieces")
+    transcript = await _save_spoken_transcript(candidate_id, ingest, int(pieces) if pieces is not None else None)
     return {
         "status": "ok",
         "candidate_id": candidate_id,
@@ -1117,7 +2123,8 @@ async def store_interview(payload: Dict):
     """
     Called by frontend after upload.
     - Stores interview metadata (JSONL)
-    - Runs automatic analysis and saves JSON to data/analysis_json/<id>.json
+    - Queues automatic analysis, which saves JSON to data/analysis_json/<id>.json
+      (progress: GET /analysis/<id>/status)
     """
     interviewerTurns = payload.get("interviewerTurns", []) or []
     candidateTurns   = payload.get("candidateTurns", []) or []
@@ -1136,27 +2143,36 @@ async def store_interview(payload: Dict):
         "recording_url": recording_url,
         "interviewerTurns": interviewerTurns,
         "candidateTurns": candidateTurns,
+        "stored_at": int(time.time()),
     }
 
-    # 1) append to interviews.jsonl
-    INTERVIEW_LOG.parent.mkdir(parents=True, exist_ok=True)
-    with open(INTERVIEW_LOG, "a", encoding="utf-8") as f:
-        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    # 1) append to interviews.jsonl (returns once the batch is fsynced)
+    await interview_writer.append(rec)
 
-    # 2) auto-analysis (no Excel)
-    analysis = None
-    try:
-        analysis = run_analysis_and_save(candidate_id)
-    except Exception as e:
-        print("AUTO-ANALYSIS ERROR:", e)
+    # 2) queue auto-analysis (no Excel); the browser does not wait for it
+    job = await run_in("disk", analysis_queue.enqueue, "simple", candidate_id, transcript_hash(rec))
 
     return {
         "status": "ok",
         "id": candidate_id,
-        "analysis_saved": analysis is not None,
+        "analysis_status": job["status"],
+        "analysis_status_url": f"/analysis/{candidate_id}/status",
     }
 
 
+@app.get("/analysis/{candidate_id}/status")
+async def analysis_status(candidate_id: str):
+    jobs = await run_in("disk", analysis_queue.jobs_for, candidate_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="No analysis jobs for this id")
+    return {"candidate_id": candidate_id, "status": jobs[0]["status"], "jobs": jobs}
+
+
+@app.get("/api/dev/analysis-queue")
+async def analysis_queue_status():
+    return await run_in("disk", analysis_queue.stats)
+
+
 # ---------- Optional analysis endpoint (server uses OpenAI Chat to analyze Q/A) ----------
 @app.post("/analyze_interview")
 async def analyze_interview(payload: Dict):
@@ -1166,61 +2182,85 @@ async def analyze_interview(payload: Dict):
     - Calls OpenAI for job-fit analysis
     - Updates Excel (Interview UUID Link + Analysis JSON)
     - Returns analysis JSON (for HR dashboards)
+    Runs as a queued "full" job; pass "wait": false to get the job back
+    immediately and poll /analysis/<id>/status instead.
     """
     candidate_id = (payload.get("candidate_id") or "").strip()
     if not candidate_id:
         return {"error": "candidate_id is required"}
 
-    try:
-        analysis = analyze_and_update(candidate_id)
+    # queued like auto-analysis, so a repeat call for the same transcript is free
+    rec = await run_in("disk", interview_archive.get, candidate_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail=f"No stored interview for {candidate_id}")
+    job = await run_in(
+        "disk", analysis_queue.enqueue, "full", candidate_id, transcript_hash(rec), bool(payload.get("force"))
+    )
+    if not payload.get("wait", True):
+        return {"status": "queued", "candidate_id": candidate_id, "job": job}
+
+    deadline = time.monotonic() + ANALYSIS_WAIT_SECONDS
+    while job["status"] not in (DONE, FAILED) and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+        job = await run_in("disk", analysis_queue.get, job["job_id"])
+
+    if job["status"] == DONE:
+        analysis = await run_in("disk", analysis_queue.result, job["job_id"])
         return {"status": "ok", "candidate_id": candidate_id, "analysis": analysis}
-    except Exception as e:
-        print("analyze_interview error:", e)
-        return {"status": "error", "message": str(e)}
+    if job["status"] == FAILED:
+        print("analyze_interview error:", job["last_error"])
+        return {"status": "error", "message": job["last_error"]}
+    return {"status": "queued", "candidate_id": candidate_id, "job": job}
 
 @app.post("/analyze")
 async def analyze(payload: Dict):
     # This endpoint is optional and meant for backend use (not exposed to candidate).
+    # Optional "course_id" (or a "job_title" matching a course) enables local
+    # rubric pre-scoring, so only the most informative turns go to the model.
     Q = payload.get("interviewerTurns", []) or []
     A = payload.get("candidateTurns", []) or []
     recording_url = payload.get("recording_url", "")
-
-    qa_pairs = []
-    for i in range(max(len(Q), len(A))):
-        qa_pairs.append({"question": Q[i] if i < len(Q) else "", "answer": A[i] if i < len(A) else ""})
-
-    system_msg = "You are an evaluator. Output only JSON with keys: items[], overall_score, strengths, improvements, next_steps, analysis_summary."
-    user_prompt = f"Analyze Q/A pairs: {json.dumps(qa_pairs, ensure_ascii=False)} Recording: {recording_url}"
+    catalog = await run_in("cpu", course_registry.current)
+    course = catalog.get(payload.get("course_id") or "") or match_course(catalog.courses, payload.get("job_title"))
 
     try:
-        resp = client.chat.completions.create(
-            model=ANALYSIS_MODEL,
-            messages=[{"role": "system", "content": system_msg}, {"role": "user", "content": user_prompt}],
-            temperature=0.0,
-            max_tokens=1200,
+        # scored once here: the estimate and the request use the same prompt
+        prompt, scores = await run_in("cpu", build_user_prompt, build_qa_pairs(Q, A), recording_url, course)
+        data, _usage = await run_in(
+            "analysis",
+            openai_limiter.call,
+            ANALYSIS_MODEL,
+            evaluate_turns,
+            get_openai_client(),
+            ANALYSIS_MODEL,
+            Q,
+            A,
+            recording_url,
+            course=course,
+            prompt=(prompt, scores),
+            priority=BACKGROUND,
+            tokens=estimate_tokens(prompt, completion=1200),
         )
-        raw = resp.choices[0].message.content.strip()
-        try:
-            data = json.loads(raw)
-        except Exception:
-            # fallback: wrap as minimal json
-            data = {"items": qa_pairs, "overall_score": 0, "strengths": [], "improvements": [], "next_steps": [], "analysis_summary": raw}
         return data
     except Exception as e:
-        return {"items": qa_pairs, "overall_score": 0, "strengths": [], "improvements": [], "next_steps": [], "analysis_summary": f"analysis failed: {e}"}
+        return fallback_result(build_qa_pairs(Q, A), f"analysis failed: {e}")
 # ----------------- BASIC ROUTES (ported from Node) -----------------
 
 
 
 
+def _list_dev_attempts() -> List[dict]:
+    return [_attempt_from_record(r).to_dict() for r in interview_store.list_attempts(kind="dev")]
+
+
 @app.get("/api/dev/interviews")
 async def list_dev_interviews():
-    return [att.to_dict() for att in INTERVIEW_ATTEMPTS]
+    return await run_in("disk", _list_dev_attempts)
 
 
 @app.get("/api/dev/interviews/{interview_id}")
 async def get_dev_interview(interview_id: str):
-    att = find_attempt(interview_id)
+    att = await run_in("disk", find_attempt, interview_id)
     if not att:
         raise HTTPException(status_code=404, detail="Interview not found")
     return att.to_dict()
@@ -1232,7 +2272,7 @@ async def create_interview(
 ):
     """
     Dev entry point (used by Android team originally).
-    Creates an InterviewAttempt in memory.
+    Creates an InterviewAttempt in the interview store.
     """
     interview_id = create_interview_id()
 
@@ -1252,7 +2292,9 @@ async def create_interview(
         roomName=room_name,
         egressId=None,
     )
-    INTERVIEW_ATTEMPTS.append(att)
+    # ms-timestamp ids can collide across workers; bump until unique
+    while not await run_in("disk", interview_store.create_attempt, asdict(att), "dev"):
+        att.id = f"int-{int(att.id.split('-')[1]) + 1}"
 
     print("Created interview:", att)
 
@@ -1268,7 +2310,7 @@ async def start_premises_recording(interview_id: str):
     Start LiveKit segmented egress for the room corresponding to this interview.
     Writes HLS segments and playlist to DigitalOcean Spaces.
     """
-    att = find_attempt(interview_id)
+    att = await run_in("disk", find_attempt, interview_id)
     if not att:
         raise HTTPException(status_code=404, detail="Interview not found")
 
@@ -1321,6 +2363,7 @@ async def start_premises_recording(interview_id: str):
 
         public_url = f"{base}/{bucket}/{playlist_path}"
         att.premisesVideoPath = public_url
+        await run_in("disk", save_attempt, att)
 
         print("LiveKit segmented egress started:", info)
 
@@ -1342,7 +2385,7 @@ async def start_premises_recording(interview_id: str):
 
 @app.post("/api/mobile/interviews/{interview_id}/stop-recording")
 async def stop_premises_recording(interview_id: str):
-    att = find_attempt(interview_id)
+    att = await run_in("disk", find_attempt, interview_id)
     if not att:
         raise HTTPException(status_code=404, detail="Interview not found")
 
@@ -1355,6 +2398,7 @@ async def stop_premises_recording(interview_id: str):
     try:
         info = await egress_client.stop_egress(att.egressId)
         att.status = "COMPLETED"
+        await run_in("disk", save_attempt, att)
         print("LiveKit egress stopped:", info)
         return {"success": True, "info": str(info)}
     except Exception as e:
@@ -1370,17 +2414,17 @@ async def get_active_interview():
     """
     For Android: "latest" interview (same as Node).
     """
-    if not INTERVIEW_ATTEMPTS:
+    last = await run_in("disk", interview_store.latest_attempt, "dev")
+    if not last:
         raise HTTPException(status_code=404, detail="No active interview")
 
-    last = INTERVIEW_ATTEMPTS[-1]
     return {
-        "interviewAttemptId": last.id,
-        "id": last.id,
-        "candidateName": last.candidateName,
-        "jobTitle": last.jobTitle,
-        "status": last.status,
-        "premisesVideoPath": last.premisesVideoPath,
+        "interviewAttemptId": last["id"],
+        "id": last["id"],
+        "candidateName": last["candidateName"],
+        "jobTitle": last["jobTitle"],
+        "status": last["status"],
+        "premisesVideoPath": last["premisesVideoPath"],
     }
 
 
@@ -1391,7 +2435,7 @@ async def get_mobile_interview(candidate_id: str):
     - Validates candidate_id against Excel 'Unique ID'
     - Creates a mobile interview record if needed
     """
-    attempt = get_or_create_mobile_interview(candidate_id)
+    attempt = await run_in("drive", get_or_create_mobile_interview, candidate_id, include_segments=False)
 
     return {
         "interviewAttemptId": attempt["id"],
@@ -1409,81 +2453,125 @@ async def get_mobile_interview(candidate_id: str):
 @app.post("/api/mobile/interviews/{candidate_id}/premises/upload-segment")
 async def upload_premises_segment(
     candidate_id: str,
-    segment: UploadFile = File(...),
+    request: Request,
 ):
     """
     Segmented upload for Android premises video.
 
     - `{candidate_id}` is the Excel 'Unique ID'
     - Validates candidate_id against Excel using get_or_create_mobile_interview
-    - Uploads each segment (mp4) to DigitalOcean Spaces
-    - Tracks segments in MOBILE_INTERVIEWS[candidate_id]["segments"]
-    - Builds/updates an HLS playlist index.m3u8 and stores its URL as premisesVideoPath
+    - Streams each segment (multipart field "segment") straight to DigitalOcean Spaces
+    - Tracks segments in the interview store (segments table)
+    - Reads each MP4's real duration from its headers and appends the segment
+      to index.m3u8 (full, EVENT) and live.m3u8 (sliding window); bursts of
+      arrivals coalesce into one write. upload-final rewrites index.m3u8 as
+      VOD in the client's sequence order
+    - A sequence number sent explicitly that is already published is a
+      retry (same duration: 200 with "duplicate") or a conflict (409); 409
+      too once the recording is finalized
+    - Stores the index.m3u8 URL as premisesVideoPath
     """
-    if not segment:
-        raise HTTPException(status_code=400, detail="No segment file received")
-
     # ✅ This will 404 if the UID is not in Excel
-    attempt = get_or_create_mobile_interview(candidate_id)
-
-    try:
-        ext = Path(segment.filename).suffix or ".mp4"
-        clean_name = (segment.filename or "segment.mp4").replace(" ", "_")
-        key = f"segments/{candidate_id}/{int(time.time() * 1000)}_{clean_name}"
+    attempt = await run_in("drive", get_or_create_mobile_interview, candidate_id, include_segments=False)
+    if attempt.get("status") == "COMPLETED":
+        # the VOD playlist is final; a late segment must not reopen it
+        raise HTTPException(status_code=409, detail="Premises recording already finalized")
 
-        tmp_path = RECORDINGS_DIR / f"tmp_{uuid4().hex}{ext}"
-        with tmp_path.open("wb") as f_out:
-            shutil.copyfileobj(segment.file, f_out)
+    def segment_key(filename: str) -> str:
+        clean_name = (filename or "segment.mp4").replace(" ", "_")
+        return f"segments/{candidate_id}/{int(time.time() * 1000)}_{clean_name}"
 
-        spaces_url = upload_file_to_spaces(
-            tmp_path,
-            key,
-            content_type=segment.content_type or "video/mp4",
+    probe = Mp4DurationProbe()
+    try:
+        upload = await stream_upload_field(
+            request,
+            "segment",
+            segment_key,
+            get_spaces_client(),
+            SPACES_BUCKET,
+            default_content_type="video/mp4",
+            part_size=UPLOAD_PART_SIZE,
+            max_parallel=UPLOAD_MAX_PARALLEL_PARTS,
+            tap=probe.feed,
         )
+    except UploadStreamError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print("Error uploading segment:", e)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    if upload is None:
+        raise HTTPException(status_code=400, detail="No segment file received")
 
-        # ensure segments list exists
-        seg_list = attempt.setdefault("segments", [])
-        seg_entry = {
-            "url": spaces_url,
-            "uploadedAt": int(time.time() * 1000),
+    publisher = await get_playlist_publisher(candidate_id)
+    # another worker may have stored segments this process hasn't seen
+    if await run_in("disk", interview_store.segment_count, candidate_id) != len(publisher.playlist):
+        publisher.playlist.load(await run_in("disk", interview_store.list_segments, candidate_id))
+    sequence, explicit = segment_sequence(request, upload.fields, upload.filename, publisher.playlist)
+    published = publisher.playlist.get(sequence) if explicit else None
+    if published is not None:
+        # a retry if the content matches; never replace a published entry
+        await _discard_segment_upload(upload.key)
+        if not probe.duration or abs(published.duration - probe.duration) > 0.001:
+            raise HTTPException(status_code=409, detail=f"Segment {sequence} was already uploaded with different content")
+        return {
+            "success": True,
+            "duplicate": True,
+            "segmentUrl": published.url,
+            "totalSegments": len(publisher.playlist),
+            "playlistUrl": make_spaces_public_url(publisher.index_key),
+            "livePlaylistUrl": make_spaces_public_url(publisher.live_key),
+            "sequence": published.sequence,
+            "duration": published.duration,
+            "uploadStats": upload.stats,
         }
-        seg_list.append(seg_entry)
 
-        if attempt["status"] == "PENDING":
-            attempt["status"] = "IN_PROGRESS"
+    try:
+        spaces_url = make_spaces_public_url(upload.key)
 
-        # ✅ Build/update HLS playlist index.m3u8 in Spaces
-        playlist_text = build_hls_playlist(seg_list)
-        playlist_key = f"segments/{candidate_id}/index.m3u8"
+        seg = publisher.playlist.add(
+            sequence,
+            spaces_url,
+            probe.duration,
+            uploaded_at=int(time.time() * 1000),
+        )
+        await run_in("disk", interview_store.upsert_segment, candidate_id, seg.to_dict())
+
+        # another worker may have stored segments this process hasn't seen
+        total = await run_in("disk", interview_store.segment_count, candidate_id)
+        if total != len(publisher.playlist):
+            publisher.playlist.load(await run_in("disk", interview_store.list_segments, candidate_id))
 
-        spaces_client.put_object(
-            Bucket=SPACES_BUCKET,
-            Key=playlist_key,
-            Body=playlist_text.encode("utf-8"),
-            ContentType="application/vnd.apple.mpegurl",
-            ACL="public-read",
+        status_changed = await run_in(
+            "disk", interview_store.promote_status, candidate_id, "PENDING", "IN_PROGRESS"
         )
 
+        # ✅ Schedule index.m3u8 / live.m3u8 update in Spaces (coalesced)
+        publisher.mark_dirty()
+
         # Public URL for playlist (similar pattern to upload_file_to_spaces)
-        playlist_url = make_spaces_public_url(playlist_key)
-        attempt["premisesVideoPath"] = playlist_url
+        playlist_url = make_spaces_public_url(publisher.index_key)
+        await run_in("disk", interview_store.update_attempt, candidate_id, premisesVideoPath=playlist_url)
 
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception as e:
-            print("Failed to delete local segment file:", e)
+        # push to anyone watching /segments?since= or /events
+        await EVENT_HUB.publish(candidate_id, "segment", seg.to_dict())
+        if status_changed:
+            await publish_status(candidate_id, {"status": "IN_PROGRESS", "premisesVideoPath": playlist_url})
 
         print(
             f"Segment uploaded for candidate {candidate_id}: {spaces_url} "
-            f"(count={len(seg_list)})"
+            f"(seq={seg.sequence}, {seg.duration:.2f}s, count={total}, "
+            f"{upload.stats['mb_per_s']} MB/s)"
         )
-        print(f"Updated HLS playlist at: {playlist_url}")
 
         return {
             "success": True,
             "segmentUrl": spaces_url,
-            "totalSegments": len(seg_list),
+            "totalSegments": total,
             "playlistUrl": playlist_url,
+            "livePlaylistUrl": make_spaces_public_url(publisher.live_key),
+            "sequence": seg.sequence,
+            "duration": seg.duration,
+            "uploadStats": upload.stats,
         }
 
     except Exception as e:
@@ -1495,58 +2583,166 @@ async def upload_premises_segment(
 @app.post("/api/mobile/interviews/{candidate_id}/premises/upload-final")
 async def upload_premises_final(
     candidate_id: str,
-    video: UploadFile = File(...),
+    request: Request,
 ):
     """
     Android calls this ONCE per interview with the **final mp4**.
 
     - Validates candidate_id via Excel (get_or_create_mobile_interview)
-    - Uploads the mp4 to DigitalOcean Spaces
+    - Streams the mp4 (multipart field "video") to DigitalOcean Spaces as a
+      parallel multipart upload, without a local temp file
     - Stores the public URL as premisesVideoPath for playback in web UI
     """
-    if not video:
-        raise HTTPException(status_code=400, detail="No video file received")
-
     # Validate & get/create record from Excel mapping
-    attempt = get_or_create_mobile_interview(candidate_id)
+    attempt = await run_in("drive", get_or_create_mobile_interview, candidate_id, include_segments=False)
 
-    try:
-        ext = Path(video.filename).suffix or ".mp4"
+    def final_key(filename: str) -> str:
+        ext = Path(filename or "").suffix or ".mp4"
         clean_name = f"premises_{candidate_id}{ext}".replace(" ", "_")
-        key = f"premises/{candidate_id}/{clean_name}"
-
-        tmp_path = RECORDINGS_DIR / f"tmp_{uuid4().hex}{ext}"
-        with tmp_path.open("wb") as f_out:
-            shutil.copyfileobj(video.file, f_out)
+        return f"premises/{candidate_id}/{clean_name}"
 
-        spaces_url = upload_file_to_spaces(
-            tmp_path,
-            key,
-            content_type=video.content_type or "video/mp4",
+    try:
+        upload = await stream_upload_field(
+            request,
+            "video",
+            final_key,
+            get_spaces_client(),
+            SPACES_BUCKET,
+            default_content_type="video/mp4",
+            part_size=UPLOAD_PART_SIZE,
+            max_parallel=UPLOAD_MAX_PARALLEL_PARTS,
         )
+    except UploadStreamError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print("Error uploading final premises video:", e)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    if upload is None:
+        raise HTTPException(status_code=400, detail="No video file received")
 
-        # Save for frontend
-        attempt["premisesVideoPath"] = spaces_url
-        attempt["status"] = "COMPLETED"
+    spaces_url = make_spaces_public_url(upload.key)
+
+    # Save for frontend
+    attempt["premisesVideoPath"] = spaces_url
+    attempt["status"] = "COMPLETED"
+    await run_in(
+        "disk",
+        interview_store.update_attempt,
+        candidate_id,
+        premisesVideoPath=spaces_url,
+        status="COMPLETED",
+    )
 
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception as e:
-            print("Failed to delete local final file:", e)
+    await publish_status(candidate_id, attempt)
 
-        print(f"Final premises video for {candidate_id} at {spaces_url}")
+    # close the segment playlists (VOD index.m3u8 + #EXT-X-ENDLIST)
+    if candidate_id in HLS_PUBLISHERS or await run_in("disk", interview_store.segment_count, candidate_id):
+        publisher = await get_playlist_publisher(candidate_id)
+        await publisher.finalize()
+        HLS_PUBLISHERS.pop(candidate_id, None)
 
-        return {
-            "success": True,
-            "premisesVideoPath": spaces_url,
-        }
+    print(
+        f"Final premises video for {candidate_id} at {spaces_url} "
+        f"({upload.stats['bytes']} bytes, {upload.stats['parts']} parts, {upload.stats['mb_per_s']} MB/s)"
+    )
+
+    return {
+        "success": True,
+        "premisesVideoPath": spaces_url,
+        "uploadStats": upload.stats,
+    }
+
+async def _attempt_for_watchers(candidate_id: str) -> Dict:
+    # already-known interviews skip the roster round trip entirely
+    attempt = await run_in("disk", interview_store.get_attempt, candidate_id, "mobile")
+    if attempt is None:
+        return await run_in("drive", get_or_create_mobile_interview, candidate_id)
+    attempt["segments"] = await run_in("disk", interview_store.list_segments, candidate_id)
+    return attempt
 
-    except Exception as e:
-        print("Error uploading final premises video:", e)
-        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
 
 @app.get("/api/mobile/interviews/{candidate_id}/segments")
-async def list_premises_segments(candidate_id: str):
-    attempt = get_or_create_mobile_interview(candidate_id)
-    return {"segments": attempt.get("segments", [])}
+async def list_premises_segments(candidate_id: str, since: Optional[int] = None, wait: float = 0):
+    """
+    Without `since`: the full segment list plus the current cursor.
+    With `since=<cursor>`: only segments added after that cursor. With
+    `wait=<seconds>` as well, long-polls until something new arrives.
+    `reset: true` means the cursor is too old; the full list is returned.
+    """
+    if since is None:
+        cursor = await EVENT_HUB.cursor(candidate_id)
+        attempt = await _attempt_for_watchers(candidate_id)
+        base = {"status": attempt["status"], "premisesVideoPath": attempt.get("premisesVideoPath")}
+        return {"segments": attempt.get("segments", []), "cursor": cursor, **base}
+
+    await _attempt_for_watchers(candidate_id)  # 404s for unknown ids
+    events, cursor, truncated = await EVENT_HUB.wait(
+        candidate_id, since, min(max(wait, 0.0), LONG_POLL_MAX_SECONDS)
+    )
+    attempt = await run_in("disk", interview_store.get_attempt, candidate_id, "mobile")
+    base = {"status": attempt["status"], "premisesVideoPath": attempt.get("premisesVideoPath")}
+    if truncated:
+        cursor = await EVENT_HUB.cursor(candidate_id)
+        segments = await run_in("disk", interview_store.list_segments, candidate_id)
+        return {"segments": segments, "cursor": cursor, "reset": True, **base}
+
+    return {
+        "segments": [e["data"] for e in events if e["type"] == "segment"],
+        "cursor": cursor,
+        "reset": False,
+        **base,
+    }
+
+
+@app.get("/api/mobile/interviews/{candidate_id}/events")
+async def stream_premises_events(candidate_id: str, request: Request, since: Optional[int] = None):
+    """
+    Server-sent events: `segment` and `status` events as they land.
+    Resumes from `since` or the Last-Event-ID header; a `snapshot` event
+    carries the full state when the cursor is too old.
+    """
+    await _attempt_for_watchers(candidate_id)  # 404s for unknown ids
+    last_id = request.headers.get("last-event-id")
+    cursor = int(last_id) if last_id and last_id.isdigit() else (since or 0)
+
+    def sse(event_id: int, kind: str, data: Dict) -> str:
+        return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def snapshot() -> Tuple[int, str]:
+        # cursor first: anything landing while we read the state is re-sent, not lost
+        latest = await EVENT_HUB.cursor(candidate_id)
+        current = await _attempt_for_watchers(candidate_id)
+        return latest, sse(latest, "snapshot", {
+            "segments": current.get("segments", []),
+            "status": current["status"],
+            "premisesVideoPath": current.get("premisesVideoPath"),
+        })
+
+    async def gen():
+        nonlocal cursor
+        # initial state so a fresh dashboard needs no separate GET
+        if cursor == 0:
+            cursor, frame = await snapshot()
+            yield frame
+        while not await request.is_disconnected():
+            events, latest, truncated = await EVENT_HUB.wait(candidate_id, cursor, SSE_KEEPALIVE_SECONDS)
+            if truncated:
+                cursor, frame = await snapshot()
+                yield frame
+                continue
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for e in events:
+                yield sse(e["cursor"], e["type"], e["data"])
+            cursor = latest
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
+# time from the first line of this module to here; see startup_bench.py
+SERVER_IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
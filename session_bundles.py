@@ -0,0 +1,100 @@
+"""
+Persisted JD/resume bundles, one per roster Unique ID.
+
+A bundle is exactly what `build_jd_resume_json_from_excel_row` returns for a
+row. It is stored together with a fingerprint of the roster row (JD text,
+resume URL, name columns) and the resume prompt version, so an edited row or
+a prompt change invalidates it. It also records the resume's Drive
+md5Checksum; a caller that passes the current checksum to `get` gets a
+miss once the file has been replaced in place on Drive. Bundles expire
+after `max_age_seconds` as a backstop.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+FINGERPRINT_COLUMNS = (
+    "JD",
+    "Name of the JD",
+    "Resume URL",
+    "ResumeURL",
+    "Resume",
+    "Candidate Name",
+    "candidate_name",
+    "Name of Candidate",
+    "Name",
+)
+
+
+def row_fingerprint(row: Dict, version: str) -> str:
+    relevant = {k: row.get(k) for k in FINGERPRINT_COLUMNS if k in row}
+    blob = json.dumps(relevant, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(f"{blob}|{version}".encode("utf-8")).hexdigest()
+
+
+def _safe_name(unique_id: str) -> str:
+    return hashlib.sha1(unique_id.encode("utf-8")).hexdigest()
+
+
+class SessionBundleStore:
+    def __init__(self, directory: Path, version: str, max_age_seconds: float = 48 * 3600):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "writes": 0}
+
+    def _path(self, unique_id: str) -> Path:
+        return self.directory / f"{_safe_name(unique_id)}.json"
+
+    def get(self, unique_id: str, row: Dict, resume_md5: Optional[str] = None) -> Optional[Tuple[dict, dict]]:
+        """
+        `resume_md5=None` skips the checksum comparison (age check only).
+        """
+        path = self._path(unique_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        fresh = (
+            doc.get("fingerprint") == row_fingerprint(row, self.version)
+            and time.time() - doc.get("created_at", 0) <= self.max_age_seconds
+            and (resume_md5 is None or doc.get("resume_md5") == resume_md5)
+        )
+        if not fresh:
+            self._count("stale")
+            return None
+        self._count("hits")
+        return doc["jd_json"], doc["resume_json"]
+
+    def put(self, unique_id: str, row: Dict, jd_json: dict, resume_json: dict, resume_md5: str = "") -> None:
+        doc = {
+            "unique_id": unique_id,
+            "fingerprint": row_fingerprint(row, self.version),
+            "resume_md5": resume_md5,
+            "created_at": time.time(),
+            "jd_json": jd_json,
+            "resume_json": resume_json,
+        }
+        path = self._path(unique_id)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._count("writes")
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {"directory": str(self.directory), **self.stats}
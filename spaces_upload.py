@@ -0,0 +1,340 @@
+"""
+Streaming uploads from an incoming multipart request straight to Spaces.
+
+The request body is fed through a streaming multipart parser; the bytes of
+the wanted file field are cut into parts and sent with an S3 multipart
+upload, several parts in parallel. At most `max_parallel` parts are in
+flight per upload, so memory stays bounded at roughly
+(max_parallel + 1) * part_size and nothing is written to local disk. A
+slow Spaces connection applies backpressure to the phone's upload instead
+of piling up on the server.
+
+Uploads smaller than one part go out as a single put_object.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+try:  # python-multipart >= 0.0.13
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # pinned 0.0.9
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from executors import run_in
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+MAX_TEXT_FIELD_BYTES = 64 * 1024
+
+# recent per-upload stats, newest last (exposed via /api/dev/uploads)
+RECENT_UPLOADS: Deque[Dict[str, Any]] = deque(maxlen=200)
+
+
+class UploadStreamError(ValueError):
+    pass
+
+
+@dataclass
+class UploadStats:
+    key: str
+    bytes: int = 0
+    parts: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    elapsed_s: float = 0.0
+    client_wait_s: float = 0.0      # time spent waiting for the phone to send more
+    backpressure_s: float = 0.0     # time spent waiting for Spaces to accept parts
+    mb_per_s: float = 0.0
+
+    def finish(self) -> None:
+        self.elapsed_s = round(time.monotonic() - self.started_at, 3)
+        self.client_wait_s = round(self.client_wait_s, 3)
+        self.backpressure_s = round(self.backpressure_s, 3)
+        if self.elapsed_s > 0:
+            self.mb_per_s = round(self.bytes / self.elapsed_s / (1024 * 1024), 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d.pop("started_at")
+        return d
+
+
+class SpacesMultipartWriter:
+    """
+    Async writer that turns a byte stream into an S3 multipart upload.
+    """
+
+    def __init__(
+        self,
+        s3_client: Any,
+        bucket: str,
+        key: str,
+        content_type: str,
+        part_size: int = 8 * 1024 * 1024,
+        max_parallel: int = 4,
+        acl: str = "public-read",
+    ):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(MIN_PART_SIZE, part_size)
+        self.acl = acl
+        self.stats = UploadStats(key=key)
+
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._slots = asyncio.Semaphore(max(1, max_parallel))
+        self._tasks: List[asyncio.Task] = []
+        self._etags: Dict[int, str] = {}
+        self._next_part = 1
+
+    async def _ensure_upload(self) -> str:
+        if self._upload_id is None:
+            resp = await run_in(
+                "spaces",
+                self.s3.create_multipart_upload,
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type,
+                ACL=self.acl,
+            )
+            self._upload_id = resp["UploadId"]
+        return self._upload_id
+
+    async def _upload_part(self, number: int, body: bytes) -> None:
+        try:
+            resp = await run_in(
+                "spaces",
+                self.s3.upload_part,
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                PartNumber=number,
+                Body=body,
+            )
+            self._etags[number] = resp["ETag"]
+        finally:
+            self._slots.release()
+
+    async def _flush_part(self, body: bytes) -> None:
+        await self._ensure_upload()
+        waited = time.monotonic()
+        await self._slots.acquire()
+        self.stats.backpressure_s += time.monotonic() - waited
+
+        number = self._next_part
+        self._next_part += 1
+        self.stats.parts += 1
+        self._tasks.append(asyncio.create_task(self._upload_part(number, body)))
+        # surface failures early instead of after the whole body has streamed
+        for t in self._tasks:
+            if t.done() and t.exception():
+                raise t.exception()
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.stats.bytes += len(data)
+        while len(self._buffer) >= self.part_size:
+            body = bytes(self._buffer[: self.part_size])
+            del self._buffer[: self.part_size]
+            await self._flush_part(body)
+
+    async def complete(self) -> Dict[str, Any]:
+        if self._upload_id is None:
+            # small object: one request, no multipart bookkeeping
+            await run_in(
+                "spaces",
+                self.s3.put_object,
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type,
+                ACL=self.acl,
+            )
+            self.stats.parts = 1
+        else:
+            if self._buffer:
+                await self._flush_part(bytes(self._buffer))
+            await asyncio.gather(*self._tasks)
+            parts = [{"ETag": self._etags[n], "PartNumber": n} for n in sorted(self._etags)]
+            await run_in(
+                "spaces",
+                self.s3.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        self._buffer = bytearray()
+        self.stats.finish()
+        RECENT_UPLOADS.append(self.stats.to_dict())
+        return self.stats.to_dict()
+
+    async def abort(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._upload_id is not None:
+            try:
+                await run_in(
+                    "spaces",
+                    self.s3.abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                )
+            except Exception as e:
+                print("Failed to abort multipart upload:", self.key, e)
+        self._buffer = bytearray()
+
+
+@dataclass
+class StreamedUpload:
+    key: str
+    filename: str
+    content_type: str
+    stats: Dict[str, Any]
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+def _parse_disposition(value: bytes) -> Dict[str, str]:
+    _, params = parse_options_header(value)
+    return {k.decode("latin-1"): v.decode("utf-8", errors="replace") for k, v in params.items()}
+
+
+async def stream_upload_field(
+    request: Any,
+    field_name: str,
+    key_for: Callable[[str], str],
+    s3_client: Any,
+    bucket: str,
+    default_content_type: str = "application/octet-stream",
+    part_size: int = 8 * 1024 * 1024,
+    max_parallel: int = 4,
+    tap: Optional[Callable[[bytes], None]] = None,
+) -> Optional[StreamedUpload]:
+    """
+    Stream the file field `field_name` of a multipart/form-data request to
+    Spaces. `key_for(filename)` picks the object key once the part headers
+    are known; `tap`, if given, sees every byte of the file as it passes.
+    Small text fields are collected into `StreamedUpload.fields`.
+    Returns None if the field was not present.
+    """
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    if ctype != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadStreamError("Expected multipart/form-data body")
+
+    events: List[tuple] = []
+    header_field = bytearray()
+    header_value = bytearray()
+    headers: Dict[bytes, bytes] = {}
+
+    def on_part_begin():
+        headers.clear()
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("headers", dict(headers)))
+
+    def on_part_data(data, start, end):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    writer: Optional[SpacesMultipartWriter] = None
+    result: Optional[StreamedUpload] = None
+    in_target = False
+    text_name: Optional[str] = None
+    text_value = bytearray()
+    fields: Dict[str, str] = {}
+
+    try:
+        stream = request.stream().__aiter__()
+        while True:
+            waited = time.monotonic()
+            try:
+                chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            if writer is not None:
+                writer.stats.client_wait_s += time.monotonic() - waited
+
+            parser.write(chunk)
+            for kind, payload in events:
+                if kind == "headers":
+                    disp = _parse_disposition(payload.get(b"content-disposition", b""))
+                    in_target = (
+                        result is None
+                        and writer is None
+                        and disp.get("name") == field_name
+                        and "filename" in disp
+                    )
+                    text_name = disp.get("name") if "filename" not in disp else None
+                    text_value.clear()
+                    if in_target:
+                        filename = disp.get("filename") or ""
+                        content_type = (
+                            payload.get(b"content-type", b"").decode("latin-1").strip()
+                            or default_content_type
+                        )
+                        writer = SpacesMultipartWriter(
+                            s3_client,
+                            bucket,
+                            key_for(filename),
+                            content_type,
+                            part_size=part_size,
+                            max_parallel=max_parallel,
+                        )
+                elif kind == "data" and in_target:
+                    if tap is not None:
+                        tap(payload)
+                    await writer.write(payload)
+                elif kind == "data" and text_name:
+                    if len(text_value) + len(payload) > MAX_TEXT_FIELD_BYTES:
+                        raise UploadStreamError(f"Form field '{text_name}' too large")
+                    text_value.extend(payload)
+                elif kind == "end" and in_target:
+                    stats = await writer.complete()
+                    result = StreamedUpload(writer.key, filename, writer.content_type, stats, fields)
+                    writer = None
+                    in_target = False
+                elif kind == "end" and text_name:
+                    fields[text_name] = text_value.decode("utf-8", errors="replace")
+                    text_name = None
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        raise
+
+    if writer is not None:
+        # body ended mid-part (client disconnected)
+        await writer.abort()
+        raise UploadStreamError("Upload body ended before the file part was complete")
+    return result
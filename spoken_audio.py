@@ -0,0 +1,375 @@
+"""
+Streaming transcription of proctor ("spoken instructions") audio.
+
+Audio arrives in pieces: chunked uploads from the dashboard while the
+proctor is still talking, or one multipart file read a block at a time.
+Each piece is
+
+1. appended to a spool file on disk (never held whole in memory), and
+2. piped into ffmpeg, which decodes it to 16 kHz mono PCM as it arrives.
+
+The PCM is cut into chunks at pauses in speech (`SilenceChunker`). Each
+chunk is written as a small WAV and sent to Whisper right away, so
+transcription overlaps the upload. At the end the chunk transcripts are
+joined in order and appended to the instruction file under a lock.
+
+Pieces with a sequence number that arrive early are parked on disk until
+the gap before them is filled, so the spool and the decoder always see
+the recording in order. Pieces still parked at the end (a gap never
+filled) are appended in sequence order and the spool is transcribed again.
+
+Without ffmpeg, or when ffmpeg cannot decode the input (e.g. an mp4/m4a
+whose index is at the end), the spool file is transcribed as a single
+request once the upload is complete.
+"""
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from array import array
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process lock only
+    fcntl = None
+
+FFMPEG = shutil.which("ffmpeg")
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2        # s16le mono
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+
+
+class SilenceChunker:
+    """
+    Splits a 16-bit mono PCM stream into chunks of `min_seconds` to
+    `max_seconds`. A chunk ends in the middle of the first pause of at least
+    `silence_seconds` after `min_seconds`. If no pause comes before
+    `max_seconds`, it ends at the quietest frame seen so far.
+    """
+
+    def __init__(
+        self,
+        min_seconds: float = 15.0,
+        max_seconds: float = 45.0,
+        silence_seconds: float = 0.5,
+        threshold: int = 500,
+        frame_ms: int = 30,
+    ):
+        self.frame_bytes = int(SAMPLE_RATE * frame_ms / 1000) * 2
+        self.min_bytes = int(min_seconds * BYTES_PER_SECOND)
+        self.max_bytes = int(max_seconds * BYTES_PER_SECOND)
+        self.silence_frames = max(1, int(silence_seconds * 1000 / frame_ms))
+        self.threshold_sq = threshold * threshold
+        self._buf = bytearray()
+        self._scanned = 0          # bytes of _buf already classified
+        self._silent_run = 0
+        self._quietest = (float("inf"), 0)
+
+    def _cut(self, at: int) -> bytes:
+        chunk = bytes(self._buf[:at])
+        del self._buf[:at]
+        self._scanned = max(0, self._scanned - at)
+        self._silent_run = 0
+        self._quietest = (float("inf"), 0)
+        return chunk
+
+    def feed(self, pcm: bytes) -> List[bytes]:
+        self._buf += pcm
+        chunks: List[bytes] = []
+        while self._scanned + self.frame_bytes <= len(self._buf):
+            start = self._scanned
+            frame = array("h")
+            frame.frombytes(bytes(self._buf[start:start + self.frame_bytes]))
+            energy = sum(s * s for s in frame) / len(frame)
+            self._scanned += self.frame_bytes
+
+            if energy < self.threshold_sq:
+                self._silent_run += 1
+            else:
+                self._silent_run = 0
+            if self._scanned >= self.min_bytes and energy < self._quietest[0]:
+                self._quietest = (energy, self._scanned)
+
+            if self._scanned >= self.min_bytes and self._silent_run >= self.silence_frames:
+                middle = self._scanned - (self._silent_run // 2) * self.frame_bytes
+                chunks.append(self._cut(middle))
+            elif self._scanned >= self.max_bytes:
+                chunks.append(self._cut(self._quietest[1] or self._scanned))
+        return chunks
+
+    def flush(self) -> Optional[bytes]:
+        if len(self._buf) < self.frame_bytes:
+            self._buf.clear()
+            return None
+        return self._cut(len(self._buf))
+
+
+def _write_wav(path: Path, pcm: bytes) -> None:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm)
+
+
+class SpokenAudioIngest:
+    """
+    One proctor recording being uploaded.
+
+    `transcribe(path) -> str` does one Whisper request;
+    `submit(fn, *args) -> Future` schedules it (e.g. on the "openai" pool).
+    """
+
+    def __init__(
+        self,
+        spool_path: Path,
+        transcribe: Callable[[str], str],
+        submit: Callable[..., Future],
+        use_ffmpeg: bool = True,
+        **chunker_kwargs: Any,
+    ):
+        self.spool_path = Path(spool_path)
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        self.work_dir = self.spool_path.with_suffix(".chunks")
+        self.pending_dir = self.work_dir / "pending"
+        self.transcribe = transcribe
+        self.submit = submit
+        self.use_ffmpeg = use_ffmpeg and FFMPEG is not None
+        self.chunker_kwargs = chunker_kwargs
+        self.chunker = SilenceChunker(**chunker_kwargs)
+
+        self.next_seq = 0         # every seq below this is in the spool, in order
+        self.complete = True      # False once we know some piece never reached this ingest
+        self._pending: Dict[int, Path] = {}   # seq -> parked early piece
+        self._decoder_failed = False
+        self.bytes = 0
+        self.started_at = time.monotonic()
+        self.touched_at = self.started_at
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._futures: List[Future] = []
+        self._decode_error: Optional[BaseException] = None
+
+    # ---------- input ----------
+    def _ensure_decoder(self) -> None:
+        if self._proc is not None or not self.use_ffmpeg:
+            return
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._proc = subprocess.Popen(
+            [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._reader = threading.Thread(target=self._read_pcm, name="spoken-audio-decode", daemon=True)
+        self._reader.start()
+
+    def _read_pcm(self) -> None:
+        try:
+            while True:
+                data = self._proc.stdout.read(64 * 1024)
+                if not data:
+                    break
+                for pcm in self.chunker.feed(data):
+                    self._submit_chunk(pcm)
+            last = self.chunker.flush()
+            if last:
+                self._submit_chunk(last)
+        except BaseException as e:
+            self._decode_error = e
+
+    def _submit_chunk(self, pcm: bytes) -> None:
+        path = self.work_dir / f"chunk_{len(self._futures):04d}.wav"
+        _write_wav(path, pcm)
+        self._futures.append(self.submit(self.transcribe, str(path)))
+
+    def feed(self, data: bytes, seq: Optional[int] = None) -> bool:
+        """
+        Append one piece. With `seq`, repeats of a piece already received
+        (client retries) are ignored and early pieces wait for the ones
+        before them. Returns False for an ignored repeat.
+        """
+        with self._lock:
+            if seq is not None and (seq < self.next_seq or seq in self._pending):
+                return False
+            self.touched_at = time.monotonic()
+            self.bytes += len(data)
+            if seq is not None and seq > self.next_seq:
+                self.pending_dir.mkdir(parents=True, exist_ok=True)
+                path = self.pending_dir / f"{seq}.piece"
+                with open(path, "wb") as f:
+                    f.write(data)
+                self._pending[seq] = path
+                return True
+            self._append(data)
+            if seq is not None:
+                self.next_seq = seq + 1
+                # the gap is filled: release the parked pieces that follow
+                while self.next_seq in self._pending:
+                    path = self._pending.pop(self.next_seq)
+                    self._append(path.read_bytes())
+                    path.unlink()
+                    self.next_seq += 1
+        return True
+
+    def _append(self, data: bytes) -> None:
+        with open(self.spool_path, "ab") as f:
+            f.write(data)
+        if not self.complete or self._decoder_failed:
+            return
+        self._ensure_decoder()
+        if self._proc is not None:
+            try:
+                self._proc.stdin.write(data)
+                self._proc.stdin.flush()
+            except OSError as e:
+                # BrokenPipeError: ffmpeg gave up on the input; keep spooling
+                print("[spoken-audio] ffmpeg stopped reading:", e)
+                self._decoder_failed = True
+
+    def _assemble_spool(self) -> None:
+        """
+        Append pieces still parked (including other workers') in sequence order.
+        """
+        if not self.pending_dir.exists():
+            return
+        pieces = sorted(self.pending_dir.glob("*.piece"), key=lambda p: int(p.stem))
+        with open(self.spool_path, "ab") as out:
+            for path in pieces:
+                out.write(path.read_bytes())
+        self._pending.clear()
+
+    # ---------- output ----------
+    def _stop_decoder(self) -> None:
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        self._reader.join()
+        self._proc.wait()
+        if self._decode_error is not None:
+            raise self._decode_error
+        if self._proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {self._proc.returncode}")
+
+    def finish(self, expected_pieces: Optional[int] = None) -> str:
+        """
+        Wait for every chunk and return the transcript in order. If this
+        process did not see every piece in order (e.g. another worker took
+        some, or a gap was never filled), the whole spool file is decoded
+        and transcribed again. If ffmpeg failed, the spool file is sent to
+        Whisper as is.
+        """
+        if (expected_pieces is not None and expected_pieces != self.next_seq) or self._pending:
+            self.complete = False
+        try:
+            if self.complete and self._proc is not None and not self._decoder_failed:
+                try:
+                    self._stop_decoder()
+                except Exception as e:
+                    print("[spoken-audio] ffmpeg failed, transcribing the upload as is:", e)
+                    self.abort(keep_spool=True)
+                    return self._transcribe_whole()
+                texts = [f.result() for f in self._futures]
+                return " ".join(t.strip() for t in texts if t and t.strip())
+            self.abort(keep_spool=True)
+            self._assemble_spool()
+            if self._decoder_failed:
+                return self._transcribe_whole()
+            return self._transcribe_spool()
+        finally:
+            self.cleanup()
+
+    def _transcribe_spool(self) -> str:
+        if not self.spool_path.exists() or self.spool_path.stat().st_size == 0:
+            return ""
+        if self.use_ffmpeg:
+            # keeps the extension, which Whisper needs if the replay falls back to it
+            replay_path = self.spool_path.with_name(f"{self.spool_path.stem}.replay{self.spool_path.suffix}")
+            replay = SpokenAudioIngest(replay_path, self.transcribe, self.submit, **self.chunker_kwargs)
+            with open(self.spool_path, "rb") as f:
+                while True:
+                    block = f.read(256 * 1024)
+                    if not block:
+                        break
+                    replay.feed(block)
+            return replay.finish()
+        return self._transcribe_whole()
+
+    def _transcribe_whole(self) -> str:
+        if not self.spool_path.exists() or self.spool_path.stat().st_size == 0:
+            return ""
+        if self.spool_path.stat().st_size > WHISPER_MAX_BYTES:
+            raise ValueError("Audio too large to transcribe in one request (install ffmpeg to enable chunking)")
+        return (self.transcribe(str(self.spool_path)) or "").strip()
+
+    def abort(self, keep_spool: bool = False) -> None:
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+            self._proc.wait()
+            if self._reader is not None:
+                self._reader.join(timeout=5)
+            self._proc = None
+        for f in self._futures:
+            f.cancel()
+        self._futures = []
+        if not keep_spool:
+            self.cleanup()
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        try:
+            os.remove(self.spool_path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self.bytes,
+            "pieces": self.next_seq,
+            "pending_pieces": len(self._pending),
+            "chunks_submitted": len(self._futures),
+            "chunks_done": sum(1 for f in self._futures if f.done()),
+            "complete": self.complete and not self._pending,
+            "ffmpeg": self._proc is not None,
+            "age_seconds": round(time.monotonic() - self.started_at, 1),
+        }
+
+
+_append_locks: dict = {}
+_append_locks_guard = threading.Lock()
+
+
+def append_instructions(path: Path, text: str) -> str:
+    """
+    Append `text` to an instruction file without losing concurrent appends
+    (thread lock + flock across workers), replacing the file atomically.
+    Returns the merged content.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _append_locks_guard:
+        lock = _append_locks.setdefault(str(path), threading.Lock())
+    with lock, open(path.with_suffix(path.suffix + ".lock"), "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        existing = path.read_text(encoding="utf-8", errors="ignore") if path.exists() else ""
+        merged = (existing + "\n\n" + text).strip()
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(merged)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return merged
@@ -0,0 +1,106 @@
+"""
+Async dependency graph of request stages, with per-stage timings.
+
+/session used to await every step in turn: roster row, resume bundle,
+spoken instructions, prompt compile, realtime session. Several of those
+do not depend on each other, so they are declared as stages with
+explicit dependencies instead:
+
+    graph = StageGraph(timings)
+    graph.add("roster", lookup)
+    graph.add("instructions", read_instructions)
+    graph.add("bundle", build_bundle, "roster")
+    graph.add("prompt", compile_prompt, "bundle", "instructions")
+    results = await graph.run()
+
+Every stage starts as soon as its dependencies have finished and gets
+their results as keyword arguments. If a stage raises, the stages still
+running are cancelled and the exception propagates unchanged (so an
+HTTPException raised by a stage reaches FastAPI as is).
+
+`StageTimings` records when each stage started and how long it ran,
+relative to the start of the request. It is thread-safe, so blocking
+helpers running on executor pools can record sub-steps (e.g. the resume
+download) into the same breakdown. `server_timing()` renders it as a
+Server-Timing header value.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class StageTimings:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages: List[Tuple[str, float, float]] = []   # (name, start_ms, duration_ms)
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """
+        `start` / `end` are time.perf_counter() values.
+        """
+        with self._lock:
+            self._stages.append((name, (start - self.started) * 1000, (end - start) * 1000))
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            stages = sorted(self._stages, key=lambda s: s[1])
+        return {name: {"start_ms": round(start, 1), "ms": round(dur, 1)} for name, start, dur in stages}
+
+    def server_timing(self) -> str:
+        parts = [f'{name};dur={t["ms"]};desc="start {t["start_ms"]}"' for name, t in self.to_dict().items()]
+        parts.append(f"total;dur={self.total_ms()}")
+        return ", ".join(parts)
+
+
+class StageGraph:
+    def __init__(self, timings: Optional[StageTimings] = None):
+        self.timings = timings or StageTimings()
+        self._stages: Dict[str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]] = {}
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], *deps: str) -> None:
+        """
+        `fn(**{dep: result})` is awaited once every dep has finished.
+        Dependencies must be added first, so the graph cannot have cycles.
+        """
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        missing = [d for d in deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+        self._stages[name] = (fn, deps)
+
+    async def run(self) -> Dict[str, Any]:
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> Any:
+            fn, deps = self._stages[name]
+            kwargs = {d: await tasks[d] for d in deps}
+            with self.timings.measure(name):
+                return await fn(**kwargs)
+
+        # insertion order is a topological order, so every dep task exists already
+        for name in self._stages:
+            tasks[name] = asyncio.ensure_future(run_stage(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            # let the cancelled stages unwind before the error propagates
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return {name: task.result() for name, task in tasks.items()}
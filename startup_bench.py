@@ -0,0 +1,145 @@
+"""
+Import-time benchmark for worker start-up.
+
+Imports the server in a fresh interpreter with `python -X importtime`
+(several runs; the fastest counts) and reports, for every module the
+server imports directly, its own and cumulative import time. Heavy
+dependencies that server.py loads on first use (pandas, pypdf, docx,
+googleapiclient, google.oauth2, boto3, openai, numpy, scipy) must not be
+imported at start-up at all. If one of them is, the run fails, so a
+stray top-level import is caught before it slows down deploys.
+
+CLI (needs the same .env as the server, since importing it validates
+config):
+    python startup_bench.py
+    python startup_bench.py --runs 5 --top 30 --json data/startup_bench.json
+    python startup_bench.py --max-ms 1500          # fail if the import is slower
+    python startup_bench.py --forbid ""            # only report
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+LAZY_MODULES = (
+    "pandas", "pypdf", "docx", "googleapiclient", "google.oauth2",
+    "boto3", "botocore", "openai", "numpy", "scipy",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    One entry per imported module, in the order `-X importtime` prints
+    them (children before their parent).
+    """
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            out.append({
+                "name": m.group(4),
+                "level": (len(m.group(3)) - 1) // 2,
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulative_ms": int(m.group(2)) / 1000,
+            })
+    return out
+
+
+def direct_imports(entries: Sequence[Dict[str, Any]], module: str) -> List[Dict[str, Any]]:
+    """
+    Modules imported directly by `module` (one level below it).
+    """
+    root = next((i for i, e in enumerate(entries) if e["name"] == module and e["level"] == 0), None)
+    if root is None:
+        return []
+    children = []
+    # children are printed before their parent; walk back until the previous top-level entry
+    for e in reversed(entries[:root]):
+        if e["level"] == 0:
+            break
+        if e["level"] == 1:
+            children.append(e)
+    return children
+
+
+def run_once(module: str, cwd: Path) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(cwd),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-5:]
+        raise RuntimeError(f"importing {module} failed:\n" + "\n".join(tail))
+    entries = parse_importtime(proc.stderr)
+    root = next((e for e in entries if e["name"] == module and e["level"] == 0), None)
+    return {"total_ms": root["cumulative_ms"] if root else 0.0, "entries": entries}
+
+
+def benchmark(module: str = "server", runs: int = 3, cwd: Optional[Path] = None) -> Dict[str, Any]:
+    cwd = cwd or Path(__file__).parent
+    results = [run_once(module, cwd) for _ in range(max(1, runs))]
+    best = min(results, key=lambda r: r["total_ms"])
+    loaded = {e["name"] for e in best["entries"]}
+    return {
+        "module": module,
+        "runs_ms": [round(r["total_ms"], 1) for r in results],
+        "best_ms": round(best["total_ms"], 1),
+        "imported_modules": len(loaded),
+        "direct": sorted(direct_imports(best["entries"], module), key=lambda e: -e["cumulative_ms"]),
+        "slowest_self": sorted(best["entries"], key=lambda e: -e["self_ms"])[:20],
+        "loaded": loaded,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure import time of the server, by module.")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20, help="direct imports to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if the best run is slower")
+    parser.add_argument("--forbid", default=",".join(LAZY_MODULES), help="modules that must not load at start-up")
+    parser.add_argument("--json", default=None, help="write the result here")
+    args = parser.parse_args()
+
+    try:
+        result = benchmark(args.module, args.runs)
+    except RuntimeError as e:
+        print(f"[startup] {e}")
+        raise SystemExit(2)
+    forbidden = [m.strip() for m in args.forbid.split(",") if m.strip()]
+    leaked = sorted(m for m in forbidden if m in result["loaded"])
+
+    print(f"[startup] import {args.module}: best {result['best_ms']} ms, runs {result['runs_ms']}, "
+          f"{result['imported_modules']} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  direct import")
+    for e in result["direct"][: args.top]:
+        print(f"{e['cumulative_ms']:14.1f} {e['self_ms']:9.1f}  {e['name']}")
+    print(f"\n{'self ms':>9}  slowest modules (own time)")
+    for e in result["slowest_self"][:10]:
+        print(f"{e['self_ms']:9.1f}  {e['name']}")
+
+    if args.json:
+        out = {k: v for k, v in result.items() if k != "loaded"}
+        out["forbidden_loaded"] = leaked
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+
+    failed = False
+    if leaked:
+        print(f"\n[startup] FAIL: loaded at start-up but should be lazy: {', '.join(leaked)}")
+        failed = True
+    if args.max_ms is not None and result["best_ms"] > args.max_ms:
+        print(f"\n[startup] FAIL: {result['best_ms']} ms > budget {args.max_ms} ms")
+        failed = True
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,8 @@ const phonePreviewLive= document.getElementById("phonePreviewLive");
 const endBtn          = document.getElementById("endBtn");
 const timerEl         = document.getElementById("timer");
      // NEW
-const SEG_POLL_INTERVAL_MS = 3000;   // how often to check for new segments
+const SEG_POLL_INTERVAL_MS = 3000;   // retry delay when the segment feed errors
+const SEG_LONG_POLL_WAIT_S = 25;     // server holds /segments?since= open this long
 const SEG_START_DELAY_SEGMENTS = 3; // wait for at least N segments before starting
 const SAFE_LAG_SEGMENTS = 2; 
 
@@ -69,11 +70,16 @@ let firstAssistantTurnAccepted = false;
 // premises audio capture (from LiveKit)
 let premisesAudioRecorder = null;
 let premisesAudioChunks   = [];
+// pieces are streamed to the server while recording so transcription starts early
+const PREMISES_AUDIO_SEND_MS = 2000;
+let premisesAudioUpload = null;      // { id, seq, pending[], chain, failed, timer }
 // ------- Premises segments state (no HLS, plain mp4) -------
 let premisesSegments = [];
 let premisesIndex = 0;
 let premisesPollTimer = null;
 let premisesLiveMode = false;
+let premisesCursor = 0;              // last event cursor seen from the server
+let premisesEventSource = null;      // SSE connection (null when long-polling)
 
   // start after at least N segments exist
 
@@ -207,6 +213,7 @@ function setupPremisesAudioRecorder(track) {
     premisesAudioRecorder.ondataavailable = (e) => {
       if (e.data && e.data.size > 0) {
         premisesAudioChunks.push(e.data);
+        if (premisesAudioUpload) premisesAudioUpload.pending.push(e.data);
       }
     };
   } catch (e) {
@@ -219,6 +226,15 @@ function startPremisesInstructionCapture() {
     return;
   }
   premisesAudioChunks = [];
+  premisesAudioUpload = {
+    id: (crypto.randomUUID ? crypto.randomUUID() : String(Date.now())).replace(/[^A-Za-z0-9_-]/g, ""),
+    seq: 0,
+    pending: [],
+    chain: Promise.resolve(),
+    failed: false,
+    timer: null,
+  };
+  premisesAudioUpload.timer = setInterval(sendPremisesAudioPiece, PREMISES_AUDIO_SEND_MS);
   try {
     premisesAudioRecorder.start(500);
     console.log("Premises instruction recording started");
@@ -236,79 +252,143 @@ async function pollPremisesHls() {
   const attached = await fetchAndAttachPremisesStream();
   if (attached) return;  // stop polling if we got it
 
+  // long-poll: the server answers as soon as a segment/status change lands
   hlsPollCount += 1;
-  if (hlsPollCount < 60) {      // ✅ e.g. ~5 minutes of retries
-    setTimeout(pollPremisesHls, 5000);
-  } else {
-    console.warn("Stopped polling for premises HLS after 60 attempts.");
+  if (hlsPollCount >= 60) {
+    console.warn("Stopped waiting for premises HLS after 60 attempts.");
+    return;
   }
+  try {
+    await fetchPremisesSegments(candidateId, premisesCursor, SEG_LONG_POLL_WAIT_S);
+  } catch (err) {
+    console.warn("Premises: waiting for HLS failed:", err);
+    await new Promise((resolve) => setTimeout(resolve, SEG_POLL_INTERVAL_MS));
+  }
+  pollPremisesHls();
 }
 // ---------- SEGMENT-BASED PREMISES LIVE VIEW (working logic) ----------
 
-async function fetchPremisesSegments(id) {
-  const res = await fetch(`/api/mobile/interviews/${encodeURIComponent(id)}/segments`);
+function segmentOrder(s) {
+  return typeof s.sequence === "number" ? s.sequence : s.uploadedAt;
+}
+
+/**
+ * Merge new/updated segments into premisesSegments (keyed by sequence or url).
+ */
+function mergePremisesSegments(list, replace = false) {
+  const byKey = new Map();
+  const keyOf = (s) => (typeof s.sequence === "number" ? `seq:${s.sequence}` : s.url);
+  if (!replace) {
+    premisesSegments.forEach((s) => byKey.set(keyOf(s), s));
+  }
+  (list || []).forEach((s) => {
+    const seg = {
+      url: s.url,
+      uploadedAt: s.uploadedAt || 0,
+      sequence: s.sequence,
+      duration: s.duration,
+    };
+    byKey.set(keyOf(seg), seg);
+  });
+
+  const before = premisesSegments.length;
+  premisesSegments = Array.from(byKey.values()).sort(
+    (a, b) => segmentOrder(a) - segmentOrder(b)
+  );
+  if (premisesSegments.length > before) {
+    console.log("Premises: new segments total =", premisesSegments.length);
+  }
+}
+
+/**
+ * Incremental fetch: only segments after `since` (or everything when since is null).
+ * With waitS > 0 the server long-polls until something new arrives.
+ */
+async function fetchPremisesSegments(id, since = null, waitS = 0) {
+  const params = new URLSearchParams();
+  if (since !== null) params.set("since", String(since));
+  if (waitS) params.set("wait", String(waitS));
+  const qs = params.toString() ? `?${params}` : "";
+
+  const res = await fetch(`/api/mobile/interviews/${encodeURIComponent(id)}/segments${qs}`);
   if (!res.ok) {
     throw new Error(`Segments not available (status ${res.status})`);
   }
   const data = await res.json();
 
-  const segs = (data.segments || []).map((s) => ({
-    url: s.url,
-    uploadedAt: s.uploadedAt || 0,
-  }));
-
-  // Ensure chronological order
-  segs.sort((a, b) => a.uploadedAt - b.uploadedAt);
-  return segs;
+  mergePremisesSegments(data.segments, since === null || data.reset);
+  if (typeof data.cursor === "number") premisesCursor = data.cursor;
+  return data;
 }
 
 async function ensurePremisesSegmentsReady() {
-  // Wait until we have at least SEG_START_DELAY_SEGMENTS
+  // Wait until we have at least SEG_START_DELAY_SEGMENTS (filled by the feed)
   while (premisesLiveMode && candidateId) {
-    try {
-      premisesSegments = await fetchPremisesSegments(candidateId);
-      if (premisesSegments.length >= SEG_START_DELAY_SEGMENTS) {
-        console.log(
-          "Premises: segments ready:",
-          premisesSegments.length
-        );
-        return;
-      }
-    } catch (err) {
-      console.warn("Premises: error fetching segments:", err);
+    if (premisesSegments.length >= SEG_START_DELAY_SEGMENTS) {
+      console.log(
+        "Premises: segments ready:",
+        premisesSegments.length
+      );
+      return;
     }
-
-    console.log("Premises: waiting for first segments...");
-    await new Promise((resolve) =>
-      setTimeout(resolve, SEG_POLL_INTERVAL_MS)
-    );
+    await new Promise((resolve) => setTimeout(resolve, 500));
   }
 }
 
 /**
- * Background poller: keeps updating premisesSegments as new segments arrive.
+ * Fallback feed when EventSource isn't available: long-poll with a cursor.
  */
 async function pollPremisesSegmentsLoop() {
   if (!premisesLiveMode || !candidateId) return;
 
+  let delay = 0;
   try {
-    const latest = await fetchPremisesSegments(candidateId);
-    if (latest.length > premisesSegments.length) {
-      premisesSegments = latest;
-      console.log("Premises: new segments total =", premisesSegments.length);
-    }
+    await fetchPremisesSegments(candidateId, premisesCursor, SEG_LONG_POLL_WAIT_S);
   } catch (err) {
     console.warn("Premises: polling error:", err);
+    delay = SEG_POLL_INTERVAL_MS;
   } finally {
     if (premisesLiveMode) {
-      premisesPollTimer = setTimeout(
-        pollPremisesSegmentsLoop,
-        SEG_POLL_INTERVAL_MS
-      );
+      premisesPollTimer = setTimeout(pollPremisesSegmentsLoop, delay);
     }
   }
 }
 
+/**
+ * Push feed: server-sent events with new segments / status changes.
+ */
+function startPremisesSegmentFeed() {
+  if (!window.EventSource) {
+    pollPremisesSegmentsLoop();
+    return;
+  }
+
+  const url = `/api/mobile/interviews/${encodeURIComponent(candidateId)}/events?since=${premisesCursor}`;
+  premisesEventSource = new EventSource(url);
+
+  const onEvent = (handler) => (e) => {
+    if (e.lastEventId) premisesCursor = Number(e.lastEventId);
+    handler(JSON.parse(e.data));
+  };
+
+  premisesEventSource.addEventListener("snapshot", onEvent((data) => {
+    mergePremisesSegments(data.segments, true);
+  }));
+  premisesEventSource.addEventListener("segment", onEvent((seg) => {
+    mergePremisesSegments([seg]);
+  }));
+  premisesEventSource.addEventListener("status", onEvent((data) => {
+    if (data.status === "COMPLETED" && premisesEventSource) {
+      premisesEventSource.close();
+      premisesEventSource = null;
+    }
+  }));
+  // EventSource reconnects on its own (sending Last-Event-ID)
+  premisesEventSource.onerror = (err) => {
+    console.warn("Premises: event stream error (browser will retry):", err);
+  };
+}
+
 /**
  * Play the next segment into a video element.
  * Called initially and also on each 'ended' event.
@@ -377,13 +457,14 @@ async function startPremisesSegmentLiveView() {
   premisesLiveMode = true;
   premisesIndex = 0;
   premisesSegments = [];
+  premisesCursor = 0;
 
   // Wire both Step2 & Step3 videos
   attachPremisesToVideoEl(phonePreview);
   attachPremisesToVideoEl(phonePreviewLive);
 
-  // Start background polling for new segments
-  pollPremisesSegmentsLoop();
+  // Subscribe to new segments (SSE, or long-poll fallback)
+  startPremisesSegmentFeed();
 
   // Wait until we have a couple of segments, then play
   await ensurePremisesSegmentsReady();
@@ -410,6 +491,10 @@ function stopPremisesSegmentLiveView() {
     clearTimeout(premisesPollTimer);
     premisesPollTimer = null;
   }
+  if (premisesEventSource) {
+    premisesEventSource.close();
+    premisesEventSource = null;
+  }
 }
 
 
@@ -452,6 +537,62 @@ async function fetchAndAttachPremisesStream() {
 
 
 
+// Queue the audio recorded since the last send as the next ordered piece.
+function sendPremisesAudioPiece() {
+  const up = premisesAudioUpload;
+  if (!up || up.failed || !up.pending.length || !candidateId) return up ? up.chain : Promise.resolve();
+
+  const blob = new Blob(up.pending, { type: "audio/webm" });
+  up.pending = [];
+  const seq = up.seq++;
+  const url =
+    `/upload_spoken_audio/stream?candidate_id=${encodeURIComponent(candidateId)}` +
+    `&upload_id=${encodeURIComponent(up.id)}&seq=${seq}`;
+
+  up.chain = up.chain
+    .then(async () => {
+      if (up.failed) return;
+      const resp = await fetch(url, {
+        method: "POST",
+        headers: { "Content-Type": "application/octet-stream" },
+        body: blob,
+      });
+      if (!resp.ok) throw new Error(await resp.text());
+    })
+    .catch((e) => {
+      console.warn("Streaming spoken audio failed, will upload at the end:", e);
+      up.failed = true;
+    });
+  return up.chain;
+}
+
+// Finish a streamed upload; returns the transcript, or null to fall back.
+async function finishStreamedPremisesAudio() {
+  const up = premisesAudioUpload;
+  if (!up) return null;
+  clearInterval(up.timer);
+  await sendPremisesAudioPiece();
+  await up.chain;
+  if (up.failed || up.seq === 0) return null;
+
+  try {
+    const resp = await fetch("/upload_spoken_audio/finish", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ candidate_id: candidateId, upload_id: up.id, pieces: up.seq }),
+    });
+    if (!resp.ok) {
+      console.warn("upload_spoken_audio/finish failed:", await resp.text());
+      return null;
+    }
+    const data = await resp.json();
+    return data.transcript || "";
+  } catch (e) {
+    console.warn("upload_spoken_audio/finish error:", e);
+    return null;
+  }
+}
+
 async function stopPremisesInstructionCaptureAndUpload() {
   if (!premisesAudioRecorder) return;
   if (!candidateId) {
@@ -475,10 +616,20 @@ async function stopPremisesInstructionCaptureAndUpload() {
   });
 
   if (!premisesAudioChunks.length) {
+    if (premisesAudioUpload) clearInterval(premisesAudioUpload.timer);
+    premisesAudioUpload = null;
     alert("No audio captured from premises.");
     return;
   }
 
+  const streamed = await finishStreamedPremisesAudio();
+  premisesAudioUpload = null;
+  if (streamed !== null) {
+    console.log("Spoken instructions transcript:", streamed);
+    setNotice("Extra interview instructions captured from premises audio.");
+    return;
+  }
+
   const blob = new Blob(premisesAudioChunks, { type: "audio/webm" });
   const fd = new FormData();
   fd.append("file", blob, `${candidateId}_premises.webm`);
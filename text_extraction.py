@@ -0,0 +1,276 @@
+"""
+Resume text extraction in a process pool.
+
+pypdf and python-docx are pure Python: a long or malformed file can hold the
+GIL for seconds or loop forever. Extraction therefore runs in worker
+processes, never in the server's threads.
+
+- PDFs are split into page ranges and the ranges are extracted in
+  parallel (one task per worker). Only the first `max_pages` pages are
+  read.
+- Each file has a time budget. When it runs out, whatever page ranges
+  finished are returned and the result is marked `timed_out`. The pool is
+  recycled (its processes are terminated), so a hung parser cannot hold a
+  worker forever. Tasks for other files that die with the pool are retried
+  once on the new pool.
+- Results are cached on disk by the SHA-256 of the file bytes, so the same
+  resume downloaded again (another row, a re-upload, a restart) is not
+  parsed twice. Timed-out results are not cached.
+
+Every call returns an `ExtractionResult` with the text, page counts and
+elapsed time; the most recent reports are kept for /api/dev/extraction.
+"""
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+MIN_PAGES_PER_TASK = 4
+
+
+# ---------- worker-side functions (run in child processes) ----------
+def _pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def _pdf_pages(path: str, start: int, end: int) -> List[str]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    out = []
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            out.append(reader.pages[i].extract_text() or "")
+        except Exception:
+            out.append("")  # one broken page should not lose the rest
+    return out
+
+
+def _docx_text(path: str) -> str:
+    import docx
+
+    doc = docx.Document(path)
+    return "\n".join(p.text for p in doc.paragraphs)
+
+
+@dataclass
+class ExtractionResult:
+    path: str
+    sha256: str
+    kind: str
+    text: str = ""
+    pages: Optional[int] = None          # total pages (PDF only)
+    pages_extracted: int = 0
+    elapsed_ms: float = 0.0
+    cached: bool = False
+    truncated: bool = False              # page budget hit
+    timed_out: bool = False              # time budget hit
+    error: str = ""
+
+    def report(self) -> Dict[str, Any]:
+        out = asdict(self)
+        del out["text"]
+        out["chars"] = len(self.text)
+        return out
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class TextExtractor:
+    def __init__(
+        self,
+        cache_dir: Path,
+        workers: int = 2,
+        max_pages: int = 40,
+        timeout_seconds: float = 20.0,
+        history: int = 50,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.max_pages = max_pages
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self._recent: deque = deque(maxlen=history)
+        self.stats_counters = {"files": 0, "cache_hits": 0, "timeouts": 0, "errors": 0, "recycles": 0, "pages": 0}
+
+    # ---------- pool ----------
+    def _get_pool(self) -> Tuple[ProcessPoolExecutor, int]:
+        with self._lock:
+            if self._pool is None:
+                # spawn: children must not inherit the server's threads and locks
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._generation += 1
+            return self._pool, self._generation
+
+    def _recycle(self, generation: int) -> None:
+        """
+        Kill the pool's processes (a timed-out parse may still be running)
+        and start fresh on next use. No-op if already recycled.
+        """
+        with self._lock:
+            if self._pool is None or generation != self._generation:
+                return
+            pool, self._pool = self._pool, None
+            self.stats_counters["recycles"] += 1
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+
+    def _run(self, fn: Any, *args: Any, deadline: float) -> Any:
+        """
+        One task with a deadline; retried once if the pool broke under it
+        (e.g. another file's timeout recycled it).
+        """
+        for attempt in range(2):
+            pool, generation = self._get_pool()
+            try:
+                return pool.submit(fn, *args).result(timeout=max(0.0, deadline - time.monotonic()))
+            except BrokenProcessPool:
+                self._recycle(generation)
+                if attempt:
+                    raise
+            except FutureTimeout:
+                self._recycle(generation)
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- cache ----------
+    def _cache_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.json"
+
+    def _cache_get(self, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._cache_path(digest), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_put(self, result: ExtractionResult) -> None:
+        path = self._cache_path(result.sha256)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "kind": result.kind,
+                "text": result.text,
+                "pages": result.pages,
+                "pages_extracted": result.pages_extracted,
+                "truncated": result.truncated,
+                "max_pages": self.max_pages,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # ---------- extraction ----------
+    def extract(self, path: Path) -> ExtractionResult:
+        path = Path(path)
+        started = time.monotonic()
+        ext = path.suffix.lower()
+        kind = "pdf" if ext == ".pdf" else "docx" if ext == ".docx" else "text"
+        result = ExtractionResult(str(path), "", kind)
+        try:
+            result.sha256 = file_sha256(path)
+            cached = self._cache_get(result.sha256)
+            # a cached page-truncated result is only reusable under the same page budget
+            if cached is not None and not (cached.get("truncated") and cached.get("max_pages") != self.max_pages):
+                result.text = cached.get("text", "")
+                result.pages = cached.get("pages")
+                result.pages_extracted = cached.get("pages_extracted", 0)
+                result.truncated = bool(cached.get("truncated"))
+                result.cached = True
+            else:
+                deadline = started + self.timeout_seconds
+                if kind == "pdf":
+                    self._extract_pdf(path, result, deadline)
+                elif kind == "docx":
+                    result.text = self._run(_docx_text, str(path), deadline=deadline)
+                else:
+                    result.text = path.read_text(encoding="utf-8", errors="ignore")
+                if not result.timed_out:
+                    self._cache_put(result)
+        except FutureTimeout:
+            result.timed_out = True
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        result.elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        self._record(result)
+        return result
+
+    def _extract_pdf(self, path: Path, result: ExtractionResult, deadline: float) -> None:
+        total = self._run(_pdf_page_count, str(path), deadline=deadline)
+        result.pages = total
+        budget = min(total, self.max_pages) if self.max_pages > 0 else total
+        result.truncated = budget < total
+        if budget == 0:
+            return
+
+        per_task = max(MIN_PAGES_PER_TASK, math.ceil(budget / self.workers))
+        ranges = [(s, min(s + per_task, budget)) for s in range(0, budget, per_task)]
+        pool, generation = self._get_pool()
+        futures: Dict[Future, int] = {pool.submit(_pdf_pages, str(path), s, e): i for i, (s, e) in enumerate(ranges)}
+        parts: Dict[int, List[str]] = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                result.timed_out = True
+                self._recycle(generation)
+                break
+            for f in done:
+                i = futures[f]
+                try:
+                    parts[i] = f.result()
+                except BrokenProcessPool:
+                    # another file's timeout recycled the pool; redo this range once
+                    parts[i] = self._run(_pdf_pages, str(path), *ranges[i], deadline=deadline)
+        # keep page order; ranges that did not finish are simply missing
+        pages = [text for i in sorted(parts) for text in parts[i]]
+        result.pages_extracted = len(pages)
+        result.text = "\n".join(pages)
+
+    def _record(self, result: ExtractionResult) -> None:
+        with self._lock:
+            c = self.stats_counters
+            c["files"] += 1
+            c["cache_hits"] += int(result.cached)
+            c["timeouts"] += int(result.timed_out)
+            c["errors"] += int(bool(result.error))
+            c["pages"] += result.pages_extracted if not result.cached else 0
+            self._recent.append(result.report())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pages": self.max_pages,
+                "timeout_seconds": self.timeout_seconds,
+                "pool_running": self._pool is not None,
+                **self.stats_counters,
+                "recent": list(self._recent),
+            }
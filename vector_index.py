@@ -0,0 +1,353 @@
+"""
+Memory-mapped vector index of quiz questions and course competencies.
+
+Used to pick the bank questions and competencies most relevant to a
+candidate's JD + resume when building interviewer instructions.
+
+On disk (data/vector_index/ by default):
+
+    <key>.f32     float32 matrix, one L2-normalised row per item
+    <key>.json    embedder name/dim, items, and row ranges per (kind, group)
+    CURRENT       the key of the index to open
+
+`key` is a hash of the embedder and every item text, so an index is only
+rebuilt when a quiz/course file or the embedder changes. Files are written
+under new names and CURRENT is swapped atomically, and building happens
+under an flock. Every worker process therefore opens the same files with
+np.memmap: no embedding work at startup, and the pages are shared through
+the OS page cache.
+
+`VectorStore.current` opens whatever CURRENT points at straight away and
+checks it against the sources (which means parsing the quiz/course files
+and hashing every item) in a background thread, so a worker's first
+search does not wait for that. Only a directory without any index builds
+inline.
+
+Items are stored grouped by (kind, group) (e.g. ("question", "pcb")), so
+a filtered search is one matrix-vector product over a contiguous slice of
+the memmap followed by argpartition.
+
+Embedders are pluggable: any object with `name`, `dim` and
+`embed(texts) -> float32 array (n, dim)` of L2-normalised rows. Set
+VECTOR_EMBEDDER=module:factory to use another one; the default is a local
+signed feature-hashing embedder over words and word bigrams.
+"""
+import hashlib
+import importlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process lock only
+    fcntl = None
+
+DEFAULT_DIM = 1024
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how if in into is it its of on or the their this to was what "
+    "when where which why will with you your would should could give brief list key one".split()
+)
+
+
+class HashingEmbedder:
+    """
+    Stateless bag of words + bigrams, hashed into `dim` signed buckets with
+    sublinear term frequency. Deterministic across processes and machines.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-v1-{dim}"
+
+    def _features(self, text: str) -> Dict[int, float]:
+        words = [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in _STOPWORDS]
+        counts: Dict[str, int] = {}
+        for tok in words + [f"{a}_{b}" for a, b in zip(words, words[1:])]:
+            counts[tok] = counts.get(tok, 0) + 1
+        features: Dict[int, float] = {}
+        for tok, c in counts.items():
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            idx = h % self.dim
+            sign = 1.0 if (h >> 63) & 1 else -1.0
+            features[idx] = features.get(idx, 0.0) + sign * (1.0 + np.log(c))
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for idx, value in self._features(text).items():
+                out[i, idx] = value
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+def load_embedder(spec: str = "") -> Any:
+    """
+    "" -> HashingEmbedder(); "module:factory" -> factory().
+    """
+    if not spec:
+        return HashingEmbedder()
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "Embedder")()
+
+
+class VectorIndex:
+    """
+    One opened index; read-only and shared between requests.
+    """
+
+    def __init__(self, key: str, meta: Dict[str, Any], vectors: np.ndarray):
+        self.key = key
+        self.embedder = meta["embedder"]
+        self.dim = meta["dim"]
+        self.items: List[Dict[str, Any]] = meta["items"]
+        self.ranges: Dict[str, Dict[str, Tuple[int, int]]] = {
+            kind: {g: (r[0], r[1]) for g, r in groups.items()} for kind, groups in meta["ranges"].items()
+        }
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def groups(self, kind: str) -> List[str]:
+        return list(self.ranges.get(kind, {}))
+
+    def search(
+        self,
+        query: np.ndarray,
+        kind: str,
+        groups: Optional[Iterable[str]] = None,
+        k: int = 10,
+        min_score: float = 0.0,
+        distinct_clusters: bool = True,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Top-k (score, item) of `kind`, optionally only inside `groups`.
+        With `distinct_clusters`, items sharing a "cluster" keep only the best.
+        """
+        spans = self.ranges.get(kind, {})
+        wanted = [spans[g] for g in (groups if groups is not None else spans) if g in spans]
+        if not wanted or k <= 0:
+            return []
+        scores = np.concatenate([self.vectors[s:e] @ query for s, e in wanted])
+        offsets = np.concatenate([np.arange(s, e) for s, e in wanted])
+        # over-fetch a little so cluster de-duplication rarely leaves us short
+        fetch = min(len(scores), k * 2 if distinct_clusters else k)
+        top = np.argpartition(-scores, fetch - 1)[:fetch] if fetch < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        out: List[Tuple[float, Dict[str, Any]]] = []
+        seen = set()
+        for i in top:
+            score = float(scores[i])
+            if score < min_score or len(out) >= k:
+                break
+            item = self.items[int(offsets[i])]
+            cluster = item.get("cluster")
+            if distinct_clusters and cluster:
+                if cluster in seen:
+                    continue
+                seen.add(cluster)
+            out.append((round(score, 4), item))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "embedder": self.embedder,
+            "dim": self.dim,
+            "items": len(self.items),
+            "groups": {kind: {g: e - s for g, (s, e) in groups.items()} for kind, groups in self.ranges.items()},
+            "bytes": int(self.vectors.nbytes),
+        }
+
+
+def index_key(embedder: Any, items: Sequence[Dict[str, Any]]) -> str:
+    h = hashlib.sha256(f"{embedder.name}|{embedder.dim}".encode("utf-8"))
+    for item in items:
+        h.update(f"\x00{item['kind']}|{item['group']}|{item['ref']}|{item['text']}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class VectorStore:
+    def __init__(self, directory: Path, embedder: Any, keep: int = 2):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._index: Optional[VectorIndex] = None
+        self._token: Optional[Hashable] = None   # None until checked against the sources
+        self._validating = False
+        self.builds = 0
+
+    def _open(self, key: str) -> Optional[VectorIndex]:
+        meta_path = self.directory / f"{key}.json"
+        vec_path = self.directory / f"{key}.f32"
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("embedder") != self.embedder.name or not meta.get("items"):
+            return None
+        vectors = np.memmap(vec_path, dtype=np.float32, mode="r", shape=(len(meta["items"]), meta["dim"]))
+        return VectorIndex(key, meta, vectors)
+
+    def open_current(self) -> Optional[VectorIndex]:
+        """
+        Whatever index CURRENT points at, without looking at the sources.
+        """
+        try:
+            key = (self.directory / "CURRENT").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        return self._open(key) if key else None
+
+    def current(self, sources: Callable[[], Tuple[Hashable, Any]]) -> VectorIndex:
+        """
+        Index for the current sources. `sources()` returns the
+        (token, make_items) pair for `sync`. Until the first sync in this
+        process, the index CURRENT points at is returned as is and the sync
+        runs in the background.
+        """
+        if self._token is not None:
+            return self.sync(*sources())
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self.open_current()
+                index = self._index
+        if index is None:
+            return self.sync(*sources())
+        self._validate_in_background(sources)
+        return index
+
+    def _validate_in_background(self, sources: Callable[[], Tuple[Hashable, Any]]) -> None:
+        with self._lock:
+            if self._validating:
+                return
+            self._validating = True
+
+        def run() -> None:
+            try:
+                self.sync(*sources())
+            except Exception as e:
+                print("[vector-index] validation failed:", e)
+            finally:
+                self._validating = False
+
+        threading.Thread(target=run, name="vector-index-validate", daemon=True).start()
+
+    def sync(self, token: Hashable, make_items: Any) -> VectorIndex:
+        """
+        Index for the current sources. `token` identifies the source
+        snapshot (e.g. the loaded bank/catalog objects); while it is
+        unchanged the opened index is returned as is. `make_items()` lists
+        {"kind", "group", "ref", "text", ...} dicts.
+        """
+        index = self._index
+        if index is not None and token == self._token:
+            return index
+        with self._lock:
+            if self._index is not None and token == self._token:
+                return self._index
+            items = sorted(make_items(), key=lambda it: (it["kind"], it["group"]))
+            key = index_key(self.embedder, items)
+            index = self._index if self._index is not None and self._index.key == key else self._open(key)
+            if index is None:
+                index = self._build(key, items)
+            self._index, self._token = index, token
+            return index
+
+    def _build(self, key: str, items: List[Dict[str, Any]]) -> VectorIndex:
+        with open(self.directory / "build.lock", "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            index = self._open(key)  # another worker may have built it while we waited
+            if index is not None:
+                return index
+
+            ranges: Dict[str, Dict[str, List[int]]] = {}
+            for i, item in enumerate(items):
+                span = ranges.setdefault(item["kind"], {}).setdefault(item["group"], [i, i])
+                span[1] = i + 1
+            vectors = self.embedder.embed([it["text"] for it in items]).astype(np.float32, copy=False)
+
+            tmp = f".{os.getpid()}.tmp"
+            vec_path = self.directory / f"{key}.f32"
+            meta_path = self.directory / f"{key}.json"
+            vectors.tofile(str(vec_path) + tmp)
+            os.replace(str(vec_path) + tmp, vec_path)
+            meta = {"key": key, "embedder": self.embedder.name, "dim": int(vectors.shape[1]), "items": items, "ranges": ranges}
+            with open(str(meta_path) + tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(str(meta_path) + tmp, meta_path)
+            with open(self.directory / f"CURRENT{tmp}", "w", encoding="utf-8") as f:
+                f.write(key)
+            os.replace(self.directory / f"CURRENT{tmp}", self.directory / "CURRENT")
+            self._prune(key)
+            self.builds += 1
+            print(f"[vector-index] built {key}: {len(items)} items x {vectors.shape[1]} dims")
+        return self._open(key)
+
+    def _prune(self, current: str) -> None:
+        # mapped files stay readable after unlink, so older workers are unaffected
+        metas = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for meta in metas[self.keep:]:
+            if meta.stem == current:
+                continue
+            for path in (meta, meta.with_suffix(".f32")):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def query(self, text: str) -> np.ndarray:
+        return self.embedder.embed([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "directory": str(self.directory),
+            "builds": self.builds,
+            "validated": self._token is not None,
+            **(index.stats() if index else {}),
+        }
+
+
+def reference_items(bank: Any, catalog: Any) -> List[Dict[str, Any]]:
+    """
+    Items for a QuestionBank snapshot and a CourseCatalog snapshot.
+    """
+    items: List[Dict[str, Any]] = []
+    for q in bank.questions:
+        items.append({
+            "kind": "question",
+            "group": q.role,
+            "ref": q.id,
+            "topic": q.topic,
+            "text": q.text,
+            "cluster": bank.cluster_of.get(q.id, q.id),
+        })
+    for course in catalog.courses.values():
+        for c in course.competencies:
+            subskills = [s.replace("_", " ") for s in c.subskills]
+            items.append({
+                "kind": "competency",
+                "group": course.id,
+                "ref": c.id,
+                "name": c.name,
+                "subskills": subskills,
+                "text": " ".join([c.name, *c.responsibilities, *subskills, *c.tools]),
+            })
+    return items